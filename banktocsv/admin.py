@@ -1,3 +1,14 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ClassificationRule
+
+
+@admin.register(ClassificationRule)
+class ClassificationRuleAdmin(admin.ModelAdmin):
+    """
+    Édition des règles de classification (prises en compte sans redémarrage)
+    """
+    list_display = ('keyword', 'direction', 'category', 'position', 'active', 'updated_at')
+    list_editable = ('direction', 'category', 'position', 'active')
+    list_filter = ('direction', 'active')
+    search_fields = ('keyword', 'category')
@@ -0,0 +1,243 @@
+"""
+Agrégats mensuels des transactions : totaux par (relevé, mois, sens)
+
+Les rapports (totaux mensuels de débits et crédits, flux net par relevé)
+n'ont pas à relire toutes les transactions : ils lisent MonthlyAggregate, une
+ligne par relevé, mois et sens, dont le coût dépend du nombre de mois et non
+du nombre de transactions.
+
+La table est ajustée dans la transaction base de données qui modifie les
+transactions, comme les compteurs globaux (counters) :
+- save_statement (ingest) ajoute les totaux du relevé, calculés pendant
+  l'insertion des lots
+- reapply_rules (rules) déplace les montants reclassés d'un sens à l'autre
+- la suppression d'un relevé supprime ses agrégats (CASCADE)
+
+Seules ces opérations tiennent la table à jour. Supprimer ou modifier des
+transactions par un queryset (Transaction.objects.filter(...).delete() ou
+.update()), par l'admin ou en SQL contourne la maintenance, et laisse des
+agrégats faux : passer par ingest.remove_statement et rules.reapply_rules,
+ou relancer rebuild_aggregates() ensuite.
+
+Sens d'une transaction : crédit si son crédit est positif, débit sinon (un
+montant nul compte au débit) ; les nombres de transactions d'un relevé
+s'additionnent donc à son total. rebuild_aggregates() recalcule la table
+par un GROUP BY dans la base (`python manage.py banktocsv_rebuild_aggregates`).
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from parsers.records import decimal_to_millimes, millimes_to_decimal
+from .api import QueryError, parse_param
+from .models import MonthlyAggregate, Transaction
+
+
+# Regroupements proposés par monthly_summary() -> champ de MonthlyAggregate
+GROUPS = {
+    'month': 'month',
+    'statement': 'bank_statement_id',
+}
+
+
+@lru_cache(maxsize=4096)
+def _ordinal_month(ordinal):
+    return date.fromordinal(ordinal).replace(day=1)
+
+
+def _direction(debit, credit):
+    return 'credit' if credit > 0 else 'debit'
+
+
+def add_records(totals, records):
+    """
+    Ajoute des transactions parsées (TransactionRecord) aux totaux d'un relevé
+
+    Args:
+        totals: Dict {(mois, sens): [nombre, millimes]} complété sur place
+        records: Transactions (dates en ordinaux, montants en millimes)
+    """
+    for record in records:
+        key = (_ordinal_month(record.date_operation), _direction(record.debit, record.credit))
+        entry = totals.get(key)
+        if entry is None:
+            entry = totals[key] = [0, 0]
+        entry[0] += 1
+        entry[1] += record.debit + record.credit
+
+
+def move_transaction(deltas, transaction, debit, credit):
+    """
+    Enregistre le reclassement d'une transaction stockée (ancien sens -> nouveau)
+
+    Args:
+        deltas: Dict {(relevé, mois, sens): [nombre, millimes]} complété sur place
+        transaction: Transaction avant modification (bank_statement_id, date_operation, debit, credit)
+        debit, credit: Nouveaux montants
+    """
+    month = transaction.date_operation.replace(day=1)
+    old = (transaction.bank_statement_id, month, _direction(transaction.debit, transaction.credit))
+    new = (transaction.bank_statement_id, month, _direction(debit, credit))
+    if old == new:
+        return
+    amount = decimal_to_millimes(transaction.debit + transaction.credit)
+    for key, sign in ((old, -1), (new, 1)):
+        entry = deltas.setdefault(key, [0, 0])
+        entry[0] += sign
+        entry[1] += sign * amount
+
+
+def adjust_aggregates(deltas):
+    """
+    Applique des variations aux agrégats mensuels
+
+    À appeler dans le transaction.atomic() de l'écriture correspondante.
+
+    Args:
+        deltas: Dict {(id du relevé, mois, sens): (nombre, millimes)} ; valeurs
+            négatives pour retirer des transactions
+    """
+    deltas = {key: value for key, value in deltas.items() if any(value)}
+    if not deltas:
+        return
+
+    statement_ids = {statement_id for statement_id, _, _ in deltas}
+    existing = set(
+        MonthlyAggregate.objects.select_for_update()
+        .filter(bank_statement_id__in=statement_ids)
+        .values_list('bank_statement_id', 'month', 'direction')
+    )
+
+    created = []
+    for key, (count, millimes) in deltas.items():
+        statement_id, month, direction = key
+        if key in existing:
+            MonthlyAggregate.objects.filter(
+                bank_statement_id=statement_id, month=month, direction=direction
+            ).update(
+                transaction_count=F('transaction_count') + count,
+                total=F('total') + millimes_to_decimal(millimes),
+            )
+        else:
+            created.append(MonthlyAggregate(
+                bank_statement_id=statement_id, month=month, direction=direction,
+                transaction_count=count, total=millimes_to_decimal(millimes),
+            ))
+    MonthlyAggregate.objects.bulk_create(created)
+
+    # Mois dont toutes les transactions ont changé de sens
+    MonthlyAggregate.objects.filter(bank_statement_id__in=statement_ids, transaction_count__lte=0).delete()
+
+
+def add_statement_totals(bank_statement, totals):
+    """
+    Ajoute aux agrégats les totaux d'un relevé (voir add_records)
+    """
+    adjust_aggregates({
+        (bank_statement.pk, month, direction): value
+        for (month, direction), value in totals.items()
+    })
+
+
+def rebuild_aggregates(statement_id=None, batch_size=1000):
+    """
+    Recalcule les agrégats à partir des transactions (GROUP BY dans la base)
+
+    Args:
+        statement_id: Limiter le recalcul à un relevé
+        batch_size: Nombre d'agrégats insérés par requête
+
+    Returns:
+        Nombre d'agrégats écrits
+    """
+    transactions = Transaction.objects.all()
+    aggregates = MonthlyAggregate.objects.all()
+    if statement_id is not None:
+        transactions = transactions.filter(bank_statement_id=statement_id)
+        aggregates = aggregates.filter(bank_statement_id=statement_id)
+
+    groups = (
+        transactions
+        .annotate(
+            month=TruncMonth('date_operation'),
+            direction=Case(When(credit__gt=0, then=Value('credit')), default=Value('debit')),
+        )
+        .values('bank_statement_id', 'month', 'direction')
+        .annotate(transaction_count=Count('id'), total=Sum(F('debit') + F('credit')))
+        .order_by()
+    )
+
+    with db_transaction.atomic():
+        aggregates.delete()
+        rows = [MonthlyAggregate(**group) for group in groups]
+        MonthlyAggregate.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def _month(value):
+    return datetime.strptime(value, '%Y-%m').date()
+
+
+def monthly_summary(params):
+    """
+    Totaux de débits et crédits par mois ou par relevé, lus dans les agrégats
+
+    Args:
+        params: Paramètres (request.GET) : statement, month_from et month_to
+            (AAAA-MM, inclus), group (month par défaut, ou statement)
+
+    Returns:
+        Dict {'group', 'rows', 'count'} ; chaque ligne porte la clé du
+        regroupement (month ou statement_id), debit, credit, debit_count,
+        credit_count et net (crédits - débits)
+
+    Raises:
+        QueryError: Paramètre invalide
+    """
+    group = params.get('group') or 'month'
+    if group not in GROUPS:
+        raise QueryError(f"Paramètre group invalide (choix : {', '.join(GROUPS)})")
+    column = GROUPS[group]
+
+    queryset = MonthlyAggregate.objects.all()
+    statement = parse_param(params, 'statement', int, 'identifiant de relevé')
+    if statement is not None:
+        queryset = queryset.filter(bank_statement_id=statement)
+    month_from = parse_param(params, 'month_from', _month, 'mois AAAA-MM')
+    if month_from is not None:
+        queryset = queryset.filter(month__gte=month_from)
+    month_to = parse_param(params, 'month_to', _month, 'mois AAAA-MM')
+    if month_to is not None:
+        queryset = queryset.filter(month__lte=month_to)
+
+    groups = (
+        queryset.values(column, 'direction')
+        .annotate(count=Sum('transaction_count'), amount=Sum('total'))
+        .order_by(column)
+    )
+
+    rows = {}
+    for item in groups:
+        key = item[column]
+        row = rows.get(key)
+        if row is None:
+            label = key.strftime('%Y-%m') if group == 'month' else key
+            row = rows[key] = {
+                'month' if group == 'month' else 'statement_id': label,
+                'debit': Decimal(0), 'credit': Decimal(0), 'debit_count': 0, 'credit_count': 0,
+            }
+        row[item['direction']] += item['amount']
+        row[f"{item['direction']}_count"] += item['count']
+
+    results = []
+    for row in rows.values():
+        row['net'] = float(row['credit'] - row['debit'])
+        row['debit'] = float(row['debit'])
+        row['credit'] = float(row['credit'])
+        results.append(row)
+    return {'group': group, 'rows': results, 'count': len(results)}
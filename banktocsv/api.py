@@ -0,0 +1,212 @@
+"""
+API de lecture des transactions enregistrées (JSON, paginée)
+
+Filtres : relevé, période, montant, sens (débit/crédit), texte du libellé.
+La pagination est par clé (keyset) sur (date_operation, id) : chaque page
+reprend après la dernière ligne de la précédente (WHERE (date, id) > curseur
+ORDER BY date, id LIMIT n), servie par les index (date_operation, id) et
+(bank_statement, date_operation, id). Son coût ne dépend pas de la position
+dans l'historique, contrairement à un OFFSET. Les lignes sont lues avec
+values() : pas d'instanciation de modèles, et seules les colonnes demandées
+(fields) sont lues.
+"""
+
+import base64
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Transaction
+
+
+# Champs exposés par l'API -> champs du modèle
+API_FIELDS = {
+    'id': 'id',
+    'statement_id': 'bank_statement_id',
+    'date_operation': 'date_operation',
+    'date_valeur': 'date_valeur',
+    'libelle': 'libelle',
+    'debit': 'debit',
+    'credit': 'credit',
+    'category': 'category',
+}
+
+DIRECTIONS = ('debit', 'credit')
+
+
+class QueryError(Exception):
+    """
+    Paramètre de requête invalide (filtre, curseur, champs...)
+    """
+
+
+def parse_param(params, name, convert, label):
+    """
+    Valeur convertie d'un paramètre (None si absent ou vide)
+
+    Raises:
+        QueryError: Valeur non convertible (label : format attendu)
+    """
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return convert(value)
+    except (ValueError, InvalidOperation):
+        raise QueryError(f"Paramètre {name} invalide : {label} attendu")
+
+
+def encode_cursor(date_operation, transaction_id):
+    """
+    Curseur opaque désignant la position (date_operation, id) d'une ligne
+    """
+    raw = f"{date_operation.isoformat()}|{transaction_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Position (date_operation, id) d'un curseur produit par encode_cursor()
+
+    Raises:
+        QueryError: Curseur invalide
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        day, transaction_id = raw.split('|')
+        return date.fromisoformat(day), int(transaction_id)
+    except ValueError:
+        raise QueryError("Curseur de pagination invalide")
+
+
+def selected_fields(value):
+    """
+    Champs demandés (paramètre fields, séparés par des virgules), tous par défaut
+    """
+    if not value:
+        return list(API_FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown:
+        raise QueryError(f"Champs inconnus : {', '.join(unknown)} (choix : {', '.join(API_FIELDS)})")
+    return fields
+
+
+def page_limit(params):
+    """
+    Nombre de transactions par réponse (paramètre limit, TRANSACTIONS_API_PAGE_SIZE par défaut)
+    """
+    limit = parse_param(params, 'limit', int, 'entier')
+    if limit is None:
+        return settings.TRANSACTIONS_API_PAGE_SIZE
+    if not 0 < limit <= settings.TRANSACTIONS_API_MAX_PAGE_SIZE:
+        raise QueryError(f"Paramètre limit invalide (1 à {settings.TRANSACTIONS_API_MAX_PAGE_SIZE})")
+    return limit
+
+
+def filter_transactions(params, queryset=None):
+    """
+    Applique aux transactions les filtres d'une requête de l'API
+
+    Args:
+        params: Paramètres (request.GET) : statement, date_from, date_to,
+            amount_min, amount_max, direction, q
+        queryset: Transactions de départ (toutes si None)
+
+    Raises:
+        QueryError: Paramètre invalide
+    """
+    queryset = Transaction.objects.all() if queryset is None else queryset
+
+    statement = parse_param(params, 'statement', int, 'identifiant de relevé')
+    if statement is not None:
+        queryset = queryset.filter(bank_statement_id=statement)
+
+    date_from = parse_param(params, 'date_from', date.fromisoformat, 'date AAAA-MM-JJ')
+    if date_from is not None:
+        queryset = queryset.filter(date_operation__gte=date_from)
+    date_to = parse_param(params, 'date_to', date.fromisoformat, 'date AAAA-MM-JJ')
+    if date_to is not None:
+        queryset = queryset.filter(date_operation__lte=date_to)
+
+    direction = params.get('direction') or None
+    if direction is not None:
+        if direction not in DIRECTIONS:
+            raise QueryError(f"Paramètre direction invalide (choix : {', '.join(DIRECTIONS)})")
+        queryset = queryset.filter(**{f"{direction}__gt": 0})
+
+    # Montant de la transaction : débit ou crédit (l'autre est nul)
+    amount_min = parse_param(params, 'amount_min', Decimal, 'montant')
+    amount_max = parse_param(params, 'amount_max', Decimal, 'montant')
+    if amount_min is not None or amount_max is not None:
+        queryset = queryset.annotate(amount=F('debit') + F('credit'))
+        if amount_min is not None:
+            queryset = queryset.filter(amount__gte=amount_min)
+        if amount_max is not None:
+            queryset = queryset.filter(amount__lte=amount_max)
+
+    text = (params.get('q') or '').strip()
+    if text:
+        queryset = queryset.filter(libelle__icontains=text)
+
+    return queryset
+
+
+def serialize_row(row, fields):
+    """
+    Ligne values() -> objet JSON (dates ISO, montants en dinars)
+    """
+    item = {}
+    for name in fields:
+        value = row[API_FIELDS[name]]
+        if isinstance(value, date):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = float(value)
+        item[name] = value
+    return item
+
+
+def transactions_page(params):
+    """
+    Page de transactions filtrées, dans l'ordre (date_operation, id)
+
+    Args:
+        params: Filtres (voir filter_transactions), plus cursor (page suivante),
+            limit (taille de page) et fields (champs séparés par des virgules)
+
+    Returns:
+        Dict {'transactions', 'count', 'next_cursor'} ; next_cursor est None sur la dernière page
+
+    Raises:
+        QueryError: Paramètre invalide
+    """
+    fields = selected_fields(params.get('fields'))
+    limit = page_limit(params)
+
+    queryset = filter_transactions(params)
+    cursor = params.get('cursor')
+    if cursor:
+        day, transaction_id = decode_cursor(cursor)
+        # (date, id) > curseur ; la borne date >= jour permet à l'index de démarrer au curseur
+        queryset = queryset.filter(date_operation__gte=day).filter(
+            Q(date_operation__gt=day) | Q(id__gt=transaction_id)
+        )
+
+    # La position de la dernière ligne est toujours lue, pour le curseur suivant
+    columns = list(dict.fromkeys([API_FIELDS[name] for name in fields] + ['date_operation', 'id']))
+    # Une ligne de plus que la page : indique s'il reste des transactions
+    rows = list(queryset.order_by('date_operation', 'id').values(*columns)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['date_operation'], rows[-1]['id'])
+
+    return {
+        'transactions': [serialize_row(row, fields) for row in rows],
+        'count': len(rows),
+        'next_cursor': next_cursor,
+    }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BanktocsvConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'banktocsv'
+
+    def ready(self):
+        # Enregistre les contrôles système
+        from . import checks  # noqa: F401
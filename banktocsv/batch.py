@@ -0,0 +1,298 @@
+"""
+Conversion par lots : plusieurs PDF (ou archives ZIP de PDF) en un seul envoi
+
+Chaque relevé est parsé indépendamment, en parallèle sur plusieurs processus
+(BATCH_WORKERS) : l'échec d'un fichier n'empêche pas le traitement des autres.
+Les résultats sont combinés dans l'ordre d'envoi, avec le nom du relevé
+d'origine sur chaque transaction.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
+
+from parsers.registry import select_parser
+from parsers.records import millimes_to_float
+from parsers.rules import RuleSet
+from .exports import EXPORT_HEADERS
+from .parse_cache import get_parse_cache, cache_key
+from .rules import get_rule_set
+
+
+logger = logging.getLogger(__name__)
+
+# Colonnes des exports fusionnés : relevé d'origine puis colonnes habituelles
+BATCH_EXPORT_HEADERS = ['Relevé'] + EXPORT_HEADERS
+
+
+class BatchError(Exception):
+    """
+    Lot refusé dans son ensemble (trop de fichiers, archive trop volumineuse...)
+    """
+
+
+def _source(name, content=None, error=None):
+    """
+    Élément d'un lot : un PDF à parser (contenu) ou un fichier refusé (erreur)
+    """
+    return {'source': name, 'content': content, 'result': None, 'error': error}
+
+
+def _too_large(name):
+    """
+    PDF du lot refusé : même limite qu'un envoi individuel (PDF_UPLOAD_MAX_SIZE)
+    """
+    return _source(name, error=f"Le fichier est trop volumineux (max {filesizeformat(settings.PDF_UPLOAD_MAX_SIZE)})")
+
+
+def _pdf_source(uploaded_file):
+    if uploaded_file.size > settings.PDF_UPLOAD_MAX_SIZE:
+        return _too_large(uploaded_file.name)
+    return _source(uploaded_file.name, content=uploaded_file.read())
+
+
+def _batch_too_large():
+    return BatchError(
+        f"Le lot est trop volumineux une fois les archives décompressées "
+        f"(max {filesizeformat(settings.BATCH_UPLOAD_MAX_SIZE)})"
+    )
+
+
+def _zip_sources(uploaded_file, max_files, remaining):
+    """
+    PDF contenus dans une archive ZIP (les autres fichiers sont ignorés)
+
+    Args:
+        uploaded_file: Archive uploadée
+        max_files: Nombre de relevés que le lot peut encore recevoir
+        remaining: Octets que le lot peut encore décompresser (BATCH_UPLOAD_MAX_SIZE
+            moins les octets déjà lus) ; seuls les octets réellement lus sont comptés
+
+    Raises:
+        BatchError: Trop de PDF dans l'archive, ou lot trop volumineux une fois décompressé
+    """
+    try:
+        archive = zipfile.ZipFile(uploaded_file)
+    except zipfile.BadZipFile:
+        return [_source(uploaded_file.name, error='Archive ZIP invalide')]
+
+    with archive:
+        members = [
+            member for member in archive.infolist()
+            if not member.is_dir()
+            and member.filename.lower().endswith('.pdf')
+            and not member.filename.startswith('__MACOSX/')
+            and not os.path.basename(member.filename).startswith('.')
+        ]
+
+        # Nombre de fichiers et tailles annoncées : refuser avant de décompresser quoi que ce soit
+        if len(members) > max_files:
+            raise BatchError(f"Trop de fichiers dans le lot (max {settings.BATCH_UPLOAD_MAX_FILES})")
+        if sum(member.file_size for member in members) > remaining:
+            raise _batch_too_large()
+
+        sources = []
+        for member in members:
+            if member.file_size > settings.PDF_UPLOAD_MAX_SIZE:
+                sources.append(_too_large(member.filename))
+                continue
+            try:
+                with archive.open(member) as member_file:
+                    # Lecture bornée : la taille annoncée peut être fausse
+                    content = member_file.read(min(settings.PDF_UPLOAD_MAX_SIZE, remaining) + 1)
+            except (zipfile.BadZipFile, RuntimeError, OSError) as e:
+                sources.append(_source(member.filename, error=f"Fichier illisible dans l'archive: {str(e)}"))
+                continue
+            if len(content) > settings.PDF_UPLOAD_MAX_SIZE:
+                sources.append(_too_large(member.filename))
+            elif len(content) > remaining:
+                raise _batch_too_large()
+            else:
+                remaining -= len(content)
+                sources.append(_source(member.filename, content=content))
+        return sources
+
+
+def collect_sources(uploaded_files):
+    """
+    Liste les relevés d'un envoi : PDF directs et PDF extraits des archives ZIP
+
+    Le nombre de relevés (BATCH_UPLOAD_MAX_FILES) et le total des octets lus,
+    archives décompressées comprises (BATCH_UPLOAD_MAX_SIZE), sont bornés sur
+    l'ensemble du lot.
+
+    Args:
+        uploaded_files: Fichiers uploadés (.pdf ou .zip)
+
+    Returns:
+        Liste d'éléments {'source', 'content', 'result', 'error'}, dans l'ordre d'envoi
+
+    Raises:
+        BatchError: Trop de fichiers, ou lot trop volumineux une fois décompressé
+    """
+    sources = []
+    read = 0
+    for uploaded_file in uploaded_files:
+        name = uploaded_file.name.lower()
+        if name.endswith('.zip'):
+            added = _zip_sources(
+                uploaded_file,
+                max_files=settings.BATCH_UPLOAD_MAX_FILES - len(sources),
+                remaining=settings.BATCH_UPLOAD_MAX_SIZE - read,
+            )
+        elif name.endswith('.pdf'):
+            added = [_pdf_source(uploaded_file)]
+        else:
+            added = [_source(uploaded_file.name, error='Le fichier doit être un PDF ou une archive ZIP')]
+
+        sources.extend(added)
+        read += sum(len(item['content']) for item in added if item['content'] is not None)
+        if read > settings.BATCH_UPLOAD_MAX_SIZE:
+            raise _batch_too_large()
+        if len(sources) > settings.BATCH_UPLOAD_MAX_FILES:
+            raise BatchError(f"Trop de fichiers dans le lot (max {settings.BATCH_UPLOAD_MAX_FILES})")
+
+    return sources
+
+
+@lru_cache(maxsize=8)
+def rule_set_for(rules):
+    """
+    RuleSet reconstruit dans un processus du pool à partir de rule_set.rules
+    (un automate et un cache par jeu de règles, réutilisés d'un PDF à l'autre)
+    """
+    return RuleSet(rules)
+
+
+def _parse_content(content, rules, backend, parser_name):
+    """
+    Parse un PDF dans un processus du pool (règles transmises sous forme de tuple),
+    avec le parser de sa banque (un document non reconnu échoue sans être parsé)
+    """
+    parser_class = select_parser(content, parser_name, backend)
+    parser = parser_class(rule_set=rule_set_for(rules), backend=backend)
+    return parser.parse_pdf(io.BytesIO(content))
+
+
+def parse_sources(sources):
+    """
+    Parse les relevés d'un lot en parallèle, en réutilisant le cache de parsing
+
+    Chaque élément reçoit son 'result' ou son 'error' ; le contenu des PDF
+    est libéré une fois traité.
+
+    Args:
+        sources: Éléments renvoyés par collect_sources()
+    """
+    start = time.perf_counter()
+    rule_set = get_rule_set()
+    cache = get_parse_cache()
+
+    # PDF à parser, un seul par contenu (un même relevé peut être envoyé deux fois)
+    pending = {}
+    cached = 0
+    for item in sources:
+        if item['error']:
+            continue
+        item['key'] = cache_key(hashlib.sha256(item['content']).hexdigest(), rule_set)
+        item['result'] = cache.get(item['key'])
+        if item['result'] is None:
+            pending.setdefault(item['key'], []).append(item)
+        else:
+            item['content'] = None
+            cached += 1
+
+    def finish(items, parse):
+        result = error = None
+        try:
+            result = parse()
+            cache.set(items[0]['key'], result)
+        except Exception as e:
+            error = f"Erreur lors du traitement du PDF: {str(e)}"
+        for item in items:
+            item['result'], item['error'], item['content'] = result, error, None
+
+    workers = min(settings.BATCH_WORKERS, len(pending))
+    if workers <= 1:
+        # Un seul PDF à parser : pas de pool de processus
+        for items in pending.values():
+            finish(items, lambda: _parse_content(
+                items[0]['content'], rule_set.rules, settings.PDF_EXTRACTION_BACKEND, settings.STATEMENT_PARSER
+            ))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                (items, executor.submit(
+                    _parse_content, items[0]['content'], rule_set.rules,
+                    settings.PDF_EXTRACTION_BACKEND, settings.STATEMENT_PARSER,
+                ))
+                for items in pending.values()
+            ]
+            for items, future in futures:
+                finish(items, future.result)
+
+    logger.info(
+        "Lot de %d relevés (%d parsés, %d en cache, %d en erreur) en %.2fs sur %d processus",
+        len(sources), len(pending), cached, sum(1 for item in sources if item['error']),
+        time.perf_counter() - start, max(workers, 1),
+    )
+
+
+def batch_payload(sources):
+    """
+    Corps JSON combiné d'un lot : bilan par fichier et transactions annotées de leur relevé
+    """
+    files = []
+    transactions = []
+
+    for item in sources:
+        if item['error']:
+            files.append({'source': item['source'], 'success': False, 'message': item['error']})
+            continue
+
+        result = item['result']
+        final_balance = result['final_balance']
+        files.append({
+            'source': item['source'],
+            'success': True,
+            'total_transactions': result['total_transactions'],
+            'final_balance': millimes_to_float(final_balance) if final_balance is not None else None,
+        })
+        transactions.extend(
+            dict(transaction.as_dict(), source=item['source']) for transaction in result['transactions']
+        )
+
+    succeeded = sum(1 for file_data in files if file_data['success'])
+    return {
+        'message': (
+            f"{succeeded} relevé(s) sur {len(files)} traité(s) avec succès ! "
+            f"{len(transactions)} transactions extraites."
+        ),
+        'data': {
+            'total_files': len(files),
+            'succeeded': succeeded,
+            'failed': len(files) - succeeded,
+            'total_transactions': len(transactions),
+            'files': files,
+            'transactions': transactions,
+        },
+    }
+
+
+def batch_rows(sources):
+    """
+    Lignes de l'export fusionné (colonnes BATCH_EXPORT_HEADERS)
+    """
+    for item in sources:
+        if item['error']:
+            continue
+        for transaction in item['result']['transactions']:
+            yield [item['source'], *transaction.as_row()]
@@ -0,0 +1,57 @@
+"""
+Contrôles système de l'application (manage.py check)
+"""
+
+from django.core.checks import Error, Tags, Warning, register
+from django.db import connections
+
+
+@register(Tags.database)
+def check_search_index(app_configs, databases=None, **kwargs):
+    """
+    L'index plein texte des libellés est-il complet ? (voir banktocsv.search)
+
+    Exécuté avec les contrôles de base de données (check --database, migrate).
+    Sous SQLite, une table FTS5 sans ses triggers n'est plus tenue à jour :
+    la recherche renverrait des résultats périmés.
+    """
+    from .search import FTS_TABLE, PG_INDEX, _fts_table_exists, _sqlite_has_fts5, missing_triggers
+
+    errors = []
+    for alias in databases or []:
+        db_connection = connections[alias]
+        table_names = db_connection.introspection.table_names()
+        if 'banktocsv_transaction' not in table_names:
+            # Base pas encore migrée
+            continue
+
+        if db_connection.vendor == 'sqlite':
+            if not _sqlite_has_fts5(db_connection):
+                continue
+            with db_connection.cursor() as cursor:
+                exists = _fts_table_exists(cursor)
+            if not exists:
+                errors.append(Warning(
+                    f"Index plein texte {FTS_TABLE} absent : la recherche parcourt toute la table",
+                    hint="python manage.py banktocsv_search_index",
+                    id='banktocsv.W001',
+                ))
+            elif missing := missing_triggers(db_connection):
+                errors.append(Error(
+                    f"Triggers de l'index plein texte absents ({', '.join(missing)}) : "
+                    "la recherche renvoie des résultats périmés",
+                    hint="python manage.py banktocsv_search_index (recrée les triggers et réindexe)",
+                    id='banktocsv.E001',
+                ))
+
+        elif db_connection.vendor == 'postgresql':
+            with db_connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [PG_INDEX])
+                exists = cursor.fetchone() is not None
+            if not exists:
+                errors.append(Warning(
+                    f"Index plein texte {PG_INDEX} absent : la recherche parcourt toute la table",
+                    hint="python manage.py banktocsv_search_index",
+                    id='banktocsv.W001',
+                ))
+    return errors
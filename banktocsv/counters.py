@@ -0,0 +1,62 @@
+"""
+Compteurs globaux de la page d'accueil (relevés et transactions en base)
+
+Un COUNT(*) sur la table des transactions parcourt toute la table à chaque
+affichage. Les totaux sont donc tenus dans une ligne unique (Counters, id=1),
+ajustée par adjust_counters() dans la transaction qui enregistre ou supprime
+un relevé : la lecture est en temps constant et les compteurs ne divergent
+pas des tables (une écriture annulée annule aussi l'ajustement).
+"""
+
+from django.db import transaction as db_transaction
+from django.db.models import F
+
+from .models import BankStatement, Counters, Transaction
+
+
+COUNTERS_ID = 1
+
+
+def rebuild_counters():
+    """
+    Recalcule les compteurs à partir des tables (COUNT complets)
+
+    Returns:
+        Counters à jour
+    """
+    with db_transaction.atomic():
+        counters, _ = Counters.objects.select_for_update().get_or_create(pk=COUNTERS_ID)
+        counters.total_statements = BankStatement.objects.count()
+        counters.total_transactions = Transaction.objects.count()
+        counters.save()
+    return counters
+
+
+def adjust_counters(statements=0, transactions=0):
+    """
+    Ajoute (ou retire, valeurs négatives) des relevés et des transactions aux compteurs
+
+    À appeler dans le transaction.atomic() de l'écriture correspondante :
+    l'UPDATE verrouille la ligne jusqu'à la fin de cette transaction.
+    """
+    updated = Counters.objects.filter(pk=COUNTERS_ID).update(
+        total_statements=F('total_statements') + statements,
+        total_transactions=F('total_transactions') + transactions,
+    )
+    if not updated:
+        # Ligne absente (supprimée à la main) : la recréer depuis les tables,
+        # qui incluent déjà l'écriture en cours
+        rebuild_counters()
+
+
+def get_counters():
+    """
+    Compteurs globaux, lus en une requête sur une ligne
+
+    Returns:
+        Counters (recalculés si la ligne n'existe pas encore)
+    """
+    counters = Counters.objects.filter(pk=COUNTERS_ID).first()
+    if counters is None:
+        counters = rebuild_counters()
+    return counters
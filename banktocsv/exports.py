@@ -0,0 +1,108 @@
+"""
+Exports CSV et Excel des transactions en streaming
+
+Les lignes sont lues par morceaux (values_list().iterator()) et envoyées au
+fur et à mesure dans une StreamingHttpResponse : la mémoire reste constante
+quelle que soit la taille du relevé et le premier octet part immédiatement.
+"""
+
+import csv
+import io
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from parsers.xlsx_writer import iter_xlsx
+
+
+# En-têtes des colonnes exportées
+EXPORT_HEADERS = ['Date Opération', 'Date Valeur', 'Libellé', 'Débit', 'Crédit']
+
+# Champs du modèle Transaction correspondants
+EXPORT_FIELDS = ('date_operation', 'date_valeur', 'libelle', 'debit', 'credit')
+
+# BOM UTF-8 pour qu'Excel détecte l'encodage
+CSV_BOM = '\ufeff'.encode('utf-8')
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Taille (octets) à partir de laquelle un morceau de CSV est envoyé
+CSV_FLUSH_SIZE = 64 * 1024
+
+
+def statement_rows(bank_statement, chunk_size=None):
+    """
+    Itère sur les transactions d'un relevé sans instancier de modèles
+
+    Args:
+        bank_statement: Relevé bancaire
+        chunk_size: Nombre de lignes lues par requête (EXPORT_CHUNK_SIZE si None)
+
+    Yields:
+        Liste [date opération, date valeur, libellé, débit, crédit]
+    """
+    rows = (
+        bank_statement.transactions
+        .order_by('date_operation', 'id')
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE)
+    )
+    for date_operation, date_valeur, libelle, debit, credit in rows:
+        yield [date_operation, date_valeur, libelle, float(debit), float(credit)]
+
+
+def iter_csv(rows, headers=EXPORT_HEADERS):
+    """
+    Encode des lignes en CSV UTF-8 (avec BOM), par morceaux d'environ CSV_FLUSH_SIZE octets
+
+    Args:
+        rows: Itérable de lignes (séquences de valeurs)
+        headers: En-têtes des colonnes
+
+    Yields:
+        Morceaux de CSV en bytes
+    """
+    buffer = io.StringIO()
+    # Fins de ligne \n, comme l'export pandas d'origine (DataFrame.to_csv)
+    writer = csv.writer(buffer, lineterminator='\n')
+
+    yield CSV_BOM
+    writer.writerow(headers)
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_FLUSH_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def csv_response(rows, filename, headers=EXPORT_HEADERS):
+    """
+    Réponse HTTP streamée d'un export CSV
+
+    Args:
+        rows: Itérable de lignes à exporter
+        filename: Nom du fichier téléchargé (avec extension)
+        headers: En-têtes des colonnes
+    """
+    response = StreamingHttpResponse(iter_csv(rows, headers), content_type='text/csv; charset=utf-8-sig')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def xlsx_response(rows, filename, headers=EXPORT_HEADERS):
+    """
+    Réponse HTTP streamée d'un export Excel (.xlsx)
+
+    Args:
+        rows: Itérable de lignes à exporter
+        filename: Nom du fichier téléchargé (avec extension)
+        headers: En-têtes des colonnes
+    """
+    response = StreamingHttpResponse(iter_xlsx(rows, headers), content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -3,6 +3,8 @@ Formulaires pour l'application BankToCSV
 """
 
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 from .models import BankStatement
 
 
@@ -42,9 +44,11 @@ class BankStatementUploadForm(forms.ModelForm):
             if not pdf_file.name.lower().endswith('.pdf'):
                 raise forms.ValidationError("Le fichier doit être un PDF (.pdf)")
             
-            # Vérifier la taille (limite à 10MB)
-            if pdf_file.size > 10 * 1024 * 1024:
-                raise forms.ValidationError("Le fichier est trop volumineux (max 10MB)")
+            # Vérifier la taille (limite PDF_UPLOAD_MAX_SIZE)
+            if pdf_file.size > settings.PDF_UPLOAD_MAX_SIZE:
+                raise forms.ValidationError(
+                    f"Le fichier est trop volumineux (max {filesizeformat(settings.PDF_UPLOAD_MAX_SIZE)})"
+                )
         
         return pdf_file
     
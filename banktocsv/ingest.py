@@ -0,0 +1,181 @@
+"""
+Écriture en base des transactions extraites d'un relevé
+
+Les transactions sont insérées par lots au lieu d'un INSERT (et d'un commit)
+par ligne : COPY sur PostgreSQL, bulk_create sur les autres bases (SQLite).
+save_statement écrit le relevé et ses transactions dans un même
+transaction.atomic() : tout ou rien. Les compteurs globaux (counters) sont
+ajustés dans la même transaction, à l'enregistrement comme à la suppression
+(remove_statement), ainsi que les agrégats mensuels (aggregates), calculés
+pendant l'insertion des lots.
+"""
+
+import csv
+import io
+import logging
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from django.db import transaction as db_transaction
+
+from parsers.records import millimes_to_decimal
+from parsers.timing import stage
+from .aggregates import add_records, add_statement_totals
+from .counters import adjust_counters
+from .models import Transaction
+
+
+logger = logging.getLogger(__name__)
+
+# Colonnes écrites pour chaque transaction (hors clé étrangère du relevé)
+INGEST_FIELDS = ['date_operation', 'date_valeur', 'libelle', 'debit', 'credit', 'category']
+
+
+def _batches(iterable, size):
+    """
+    Découpe un itérable en listes de `size` éléments au plus
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _transaction_values(record):
+    """
+    Valeurs d'une transaction parsée (TransactionRecord), dans l'ordre de INGEST_FIELDS
+    """
+    return record.as_model_values()
+
+
+def _copy_batch(cursor, table, columns, rows):
+    """
+    Insère un lot de lignes avec COPY FROM STDIN (psycopg 3 ou psycopg2)
+    """
+    raw_cursor = cursor.cursor
+    column_list = ', '.join(connection.ops.quote_name(column) for column in columns)
+    table_name = connection.ops.quote_name(table)
+
+    if hasattr(raw_cursor, 'copy'):
+        # psycopg 3 : les valeurs Python sont adaptées par le driver
+        with raw_cursor.copy(f"COPY {table_name} ({column_list}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:
+        # psycopg2 : CSV entièrement quoté ("" = chaîne vide, jamais NULL)
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        raw_cursor.copy_expert(
+            f"COPY {table_name} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def ingest_transactions(bank_statement, transactions, batch_size=None):
+    """
+    Insère les transactions d'un relevé par lots
+
+    Doit être appelée dans un transaction.atomic() englobant aussi
+    l'enregistrement du relevé.
+
+    Args:
+        bank_statement: Relevé (déjà enregistré) auquel rattacher les transactions
+        transactions: Itérable de TransactionRecord (format du parser)
+        batch_size: Nombre de lignes par lot (INGEST_BATCH_SIZE si None)
+
+    Returns:
+        Dict de statistiques : rows, seconds, rows_per_second, method, et
+        monthly (totaux {(mois, sens): [nombre, millimes]}, voir aggregates)
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    start = time.perf_counter()
+    rows = 0
+    monthly = {}
+
+    if connection.vendor == 'postgresql':
+        method = 'copy'
+        meta = Transaction._meta
+        fields = [meta.get_field(name) for name in INGEST_FIELDS]
+        columns = [meta.get_field('bank_statement').column] + [field.column for field in fields]
+
+        with connection.cursor() as cursor:
+            for batch in _batches(transactions, batch_size):
+                add_records(monthly, batch)
+                # Mêmes conversions que l'ORM (dates, arrondi des décimaux)
+                copy_rows = [
+                    (bank_statement.pk, *(
+                        field.get_db_prep_save(value, connection)
+                        for field, value in zip(fields, _transaction_values(transaction_data))
+                    ))
+                    for transaction_data in batch
+                ]
+                _copy_batch(cursor, meta.db_table, columns, copy_rows)
+                rows += len(copy_rows)
+    else:
+        method = 'bulk_create'
+        for batch in _batches(transactions, batch_size):
+            add_records(monthly, batch)
+            objects = [
+                Transaction(bank_statement=bank_statement, **dict(zip(INGEST_FIELDS, _transaction_values(transaction_data))))
+                for transaction_data in batch
+            ]
+            Transaction.objects.bulk_create(objects, batch_size=batch_size)
+            rows += len(objects)
+
+    seconds = time.perf_counter() - start
+    stats = {
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else float(rows),
+        'method': method,
+        'monthly': monthly,
+    }
+    logger.info(
+        "Ingestion du relevé %s : %d transactions en %.3fs (%.0f lignes/s, %s)",
+        bank_statement.pk, rows, seconds, stats['rows_per_second'], method,
+    )
+    return stats
+
+
+def save_statement(bank_statement, result):
+    """
+    Enregistre un relevé et ses transactions extraites, atomiquement
+
+    Args:
+        bank_statement: Relevé à enregistrer (nom et fichier renseignés)
+        result: Résultat du parser (transactions, final_balance en millimes, total_transactions)
+
+    Returns:
+        Statistiques d'ingestion (voir ingest_transactions)
+    """
+    with stage('db_write'), db_transaction.atomic():
+        created = bank_statement.pk is None
+        bank_statement.total_transactions = result['total_transactions']
+        final_balance = result['final_balance']
+        bank_statement.final_balance = millimes_to_decimal(final_balance) if final_balance is not None else None
+        bank_statement.processed = True
+        bank_statement.save()
+
+        stats = ingest_transactions(bank_statement, result['transactions'])
+        adjust_counters(statements=1 if created else 0, transactions=stats['rows'])
+        add_statement_totals(bank_statement, stats['monthly'])
+        return stats
+
+
+def remove_statement(bank_statement):
+    """
+    Supprime un relevé et ses transactions, atomiquement (le fichier PDF est conservé)
+
+    Args:
+        bank_statement: Relevé à supprimer
+    """
+    with stage('db_write'), db_transaction.atomic():
+        # Transactions réellement en base (index bank_statement, date_operation)
+        transactions = bank_statement.transactions.count()
+        # Transactions et agrégats mensuels supprimés par CASCADE
+        bank_statement.delete()
+        adjust_counters(statements=-1, transactions=-transactions)
@@ -0,0 +1,276 @@
+"""
+File d'attente des jobs de parsing, stockée en base (aucun broker externe)
+
+Les vues déposent un job (PDF + type) et répondent immédiatement avec son
+identifiant. Les workers lancés par `manage.py banktocsv_worker` réclament
+les jobs en attente par un UPDATE conditionnel (un seul worker gagne,
+sur SQLite comme sur PostgreSQL), les exécutent en publiant leur avancement,
+et les relancent en cas d'échec jusqu'à max_attempts. Un job running occupe
+l'un des JOBS_MAX_CONCURRENCY emplacements (slot, unique en base) : deux
+workers ne peuvent pas prendre le même, même simultanément.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from parsers.registry import UnknownStatementError
+from parsers.timing import collect_timings
+
+from .ingest import save_statement
+from .metrics import get_metrics
+from .models import BankStatement, ParseJob
+from .parsing import parse_upload, upload_payload
+from .result_handles import issue_handle
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_job(uploaded_file, kind=ParseJob.KIND_CONVERT, name=''):
+    """
+    Dépose un PDF dans la file d'attente
+
+    Args:
+        uploaded_file: Fichier PDF uploadé
+        kind: ParseJob.KIND_CONVERT ou ParseJob.KIND_STATEMENT
+        name: Nom du relevé (jobs KIND_STATEMENT)
+
+    Returns:
+        ParseJob créé
+    """
+    job = ParseJob(kind=kind, name=name, max_attempts=settings.JOBS_MAX_ATTEMPTS)
+    job.pdf_file.save(uploaded_file.name, uploaded_file, save=False)
+    job.save()
+    return job
+
+
+def claim_job():
+    """
+    Réclame le plus ancien job en attente, dans la limite de JOBS_MAX_CONCURRENCY
+
+    Le job prend un emplacement libre dans le même UPDATE qui le passe à
+    l'état running ; la contrainte d'unicité des emplacements fait échouer
+    l'UPDATE d'un worker concurrent qui aurait choisi le même.
+
+    Returns:
+        ParseJob passé à l'état running, ou None s'il n'y a rien à faire
+    """
+    taken = set(ParseJob.objects.filter(slot__isnull=False).values_list('slot', flat=True))
+    free = [slot for slot in range(settings.JOBS_MAX_CONCURRENCY) if slot not in taken]
+    if not free:
+        return None
+
+    candidates = (
+        ParseJob.objects.filter(status=ParseJob.STATUS_PENDING)
+        .order_by('created_at')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        while free:
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    # Seul le worker dont l'UPDATE modifie la ligne obtient le job
+                    claimed = ParseJob.objects.filter(id=job_id, status=ParseJob.STATUS_PENDING).update(
+                        status=ParseJob.STATUS_RUNNING,
+                        slot=free[0],
+                        attempts=F('attempts') + 1,
+                        pages_done=0,
+                        started_at=now,
+                        heartbeat_at=now,
+                    )
+            except IntegrityError:
+                # Emplacement pris entre-temps par un autre worker
+                free.pop(0)
+                continue
+            if claimed:
+                return ParseJob.objects.get(id=job_id)
+            # Job réclamé par un autre worker : candidat suivant
+            break
+
+    return None
+
+
+def _heartbeat(job):
+    """
+    Signe de vie d'un job : un job sans signe de vie depuis JOBS_STALE_AFTER
+    secondes est remis en file (voir cleanup_jobs)
+    """
+    ParseJob.objects.filter(id=job.id).update(heartbeat_at=timezone.now())
+
+
+def _parse_job(job, progress_callback):
+    with job.pdf_file.open('rb') as pdf_file:
+        # Hors requête web : l'extraction des longs relevés est répartie sur plusieurs processus
+        result = parse_upload(pdf_file, progress_callback=progress_callback, workers=settings.JOBS_PARSER_WORKERS)
+    # Résultat servi par le cache : aucune page lue, donc aucun appel de progress_callback
+    _heartbeat(job)
+    return result
+
+
+def _save_job_statement(job, result):
+    """
+    Enregistre le relevé d'un job, une seule fois par job
+
+    Le relevé est lié au job dans la même transaction que son enregistrement,
+    par un UPDATE conditionnel : si un autre worker (job remis en file alors
+    qu'il était encore en cours) l'a déjà lié, cet enregistrement est annulé
+    et le relevé existant est retourné.
+
+    Returns:
+        BankStatement du job
+    """
+    with transaction.atomic():
+        bank_statement = BankStatement(name=job.name, pdf_file=job.pdf_file.name)
+        save_statement(bank_statement, result)
+        linked = ParseJob.objects.filter(id=job.id, bank_statement__isnull=True).update(
+            bank_statement=bank_statement, heartbeat_at=timezone.now()
+        )
+        if not linked:
+            transaction.set_rollback(True)
+    if linked:
+        return bank_statement
+    return ParseJob.objects.select_related('bank_statement').get(id=job.id).bank_statement
+
+
+def run_job(job):
+    """
+    Exécute un job réclamé et enregistre son résultat ou son erreur
+
+    Args:
+        job: ParseJob à l'état running
+    """
+    def on_progress(pages_done, pages_total):
+        ParseJob.objects.filter(id=job.id).update(
+            pages_done=pages_done, pages_total=pages_total, heartbeat_at=timezone.now()
+        )
+
+    try:
+        if job.kind == ParseJob.KIND_STATEMENT:
+            # Relevé déjà enregistré par une tentative précédente, interrompue
+            # avant la fin du job : il n'est pas enregistré une seconde fois
+            bank_statement = job.bank_statement
+            if bank_statement is None:
+                bank_statement = _save_job_statement(job, _parse_job(job, on_progress))
+            # Le PDF du job devient celui du relevé
+            job.bank_statement = bank_statement
+            job.pdf_file = ''
+            job.result = {
+                'message': f"Relevé traité avec succès ! {bank_statement.total_transactions} transactions extraites.",
+                'statement_id': bank_statement.id,
+                'total_transactions': bank_statement.total_transactions,
+            }
+        else:
+            result = _parse_job(job, on_progress)
+            # Le PDF d'une conversion n'est plus utile une fois le résultat stocké
+            job.pdf_file.delete(save=False)
+            job.pdf_file = ''
+            job.result = upload_payload(result)
+
+        job.status = ParseJob.STATUS_SUCCEEDED
+        job.error = ''
+
+    except UnknownStatementError as e:
+        # Document non reconnu : une nouvelle tentative échouerait de même
+        logger.warning("Job %s : %s", job.id, e)
+        job.error = str(e)
+        job.status = ParseJob.STATUS_FAILED
+
+    except Exception as e:
+        logger.exception("Échec du job %s (tentative %d/%d)", job.id, job.attempts, job.max_attempts)
+        job.error = f"Erreur lors du traitement du PDF: {str(e)}"
+        job.status = ParseJob.STATUS_PENDING if job.attempts < job.max_attempts else ParseJob.STATUS_FAILED
+
+    if job.status != ParseJob.STATUS_PENDING:
+        job.finished_at = timezone.now()
+    # Emplacement libéré pour le job suivant
+    job.slot = None
+    job.save(update_fields=['status', 'result', 'error', 'pdf_file', 'bank_statement', 'slot', 'finished_at'])
+
+
+def cleanup_jobs():
+    """
+    Remet en file les jobs abandonnés par un worker arrêté et supprime les jobs
+    terminés depuis plus de JOBS_RETENTION secondes
+
+    Returns:
+        Tuple (jobs remis en file ou échoués, jobs supprimés)
+    """
+    now = timezone.now()
+
+    # Jobs sans signe de vie : le worker a été arrêté en cours de traitement
+    stale = ParseJob.objects.filter(
+        status=ParseJob.STATUS_RUNNING,
+        heartbeat_at__lt=now - timedelta(seconds=settings.JOBS_STALE_AFTER),
+    )
+    recovered = stale.filter(attempts__lt=F('max_attempts')).update(status=ParseJob.STATUS_PENDING, slot=None)
+    recovered += stale.update(
+        status=ParseJob.STATUS_FAILED, slot=None, error="Traitement interrompu", finished_at=now
+    )
+
+    # Jobs terminés au-delà de la durée de rétention
+    expired = ParseJob.objects.filter(
+        status__in=[ParseJob.STATUS_SUCCEEDED, ParseJob.STATUS_FAILED],
+        finished_at__lt=now - timedelta(seconds=settings.JOBS_RETENTION),
+    )
+    for job in expired.exclude(pdf_file='').only('id', 'pdf_file'):
+        job.pdf_file.delete(save=False)
+    deleted, _ = expired.delete()
+
+    return recovered, deleted
+
+
+def work(should_stop=lambda: False):
+    """
+    Boucle d'un worker : réclame et exécute les jobs jusqu'à should_stop()
+
+    Args:
+        should_stop: Fonction appelée entre deux jobs pour savoir s'il faut s'arrêter
+    """
+    last_cleanup = 0.0
+
+    while not should_stop():
+        if time.monotonic() - last_cleanup >= settings.JOBS_CLEANUP_INTERVAL:
+            cleanup_jobs()
+            last_cleanup = time.monotonic()
+
+        job = claim_job()
+        if job is None:
+            time.sleep(settings.JOBS_POLL_INTERVAL)
+            continue
+
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            run_job(job)
+        elapsed = time.perf_counter() - started
+        get_metrics().observe(timings, view=f"job:{job.kind}", total=elapsed)
+        logger.info("Job %s : %s en %.2fs (%s)", job.id, job.status, elapsed, timings.server_timing())
+
+
+def job_payload(job):
+    """
+    Représentation JSON d'un job pour l'API de suivi
+    """
+    payload = {
+        'id': str(job.id),
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'pages_done': job.pages_done,
+        'pages_total': job.pages_total,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'error': job.error,
+    }
+    if job.status == ParseJob.STATUS_SUCCEEDED:
+        payload['result'] = job.result
+        if job.kind == ParseJob.KIND_CONVERT and job.result:
+            # Le téléchargement désigne le résultat conservé en base, sans le renvoyer
+            payload['result'] = dict(job.result, result_token=issue_handle(job_id=job.id))
+    return payload
@@ -0,0 +1,222 @@
+"""
+Convertit en masse les relevés PDF d'une arborescence, sans passer par les vues
+
+Les résultats de parsing sont conservés dans un répertoire d'état, indexés par
+l'empreinte SHA-256 du PDF (+ versions du parser et des règles) : un fichier
+dont le contenu a déjà été converti n'est pas reparsé, ce qui permet de
+reprendre une conversion interrompue.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from banktocsv.batch import BATCH_EXPORT_HEADERS, rule_set_for
+from banktocsv.exports import EXPORT_HEADERS, iter_csv
+from banktocsv.parse_cache import ParseResultCache, cache_key, hash_upload
+from banktocsv.rules import get_rule_set
+from parsers.records import balance_row
+from parsers.registry import select_parser
+from parsers.xlsx_writer import iter_xlsx
+
+
+# Répertoire d'état créé à la racine de l'arborescence convertie
+STATE_DIR_NAME = '.banktocsv_convert'
+
+OUTPUT_EXTENSIONS = {'csv': '.csv', 'excel': '.xlsx'}
+
+
+def _write_atomic(path, chunks):
+    """
+    Écrit un fichier à partir de morceaux d'octets, sous un nom temporaire puis renommé :
+    un fichier de sortie présent est toujours complet
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as output_file:
+        for chunk in chunks:
+            output_file.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def _write_output(result, output_path, format_type):
+    """
+    Écrit l'export d'un relevé (colonnes EXPORT_HEADERS, suivies de la ligne du solde final)
+    """
+    def rows():
+        for transaction in result['transactions']:
+            yield transaction.as_row()
+        final_row = balance_row(result['final_balance'])
+        if final_row is not None:
+            yield final_row
+
+    if format_type == 'excel':
+        chunks = iter_xlsx(rows(), EXPORT_HEADERS)
+    else:
+        chunks = iter_csv(rows(), EXPORT_HEADERS)
+    _write_atomic(output_path, chunks)
+
+
+def _convert_file(path, key, state_dir, rules, backend, parser_name, output_path, format_type):
+    """
+    Parse un PDF dans un processus du pool, avec le parser de sa banque,
+    enregistre le résultat dans le répertoire d'état et écrit l'export à
+    côté du fichier si demandé
+
+    Returns:
+        Tuple (nombre de pages, nombre de transactions)
+    """
+    parser_class = select_parser(path, parser_name, backend)
+    parser = parser_class(rule_set=rule_set_for(rules), backend=backend)
+    result = parser.parse_pdf(path)
+
+    ParseResultCache(max_entries=1, disk_dir=state_dir).set(key, result)
+    if output_path:
+        _write_output(result, output_path, format_type)
+
+    return parser.page_count, result['total_transactions']
+
+
+def find_pdfs(root):
+    """
+    Liste les PDF d'une arborescence, triés (le répertoire d'état est ignoré)
+    """
+    paths = []
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(name for name in subdirectories if name != STATE_DIR_NAME)
+        paths.extend(
+            os.path.join(directory, filename)
+            for filename in sorted(filenames)
+            if filename.lower().endswith('.pdf')
+        )
+    return paths
+
+
+class Command(BaseCommand):
+    help = "Convertit en CSV/Excel tous les relevés PDF d'un répertoire (reprise possible)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="Répertoire contenant les relevés PDF (parcouru récursivement)")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Nombre de processus de conversion (défaut: BATCH_WORKERS)")
+        parser.add_argument('--format', choices=sorted(OUTPUT_EXTENSIONS), default='csv',
+                            help="Format des fichiers écrits à côté de chaque PDF (défaut: csv)")
+        parser.add_argument('--merged', default=None,
+                            help="Écrit un seul fichier fusionné (.csv ou .xlsx) au lieu d'un fichier par PDF")
+        parser.add_argument('--force', action='store_true',
+                            help="Reconvertit tous les fichiers, même ceux déjà convertis")
+
+    def handle(self, *args, **options):
+        root = os.path.abspath(options['directory'])
+        if not os.path.isdir(root):
+            raise CommandError(f"Répertoire introuvable : {root}")
+
+        merged = options['merged']
+        format_type = options['format']
+        if merged:
+            format_type = 'excel' if merged.lower().endswith('.xlsx') else 'csv'
+        workers = max(1, options['workers'] or settings.BATCH_WORKERS)
+
+        def output_for(path):
+            # Fichier écrit à côté du PDF (aucun en mode fusionné)
+            return None if merged else os.path.splitext(path)[0] + OUTPUT_EXTENSIONS[format_type]
+
+        state_dir = os.path.join(root, STATE_DIR_NAME)
+        cache = ParseResultCache(max_entries=1, disk_dir=state_dir)
+        rule_set = get_rule_set()
+
+        paths = find_pdfs(root)
+        keys = {}
+        to_parse = {}
+        skipped = 0
+
+        for path in paths:
+            with open(path, 'rb') as pdf_file:
+                key = keys[path] = cache_key(hash_upload(File(pdf_file)), rule_set)
+            output_path = output_for(path)
+
+            if not options['force'] and cache.contains(key):
+                # Contenu déjà converti : seule la sortie manquante éventuelle est réécrite
+                if output_path and not os.path.exists(output_path):
+                    _write_output(cache.get(key), output_path, format_type)
+                skipped += 1
+            elif key in to_parse:
+                # Même contenu qu'un autre fichier du lot : parsé une seule fois
+                to_parse[key][1].append(path)
+            else:
+                to_parse[key] = (path, [])
+
+        self.stdout.write(
+            f"{len(paths)} PDF trouvé(s), {skipped} déjà converti(s), "
+            f"{len(to_parse)} à convertir avec {workers} processus"
+        )
+
+        start = time.perf_counter()
+        pages = transactions = converted = failed = 0
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    _convert_file, path, key, state_dir, rule_set.rules, settings.PDF_EXTRACTION_BACKEND,
+                    settings.STATEMENT_PARSER, output_for(path), format_type
+                ): (path, duplicates)
+                for key, (path, duplicates) in to_parse.items()
+            }
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                path, duplicates = futures[future]
+                relative_path = os.path.relpath(path, root)
+                try:
+                    page_count, transaction_count = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"[{done}/{len(futures)}] {relative_path} : {str(e)}")
+                    continue
+
+                converted += 1
+                pages += page_count
+                transactions += transaction_count
+                self.stdout.write(
+                    f"[{done}/{len(futures)}] {relative_path} : {transaction_count} transactions, {page_count} pages"
+                )
+
+                for duplicate in duplicates:
+                    if output_for(duplicate):
+                        _write_output(cache.get(keys[duplicate]), output_for(duplicate), format_type)
+                    skipped += 1
+
+        elapsed = time.perf_counter() - start
+
+        if merged:
+            self._write_merged(merged, format_type, root, paths, keys, cache)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{converted} converti(s), {skipped} ignoré(s) (déjà convertis), {failed} en erreur "
+            f"en {elapsed:.2f}s : {pages / elapsed if elapsed else 0:.1f} pages/s, "
+            f"{transactions / elapsed if elapsed else 0:.0f} transactions/s"
+        ))
+
+    def _write_merged(self, merged, format_type, root, paths, keys, cache):
+        """
+        Écrit le fichier fusionné à partir des résultats du répertoire d'état,
+        un relevé à la fois, avec le chemin relatif du PDF en première colonne
+        """
+        def rows():
+            for path in paths:
+                result = cache.get(keys[path])
+                if result is None:
+                    continue
+                source = os.path.relpath(path, root)
+                for transaction in result['transactions']:
+                    yield [source, *transaction.as_row()]
+
+        if format_type == 'excel':
+            chunks = iter_xlsx(rows(), BATCH_EXPORT_HEADERS)
+        else:
+            chunks = iter_csv(rows(), BATCH_EXPORT_HEADERS)
+        _write_atomic(merged, chunks)
+
+        self.stdout.write(f"Fichier fusionné écrit : {merged}")
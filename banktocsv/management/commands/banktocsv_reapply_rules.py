@@ -0,0 +1,31 @@
+"""
+Réapplique les règles de classification aux transactions déjà stockées
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from banktocsv.rules import reapply_rules
+
+
+class Command(BaseCommand):
+    help = "Réapplique les règles de débit/crédit et de catégorie aux transactions stockées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Nombre de transactions mises à jour par lot (défaut: 1000)")
+        parser.add_argument('--statement', type=int, default=None,
+                            help="Limiter à un relevé (id)")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        scanned, updated = reapply_rules(
+            batch_size=options['batch_size'],
+            statement_id=options['statement'],
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{updated} transaction(s) mise(s) à jour sur {scanned} examinée(s) en {elapsed:.2f}s"
+        ))
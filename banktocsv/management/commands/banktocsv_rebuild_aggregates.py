@@ -0,0 +1,25 @@
+"""
+Recalcule les agrégats mensuels (relevé, mois, sens) à partir des transactions stockées
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from banktocsv.aggregates import rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recalcule les totaux mensuels de débits et crédits par relevé à partir des transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--statement', type=int, default=None,
+                            help="Limiter à un relevé (id)")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = rebuild_aggregates(statement_id=options['statement'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} agrégat(s) mensuel(s) recalculé(s) en {time.perf_counter() - start:.2f}s"
+        ))
@@ -0,0 +1,22 @@
+"""
+(Re)crée l'index plein texte des libellés et réindexe les transactions stockées
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from banktocsv.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = "Crée l'index plein texte des libellés (FTS5 ou GIN) et réindexe les transactions"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if not install_search_index(rebuild=True):
+            raise CommandError("Pas d'index plein texte pour cette base (recherche par icontains)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Index plein texte réindexé en {time.perf_counter() - start:.2f}s"
+        ))
@@ -0,0 +1,60 @@
+"""
+Lance un pool de workers locaux qui exécutent les jobs de parsing en attente
+"""
+
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from banktocsv.jobs import work
+
+
+def _worker_main(stop_event):
+    """
+    Point d'entrée d'un processus worker
+    """
+    # Le parent gère Ctrl+C : le worker termine son job en cours puis s'arrête
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    work(should_stop=stop_event.is_set)
+
+
+class Command(BaseCommand):
+    help = "Exécute les jobs de parsing en arrière-plan avec un pool de processus locaux"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Nombre de processus workers (défaut: JOBS_MAX_CONCURRENCY)")
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency'] or settings.JOBS_MAX_CONCURRENCY
+
+        # Chaque processus ouvre ses propres connexions à la base
+        connections.close_all()
+
+        stop_event = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=_worker_main, args=(stop_event,), name=f"banktocsv-worker-{i}")
+            for i in range(concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+
+        self.stdout.write(f"{concurrency} worker(s) démarré(s), Ctrl+C pour arrêter")
+
+        def request_stop(signum, frame):
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt des workers après leur job en cours...")
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write(self.style.SUCCESS("Workers arrêtés"))
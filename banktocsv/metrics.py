@@ -0,0 +1,135 @@
+"""
+Métriques de latence agrégées en mémoire, exposées au format texte Prometheus
+
+Chaque requête (et chaque job exécuté par un worker) alimente, pour chaque
+étape mesurée (parsers.timing), un résumé : nombre d'observations, somme,
+et quantiles p50/p95/p99 calculés sur les METRICS_WINDOW dernières
+observations. Les compteurs (pages et transactions traitées, pages non lues
+après le solde final...) sont cumulés.
+
+Les métriques sont propres à chaque processus (aucun service externe) : avec
+plusieurs workers gunicorn, /metrics reflète le worker qui répond.
+"""
+
+import math
+import threading
+from collections import deque
+
+from django.conf import settings
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Description des compteurs de parsers.timing.count()
+COUNTER_HELP = {
+    'pages_processed': "Pages lues",
+    'pages_cropped': "Pages lues dans la seule zone du tableau",
+    'pages_skipped': "Pages non lues, situées après le solde final",
+    'transactions_processed': "Transactions extraites",
+}
+
+
+class LatencySummary:
+    """
+    Observations d'une durée : total depuis le démarrage et fenêtre glissante pour les quantiles
+    """
+
+    def __init__(self, window):
+        self.count = 0
+        self.sum = 0.0
+        self._window = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self._window.append(seconds)
+
+    def quantile(self, q):
+        """
+        Quantile (méthode du rang le plus proche) des observations de la fenêtre
+        """
+        if not self._window:
+            return float('nan')
+        values = sorted(self._window)
+        return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+class MetricsRegistry:
+    """
+    Résumés de latence par étape et par vue, et compteurs
+    """
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._stages = {}
+        self._views = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, timings, view=None, total=None):
+        """
+        Enregistre les durées d'étapes et compteurs d'un traitement (StageTimings)
+
+        Args:
+            view: Nom de la vue (requêtes HTTP) ou du type de job
+            total: Durée totale du traitement (secondes)
+        """
+        with self._lock:
+            for name, seconds in timings.durations.items():
+                self._summary(self._stages, name).observe(seconds)
+            for name, value in timings.counts.items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            if view is not None and total is not None:
+                self._summary(self._views, view).observe(total)
+
+    def _summary(self, summaries, name):
+        if name not in summaries:
+            summaries[name] = LatencySummary(self.window)
+        return summaries[name]
+
+    def render(self):
+        """
+        Métriques au format d'exposition texte de Prometheus
+        """
+        lines = []
+        with self._lock:
+            self._render_summaries(
+                lines, 'banktocsv_stage_duration_seconds', 'stage', self._stages,
+                "Durée de chaque étape du traitement (ouverture du PDF, extraction, parsing, base...)",
+            )
+            self._render_summaries(
+                lines, 'banktocsv_request_duration_seconds', 'view', self._views,
+                "Durée totale des requêtes et des jobs, par vue",
+            )
+            for name, value in sorted(self._counters.items()):
+                metric = f"banktocsv_{name}_total"
+                lines.append(f"# HELP {metric} {COUNTER_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_summaries(lines, metric, label, summaries, help_text):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} summary")
+        for name, summary in sorted(summaries.items()):
+            for q in QUANTILES:
+                lines.append(f'{metric}{{{label}="{name}",quantile="{q}"}} {summary.quantile(q):.6f}')
+            lines.append(f'{metric}_sum{{{label}="{name}"}} {summary.sum:.6f}')
+            lines.append(f'{metric}_count{{{label}="{name}"}} {summary.count}')
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    Retourne le registre de métriques du processus, créé au premier appel
+    """
+    global _registry
+
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry(window=settings.METRICS_WINDOW)
+        return _registry
@@ -0,0 +1,34 @@
+"""
+Middleware de mesure des étapes de traitement des requêtes
+"""
+
+import time
+
+from parsers.timing import collect_timings
+from .metrics import get_metrics
+
+
+class ServerTimingMiddleware:
+    """
+    Mesure les étapes de chaque requête (voir parsers.timing), les renvoie dans
+    l'en-tête Server-Timing et les agrège dans les métriques du processus
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with collect_timings() as timings:
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        if match is not None and match.url_name != 'metrics':
+            get_metrics().observe(timings, view=match.view_name, total=total)
+
+        # Pour une réponse streamée, seule la préparation est mesurée
+        timings.add('total', total)
+        response['Server-Timing'] = timings.server_timing()
+
+        return response
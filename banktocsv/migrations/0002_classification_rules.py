@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificationRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=100, verbose_name='Mot-clé du libellé')),
+                ('direction', models.CharField(blank=True, choices=[('', 'Aucun'), ('debit', 'Débit'), ('credit', 'Crédit')], default='', max_length=6, verbose_name='Sens')),
+                ('category', models.CharField(blank=True, default='', max_length=100, verbose_name='Catégorie')),
+                ('position', models.IntegerField(default=0, verbose_name='Priorité')),
+                ('active', models.BooleanField(default=True, verbose_name='Active')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifiée le')),
+            ],
+            options={
+                'verbose_name': 'Règle de classification',
+                'verbose_name_plural': 'Règles de classification',
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='category',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Catégorie'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:40
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0002_classification_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParseJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('convert', 'Conversion'), ('statement', 'Relevé enregistré')], default='convert', max_length=10, verbose_name='Type')),
+                ('name', models.CharField(blank=True, default='', max_length=255, verbose_name='Nom du relevé')),
+                ('pdf_file', models.FileField(blank=True, upload_to='parse_jobs/', verbose_name='Fichier PDF')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('succeeded', 'Terminé'), ('failed', 'Échoué')], default='pending', max_length=10, verbose_name='Statut')),
+                ('pages_done', models.IntegerField(default=0, verbose_name='Pages traitées')),
+                ('pages_total', models.IntegerField(default=0, verbose_name='Nombre de pages')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Tentatives')),
+                ('max_attempts', models.IntegerField(default=3, verbose_name='Tentatives maximales')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Résultat')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Erreur')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Créé le')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Démarré le')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernière activité')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')),
+                ('bank_statement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='parse_jobs', to='banktocsv.bankstatement')),
+            ],
+            options={
+                'verbose_name': 'Job de parsing',
+                'verbose_name_plural': 'Jobs de parsing',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='banktocsv_p_status_0404e9_idx')],
+            },
+        ),
+    ]
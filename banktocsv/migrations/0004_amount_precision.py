@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0003_parse_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bankstatement',
+            name='final_balance',
+            field=models.DecimalField(blank=True, decimal_places=3, max_digits=15, null=True, verbose_name='Solde final'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='credit',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=15, verbose_name='Crédit'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='debit',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=15, verbose_name='Débit'),
+        ),
+    ]
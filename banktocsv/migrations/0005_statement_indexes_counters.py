@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    """
+    Initialise les compteurs à partir des relevés déjà en base
+    """
+    BankStatement = apps.get_model('banktocsv', 'BankStatement')
+    Transaction = apps.get_model('banktocsv', 'Transaction')
+    Counters = apps.get_model('banktocsv', 'Counters')
+    Counters.objects.update_or_create(pk=1, defaults={
+        'total_statements': BankStatement.objects.count(),
+        'total_transactions': Transaction.objects.count(),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0004_amount_precision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_statements', models.BigIntegerField(default=0, verbose_name='Nombre de relevés')),
+                ('total_transactions', models.BigIntegerField(default=0, verbose_name='Nombre de transactions')),
+            ],
+            options={
+                'verbose_name': 'Compteurs',
+                'verbose_name_plural': 'Compteurs',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bankstatement',
+            index=models.Index(fields=['uploaded_at'], name='banktocsv_b_uploade_a04b9d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['bank_statement', 'date_operation'], name='banktocsv_t_bank_st_79b9b0_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0005_statement_indexes_counters'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='banktocsv_t_bank_st_79b9b0_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['bank_statement', 'date_operation', 'id'], name='banktocsv_t_bank_st_ceea99_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date_operation', 'id'], name='banktocsv_t_date_op_dac9f7_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+from django.db import migrations
+
+
+# Schéma figé à la date de la migration (banktocsv.search peut évoluer)
+FTS_TABLE = 'banktocsv_transaction_fts'
+PG_INDEX = 'banktocsv_transaction_libelle_fts'
+
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        libelle, content='banktocsv_transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON banktocsv_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, libelle) VALUES (new.id, new.libelle);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON banktocsv_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, libelle) VALUES ('delete', old.id, old.libelle);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF libelle ON banktocsv_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, libelle) VALUES ('delete', old.id, old.libelle);
+        INSERT INTO {FTS_TABLE}(rowid, libelle) VALUES (new.id, new.libelle);
+    END""",
+    # Indexe les transactions déjà en base
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+PG_SCHEMA = [
+    f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON banktocsv_transaction USING gin (to_tsvector('simple', libelle))",
+]
+
+PG_DROP = [f"DROP INDEX IF EXISTS {PG_INDEX}"]
+
+
+def _sqlite_has_fts5(cursor):
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    if cursor.fetchone()[0]:
+        return True
+    cursor.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")
+    return cursor.fetchone() is not None
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Crée l'index plein texte (SQLite sans FTS5 et autres bases : recherche par icontains)
+    """
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite' and _sqlite_has_fts5(cursor):
+            statements = SQLITE_SCHEMA
+        elif vendor == 'postgresql':
+            statements = PG_SCHEMA
+        else:
+            statements = []
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': PG_DROP}.get(schema_editor.connection.vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0006_transaction_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+
+def fill_aggregates(apps, schema_editor):
+    """
+    Calcule les agrégats mensuels des transactions déjà en base
+    """
+    Transaction = apps.get_model('banktocsv', 'Transaction')
+    MonthlyAggregate = apps.get_model('banktocsv', 'MonthlyAggregate')
+    groups = (
+        Transaction.objects
+        .annotate(
+            month=TruncMonth('date_operation'),
+            direction=Case(When(credit__gt=0, then=Value('credit')), default=Value('debit')),
+        )
+        .values('bank_statement_id', 'month', 'direction')
+        .annotate(transaction_count=Count('id'), total=Sum(F('debit') + F('credit')))
+        .order_by()
+    )
+    MonthlyAggregate.objects.bulk_create(
+        (MonthlyAggregate(**group) for group in groups.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0007_transaction_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Mois (premier jour)')),
+                ('direction', models.CharField(choices=[('debit', 'Débit'), ('credit', 'Crédit')], max_length=6, verbose_name='Sens')),
+                ('transaction_count', models.BigIntegerField(default=0, verbose_name='Nombre de transactions')),
+                ('total', models.DecimalField(decimal_places=3, default=0, max_digits=18, verbose_name='Montant total')),
+                ('bank_statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_aggregates', to='banktocsv.bankstatement')),
+            ],
+            options={
+                'verbose_name': 'Agrégat mensuel',
+                'verbose_name_plural': 'Agrégats mensuels',
+                'ordering': ['month', 'direction'],
+                'indexes': [models.Index(fields=['month', 'direction'], name='banktocsv_m_month_d12b84_idx')],
+                'constraints': [models.UniqueConstraint(fields=('bank_statement', 'month', 'direction'), name='banktocsv_monthly_aggregate_key')],
+            },
+        ),
+        migrations.RunPython(fill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0008_monthly_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversionResult',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Clé')),
+                ('transactions', models.JSONField(verbose_name='Transactions')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Émis le')),
+            ],
+            options={
+                'verbose_name': 'Résultat de conversion',
+                'verbose_name_plural': 'Résultats de conversion',
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0009_conversion_results'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parsejob',
+            name='slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Emplacement'),
+        ),
+        migrations.AddConstraint(
+            model_name='parsejob',
+            constraint=models.UniqueConstraint(fields=('slot',), name='banktocsv_parse_job_slot'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('banktocsv', '0010_parse_job_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionSearch',
+            fields=[
+                ('transaction', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='banktocsv.transaction')),
+                ('libelle', models.TextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'banktocsv_transaction_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.utils import timezone
 
@@ -10,13 +12,16 @@ class BankStatement(models.Model):
     pdf_file = models.FileField(upload_to='bank_statements/', verbose_name="Fichier PDF")
     uploaded_at = models.DateTimeField(default=timezone.now, verbose_name="Date d'upload")
     total_transactions = models.IntegerField(default=0, verbose_name="Nombre de transactions")
-    final_balance = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True, verbose_name="Solde final")
+    final_balance = models.DecimalField(max_digits=15, decimal_places=3, null=True, blank=True, verbose_name="Solde final")
     processed = models.BooleanField(default=False, verbose_name="Traité")
     
     class Meta:
         verbose_name = "Relevé bancaire"
         verbose_name_plural = "Relevés bancaires"
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['uploaded_at']),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.uploaded_at.strftime('%d/%m/%Y %H:%M')}"
@@ -30,13 +35,203 @@ class Transaction(models.Model):
     date_operation = models.DateField(verbose_name="Date opération")
     date_valeur = models.DateField(verbose_name="Date valeur")
     libelle = models.TextField(verbose_name="Libellé")
-    debit = models.DecimalField(max_digits=15, decimal_places=2, default=0, verbose_name="Débit")
-    credit = models.DecimalField(max_digits=15, decimal_places=2, default=0, verbose_name="Crédit")
+    debit = models.DecimalField(max_digits=15, decimal_places=3, default=0, verbose_name="Débit")
+    credit = models.DecimalField(max_digits=15, decimal_places=3, default=0, verbose_name="Crédit")
+    category = models.CharField(max_length=100, blank=True, default='', verbose_name="Catégorie")
     
     class Meta:
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
         ordering = ['date_operation']
+        indexes = [
+            # Transactions d'un relevé dans l'ordre des dates, sans tri ; id
+            # départage les dates égales (pagination par clé de l'API)
+            models.Index(fields=['bank_statement', 'date_operation', 'id']),
+            models.Index(fields=['date_operation', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.date_operation} - {self.libelle[:50]}"
+
+
+class TransactionSearch(models.Model):
+    """
+    Index plein texte SQLite des libellés : table virtuelle FTS5 créée et
+    alimentée par la base (migration 0007, triggers), lue par banktocsv.search
+
+    Non gérée par Django : elle n'existe que sous SQLite avec FTS5. rank est
+    la colonne cachée de FTS5 (bm25, plus négatif = plus pertinent).
+    """
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search'
+    )
+    libelle = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'banktocsv_transaction_fts'
+
+
+class Counters(models.Model):
+    """
+    Compteurs globaux (une seule ligne, id=1), tenus à jour dans la même
+    transaction que l'enregistrement ou la suppression d'un relevé
+    """
+    total_statements = models.BigIntegerField(default=0, verbose_name="Nombre de relevés")
+    total_transactions = models.BigIntegerField(default=0, verbose_name="Nombre de transactions")
+    
+    class Meta:
+        verbose_name = "Compteurs"
+        verbose_name_plural = "Compteurs"
+    
+    def __str__(self):
+        return f"{self.total_statements} relevés, {self.total_transactions} transactions"
+
+
+class MonthlyAggregate(models.Model):
+    """
+    Totaux mensuels d'un relevé par sens (débit/crédit), tenus à jour dans la
+    transaction qui enregistre, reclasse ou supprime (CASCADE) ses transactions
+    """
+    DIRECTION_CHOICES = [
+        ('debit', 'Débit'),
+        ('credit', 'Crédit'),
+    ]
+
+    bank_statement = models.ForeignKey(BankStatement, on_delete=models.CASCADE, related_name='monthly_aggregates')
+    month = models.DateField(verbose_name="Mois (premier jour)")
+    direction = models.CharField(max_length=6, choices=DIRECTION_CHOICES, verbose_name="Sens")
+    transaction_count = models.BigIntegerField(default=0, verbose_name="Nombre de transactions")
+    total = models.DecimalField(max_digits=18, decimal_places=3, default=0, verbose_name="Montant total")
+
+    class Meta:
+        verbose_name = "Agrégat mensuel"
+        verbose_name_plural = "Agrégats mensuels"
+        ordering = ['month', 'direction']
+        constraints = [
+            models.UniqueConstraint(fields=['bank_statement', 'month', 'direction'], name='banktocsv_monthly_aggregate_key'),
+        ]
+        indexes = [
+            # Totaux tous relevés confondus, par période
+            models.Index(fields=['month', 'direction']),
+        ]
+
+    def __str__(self):
+        return f"{self.bank_statement_id} {self.month:%Y-%m} {self.direction} : {self.total}"
+
+
+class ClassificationRule(models.Model):
+    """
+    Règle de classification des transactions (sens débit/crédit et catégorie)
+    Lorsque la table contient des règles actives, elles remplacent les règles par défaut du parser
+    """
+    DIRECTION_CHOICES = [
+        ('', 'Aucun'),
+        ('debit', 'Débit'),
+        ('credit', 'Crédit'),
+    ]
+    
+    keyword = models.CharField(max_length=100, verbose_name="Mot-clé du libellé")
+    direction = models.CharField(max_length=6, choices=DIRECTION_CHOICES, blank=True, default='', verbose_name="Sens")
+    category = models.CharField(max_length=100, blank=True, default='', verbose_name="Catégorie")
+    position = models.IntegerField(default=0, verbose_name="Priorité")
+    active = models.BooleanField(default=True, verbose_name="Active")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifiée le")
+    
+    class Meta:
+        verbose_name = "Règle de classification"
+        verbose_name_plural = "Règles de classification"
+        ordering = ['position', 'id']
+    
+    def __str__(self):
+        return f"{self.keyword} → {self.direction or '-'} / {self.category or '-'}"
+
+
+class ParseJob(models.Model):
+    """
+    Job de parsing d'un PDF exécuté en arrière-plan par les workers (file d'attente en base)
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En attente'),
+        (STATUS_RUNNING, 'En cours'),
+        (STATUS_SUCCEEDED, 'Terminé'),
+        (STATUS_FAILED, 'Échoué'),
+    ]
+    
+    # convert : résultat renvoyé au convertisseur ; statement : relevé enregistré en base
+    KIND_CONVERT = 'convert'
+    KIND_STATEMENT = 'statement'
+    KIND_CHOICES = [
+        (KIND_CONVERT, 'Conversion'),
+        (KIND_STATEMENT, 'Relevé enregistré'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=KIND_CONVERT, verbose_name="Type")
+    name = models.CharField(max_length=255, blank=True, default='', verbose_name="Nom du relevé")
+    pdf_file = models.FileField(upload_to='parse_jobs/', blank=True, verbose_name="Fichier PDF")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Statut")
+    pages_done = models.IntegerField(default=0, verbose_name="Pages traitées")
+    pages_total = models.IntegerField(default=0, verbose_name="Nombre de pages")
+    attempts = models.IntegerField(default=0, verbose_name="Tentatives")
+    max_attempts = models.IntegerField(default=3, verbose_name="Tentatives maximales")
+    result = models.JSONField(null=True, blank=True, verbose_name="Résultat")
+    error = models.TextField(blank=True, default='', verbose_name="Erreur")
+    bank_statement = models.ForeignKey(BankStatement, on_delete=models.SET_NULL, null=True, blank=True, related_name='parse_jobs')
+    # Emplacement d'exécution (0 à JOBS_MAX_CONCURRENCY - 1) tenu par un job running,
+    # unique : la limite de concurrence est garantie par la base
+    slot = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Emplacement")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Créé le")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Démarré le")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernière activité")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Terminé le")
+    
+    class Meta:
+        verbose_name = "Job de parsing"
+        verbose_name_plural = "Jobs de parsing"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['slot'], name='banktocsv_parse_job_slot'),
+        ]
+    
+    def __str__(self):
+        return f"{self.id} - {self.status}"
+    
+    @property
+    def progress(self):
+        """
+        Avancement entre 0 et 1
+        """
+        if self.status == self.STATUS_SUCCEEDED:
+            return 1.0
+        if not self.pages_total:
+            return 0.0
+        return min(1.0, self.pages_done / self.pages_total)
+
+
+class ConversionResult(models.Model):
+    """
+    Résultat d'une conversion désigné par un jeton de téléchargement (voir
+    result_handles), conservé en base RESULT_HANDLE_TTL secondes : le jeton
+    est résolu par n'importe quel processus web
+    """
+    # Clé du cache de parsing : contenu du PDF, versions des parsers et des règles
+    key = models.CharField(max_length=255, primary_key=True, verbose_name="Clé")
+    # Transactions sous forme compacte (TransactionRecord.as_tuple)
+    transactions = models.JSONField(verbose_name="Transactions")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Émis le")
+
+    class Meta:
+        verbose_name = "Résultat de conversion"
+        verbose_name_plural = "Résultats de conversion"
+
+    def __str__(self):
+        return f"{self.key} - {self.created_at:%d/%m/%Y %H:%M}"
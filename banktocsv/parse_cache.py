@@ -0,0 +1,264 @@
+"""
+Cache des résultats de parsing indexé par le contenu des PDF
+
+Un même relevé est souvent envoyé plusieurs fois : le résultat du parsing est
+gardé sous la clé SHA-256 du fichier + versions des parsers + moteur d'extraction
++ version des règles.
+Une montée de version du parser ou un changement de règles produit donc de
+nouvelles clés, et les anciennes entrées ne sont plus jamais servies.
+
+Deux niveaux :
+- mémoire : LRU bornée à PARSE_CACHE_SIZE entrées, propre à chaque worker
+- disque (optionnel, PARSE_CACHE_DISK) : fichiers JSON sous PARSE_CACHE_DIR
+  (hors de MEDIA_ROOT, jamais servi comme fichier statique), partagés entre
+  workers et conservés aux redémarrages. Le niveau disque est borné en taille
+  (PARSE_CACHE_DISK_MAX_BYTES) et en âge (PARSE_CACHE_DISK_MAX_AGE) : la date
+  de modification d'un fichier est celle de son dernier accès, et les entrées
+  les moins récemment utilisées sont supprimées en premier.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from parsers.backends import resolve_backend
+from parsers.registry import PARSERS_VERSION
+from parsers.records import TransactionRecord
+
+
+def _dump_result(result):
+    """
+    Forme JSON compacte d'un résultat : transactions en listes (ordinaux, millimes)
+    """
+    return dict(result, transactions=[transaction.as_tuple() for transaction in result['transactions']])
+
+
+def _load_result(data):
+    """
+    Reconstruit un résultat à partir de _dump_result()
+    """
+    data['transactions'] = [TransactionRecord.from_tuple(values) for values in data['transactions']]
+    return data
+
+
+def hash_upload(uploaded_file):
+    """
+    Calcule l'empreinte SHA-256 d'un fichier uploadé, lu par morceaux
+
+    Args:
+        uploaded_file: Fichier Django (UploadedFile ou File)
+
+    Returns:
+        Empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+class ParseResultCache:
+    """
+    Cache LRU des résultats de parsing, avec un niveau disque optionnel
+    """
+
+    def __init__(self, max_entries=128, disk_dir=None, max_bytes=None, max_age=None):
+        """
+        Args:
+            max_entries: Nombre maximal de résultats gardés en mémoire
+            disk_dir: Répertoire du niveau disque (désactivé si None)
+            max_bytes: Taille maximale du niveau disque (octets, sans limite si None)
+            max_age: Durée (secondes) après laquelle une entrée disque non utilisée
+                expire (sans limite si None)
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def get(self, key):
+        """
+        Retourne le résultat associé à la clé, ou None
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            if self._expired(os.stat(path).st_mtime):
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as cache_file:
+                result = _load_result(json.load(cache_file))
+            # Date de modification = dernier accès (ordre d'éviction LRU)
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        # Promouvoir l'entrée disque en mémoire
+        self._remember(key, result)
+        return result
+
+    def contains(self, key):
+        """
+        Indique si un résultat est disponible pour la clé, sans le charger
+        """
+        with self._lock:
+            if key in self._entries:
+                return True
+        if not self.disk_dir:
+            return False
+        try:
+            return not self._expired(os.stat(self._disk_path(key)).st_mtime)
+        except OSError:
+            return False
+
+    def _expired(self, mtime, now=None):
+        return self.max_age is not None and (now or time.time()) - mtime > self.max_age
+
+    def set(self, key, result):
+        """
+        Enregistre un résultat de parsing (transactions en TransactionRecord)
+        """
+        self._remember(key, result)
+
+        if self.disk_dir:
+            # Écriture atomique : un autre worker ne lit jamais un fichier partiel
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as cache_file:
+                    json.dump(_dump_result(result), cache_file, separators=(',', ':'))
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self.prune()
+
+    def prune(self):
+        """
+        Supprime les entrées disque expirées, puis les moins récemment
+        utilisées tant que le niveau disque dépasse max_bytes
+
+        Appelé après chaque écriture, c'est-à-dire après un parsing complet :
+        le parcours du répertoire reste négligeable devant celui-ci.
+
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        if not self.disk_dir or (self.max_bytes is None and self.max_age is None):
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        with os.scandir(self.disk_dir) as scan:
+            for entry in scan:
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # Supprimée entre-temps par un autre worker
+                    continue
+                if self._expired(stat.st_mtime, now):
+                    removed += self._remove(entry.path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        if self.max_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                removed += self._remove(path)
+                total -= size
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_parse_cache():
+    """
+    Retourne le cache du processus, créé au premier appel selon les settings
+
+    Le niveau disque est rangé sous PARSE_CACHE_DIR, dans un sous-répertoire
+    par version des parsers ; les répertoires des versions précédentes sont
+    supprimés à la création.
+    """
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            disk_dir = None
+            if settings.PARSE_CACHE_DISK:
+                root = os.fspath(settings.PARSE_CACHE_DIR)
+                disk_dir = os.path.join(root, f"v{PARSERS_VERSION}")
+                if os.path.isdir(root):
+                    for name in os.listdir(root):
+                        if name != os.path.basename(disk_dir):
+                            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+            _cache = ParseResultCache(
+                settings.PARSE_CACHE_SIZE, disk_dir,
+                max_bytes=settings.PARSE_CACHE_DISK_MAX_BYTES,
+                max_age=settings.PARSE_CACHE_DISK_MAX_AGE,
+            )
+
+        return _cache
+
+
+def cache_key(content_hash, rule_set):
+    """
+    Clé de cache : contenu du PDF + versions et choix des parsers + moteur
+    d'extraction + version des règles
+
+    Le choix du parser (STATEMENT_PARSER) en fait partie : un résultat obtenu
+    avec un parser imposé n'est pas servi quand la banque doit être reconnue.
+    Le moteur est celui que désigne PDF_EXTRACTION_BACKEND ('auto' résolu) :
+    changer de moteur, ou en installer un qui devient celui d'auto, ne sert
+    pas les résultats de l'ancien.
+    """
+    backend = resolve_backend(settings.PDF_EXTRACTION_BACKEND).name
+    return f"{content_hash}-{PARSERS_VERSION}-{settings.STATEMENT_PARSER}-{backend}-{rule_set.version}"
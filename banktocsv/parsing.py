@@ -0,0 +1,107 @@
+"""
+Parsing des PDF uploadés, partagé par les vues et les workers de jobs
+"""
+
+from django.conf import settings
+
+from parsers.registry import select_parser
+from parsers.records import millimes_to_float
+from parsers.timing import stage
+from .rules import get_rule_set
+from .parse_cache import get_parse_cache, hash_upload, cache_key
+
+
+def get_parser(pdf_file, progress_callback=None, workers=None):
+    """
+    Crée le parser du relevé (reconnu sur sa première page, voir
+    parsers.registry), configuré selon les settings
+
+    Args:
+        pdf_file: Fichier Django (UploadedFile ou FieldFile ouvert)
+        progress_callback: Appelée après chaque page avec (pages traitées, nombre de pages)
+        workers: Processus d'extraction des pages (PARSER_WORKERS si None)
+
+    Raises:
+        UnknownStatementError: Aucun parser ne reconnaît le document
+    """
+    parser_class = select_parser(pdf_file, settings.STATEMENT_PARSER, settings.PDF_EXTRACTION_BACKEND)
+    return parser_class(
+        workers=workers or settings.PARSER_WORKERS,
+        parallel_min_pages=settings.PARSER_PARALLEL_MIN_PAGES,
+        rule_set=get_rule_set(),
+        progress_callback=progress_callback,
+        backend=settings.PDF_EXTRACTION_BACKEND,
+    )
+
+
+def upload_key(pdf_file):
+    """
+    Clé du cache de parsing d'un PDF uploadé (contenu, version du parser et des règles)
+    """
+    with stage('hash'):
+        return cache_key(hash_upload(pdf_file), get_rule_set())
+
+
+def get_cached_result(pdf_file, key=None):
+    """
+    Retourne le résultat déjà calculé pour un PDF au contenu identique, ou None
+
+    Args:
+        pdf_file: Fichier Django (UploadedFile ou FieldFile ouvert)
+        key: Clé déjà calculée par upload_key()
+    """
+    key = key or upload_key(pdf_file)
+    with stage('cache'):
+        return get_parse_cache().get(key)
+
+
+def parse_upload(pdf_file, progress_callback=None, key=None, workers=None):
+    """
+    Parse un PDF uploadé, en réutilisant le résultat d'un envoi au contenu identique
+
+    Args:
+        pdf_file: Fichier Django (UploadedFile ou FieldFile ouvert)
+        progress_callback: Appelée après chaque page avec (pages traitées, nombre de pages)
+        key: Clé déjà calculée par upload_key()
+        workers: Processus d'extraction des pages (PARSER_WORKERS si None)
+
+    Returns:
+        Dict contenant les transactions et le solde final
+
+    Raises:
+        UnknownStatementError: Aucun parser ne reconnaît le document
+    """
+    key = key or upload_key(pdf_file)
+
+    cache = get_parse_cache()
+    with stage('cache'):
+        result = cache.get(key)
+    if result is None:
+        # La banque n'est reconnue qu'en l'absence de résultat en cache
+        parser = get_parser(pdf_file, progress_callback, workers)
+        result = parser.parse_pdf(pdf_file)
+        with stage('cache'):
+            cache.set(key, result)
+
+    return result
+
+
+def upload_payload(result, result_token=None):
+    """
+    Corps JSON (message et données) renvoyé au convertisseur pour un résultat de parsing
+
+    Args:
+        result: Résultat du parser
+        result_token: Jeton de téléchargement du résultat (voir result_handles)
+    """
+    final_balance = result['final_balance']
+    
+    return {
+        'message': f"Relevé traité avec succès ! {result['total_transactions']} transactions extraites.",
+        'result_token': result_token,
+        'data': {
+            'total_transactions': result['total_transactions'],
+            'final_balance': millimes_to_float(final_balance) if final_balance is not None else None,
+            'transactions': [transaction.as_dict() for transaction in result['transactions']]
+        }
+    }
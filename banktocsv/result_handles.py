@@ -0,0 +1,124 @@
+"""
+Jetons de résultat : export d'un relevé converti sans renvoyer ses transactions
+
+Le convertisseur reçoit avec le résultat d'un upload un jeton opaque
+(result_token) ; le téléchargement CSV/Excel envoie ce jeton au lieu de la
+liste des transactions. Le jeton est signé (SECRET_KEY) et horodaté : il ne
+peut être ni forgé ni modifié, et expire après RESULT_HANDLE_TTL secondes.
+
+Il désigne un résultat conservé en base, que n'importe quel processus web
+résout (le cache de parsing, propre à chaque worker, peut l'avoir évincé) :
+- ConversionResult, écrit à l'émission du jeton sous la clé de contenu du
+  PDF (un même relevé renvoyé n'est stocké qu'une fois) et supprimé
+  RESULT_HANDLE_TTL secondes après la dernière émission
+- ou le résultat d'un job de conversion en arrière-plan (conservé en base
+  JOBS_RETENTION secondes)
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from parsers.records import TransactionRecord
+
+from .models import ConversionResult, ParseJob
+
+
+SALT = 'banktocsv.result_handles'
+
+# Intervalle (secondes) entre deux suppressions des résultats expirés, par processus
+PURGE_INTERVAL = 60
+
+_last_purge = 0.0
+
+
+def purge_results():
+    """
+    Supprime les résultats dont le dernier jeton a expiré
+
+    Returns:
+        Nombre de résultats supprimés
+    """
+    global _last_purge
+
+    _last_purge = time.monotonic()
+    expired = timezone.now() - timedelta(seconds=settings.RESULT_HANDLE_TTL)
+    deleted, _ = ConversionResult.objects.filter(created_at__lt=expired).delete()
+    return deleted
+
+
+def _store_result(cache_key, result):
+    """
+    Conserve en base le résultat désigné par un jeton (une ligne par clé de contenu)
+    """
+    now = timezone.now()
+    # Relevé déjà stocké : seule la date d'émission est prolongée
+    if not ConversionResult.objects.filter(key=cache_key).update(created_at=now):
+        ConversionResult.objects.bulk_create([ConversionResult(
+            key=cache_key,
+            transactions=[transaction.as_tuple() for transaction in result['transactions']],
+            created_at=now,
+        )], ignore_conflicts=True)
+
+    if time.monotonic() - _last_purge >= PURGE_INTERVAL:
+        purge_results()
+
+
+def issue_handle(cache_key=None, job_id=None, result=None):
+    """
+    Jeton désignant le résultat d'un upload ou d'un job de conversion
+
+    Args:
+        cache_key: Clé du résultat dans le cache de parsing
+        job_id: Identifiant d'un job de conversion terminé
+        result: Résultat de parsing de cache_key, conservé en base pour le jeton
+    """
+    if cache_key is not None:
+        _store_result(cache_key, result)
+        reference = {'key': cache_key}
+    else:
+        reference = {'job': str(job_id)}
+    return signing.dumps(reference, salt=SALT, compress=True)
+
+
+def _job_rows(job_id):
+    job = ParseJob.objects.filter(
+        id=job_id, kind=ParseJob.KIND_CONVERT, status=ParseJob.STATUS_SUCCEEDED
+    ).first()
+    if job is None or not job.result:
+        return None
+    # Résultat stocké tel que renvoyé au convertisseur (upload_payload)
+    return [
+        [t['date_operation'], t['date_valeur'], t['libelle'], t['debit'], t['credit']]
+        for t in job.result['data']['transactions']
+    ]
+
+
+def _stored_rows(cache_key):
+    expired = timezone.now() - timedelta(seconds=settings.RESULT_HANDLE_TTL)
+    stored = ConversionResult.objects.filter(key=cache_key, created_at__gte=expired).first()
+    if stored is None:
+        return None
+    return (TransactionRecord.from_tuple(values).as_row() for values in stored.transactions)
+
+
+def resolve_handle(token):
+    """
+    Lignes d'export du résultat désigné par un jeton
+
+    Returns:
+        Itérable de [date opération, date valeur, libellé, débit, crédit] par transaction,
+        ou None si le jeton est invalide, expiré, ou si le résultat n'est plus conservé
+    """
+    try:
+        reference = signing.loads(token, salt=SALT, max_age=settings.RESULT_HANDLE_TTL)
+    except signing.BadSignature:
+        return None
+
+    # Référence signée : produite par issue_handle()
+    if 'job' in reference:
+        return _job_rows(reference['job'])
+    return _stored_rows(reference['key'])
@@ -0,0 +1,148 @@
+"""
+Chargement des règles de classification et réapplication sur les transactions stockées
+
+Source des règles, par ordre de priorité :
+1. la table ClassificationRule si elle contient des règles actives
+2. le fichier JSON CLASSIFICATION_RULES_FILE s'il est configuré
+3. les règles par défaut du parser
+
+Les règles compilées sont gardées en mémoire et rechargées automatiquement
+quand leur source change (vérification au plus toutes les
+CLASSIFICATION_RULES_RELOAD_INTERVAL secondes), sans redémarrer les workers.
+"""
+
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Count, Max, Q
+
+from parsers.rules import RuleSet, DEFAULT_RULE_SET, CREDIT
+from .aggregates import adjust_aggregates, move_transaction
+from .models import ClassificationRule, Transaction
+
+
+_lock = threading.Lock()
+_cache = {
+    'rule_set': None,
+    'signature': None,
+    'checked_at': 0.0,
+}
+
+
+def _source_signature():
+    """
+    Signature peu coûteuse de la source des règles, qui change dès qu'une règle change
+    """
+    stats = ClassificationRule.objects.aggregate(
+        count=Count('id'), active=Count('id', filter=Q(active=True)), last_update=Max('updated_at')
+    )
+    if stats['active']:
+        return ('db', stats['count'], stats['last_update'])
+
+    rules_file = settings.CLASSIFICATION_RULES_FILE
+    if rules_file and os.path.exists(rules_file):
+        return ('file', rules_file, os.path.getmtime(rules_file))
+
+    return ('default',)
+
+
+def _load_rule_set(signature):
+    """
+    Compile les règles de la source désignée par la signature
+    """
+    if signature[0] == 'db':
+        rules = ClassificationRule.objects.filter(active=True).values('keyword', 'direction', 'category')
+        return RuleSet.from_dicts(rules)
+
+    if signature[0] == 'file':
+        return RuleSet.from_file(signature[1])
+
+    return DEFAULT_RULE_SET
+
+
+def get_rule_set(force_reload=False):
+    """
+    Retourne les règles actives, rechargées si leur source a changé
+
+    Args:
+        force_reload: Vérifier la source immédiatement, sans attendre l'intervalle
+
+    Returns:
+        RuleSet compilé
+    """
+    now = time.monotonic()
+    interval = settings.CLASSIFICATION_RULES_RELOAD_INTERVAL
+
+    with _lock:
+        if not force_reload and _cache['rule_set'] is not None and now - _cache['checked_at'] < interval:
+            return _cache['rule_set']
+
+        signature = _source_signature()
+        if _cache['rule_set'] is None or signature != _cache['signature']:
+            _cache['rule_set'] = _load_rule_set(signature)
+            _cache['signature'] = signature
+        _cache['checked_at'] = now
+
+        return _cache['rule_set']
+
+
+def reapply_rules(rule_set=None, batch_size=1000, statement_id=None):
+    """
+    Réapplique les règles aux transactions stockées, par lots
+
+    Seules les transactions dont le sens ou la catégorie change sont mises à
+    jour. Chaque lot est écrit dans sa propre transaction base de données,
+    avec le déplacement de ses montants dans les agrégats mensuels.
+
+    Args:
+        rule_set: Règles à appliquer (règles actives si None)
+        batch_size: Nombre de transactions lues et mises à jour par lot
+        statement_id: Limiter la réapplication à un relevé
+
+    Returns:
+        Tuple (transactions examinées, transactions mises à jour)
+    """
+    rule_set = rule_set or get_rule_set(force_reload=True)
+
+    queryset = Transaction.objects.only(
+        'id', 'bank_statement_id', 'date_operation', 'libelle', 'debit', 'credit', 'category'
+    ).order_by('id')
+    if statement_id is not None:
+        queryset = queryset.filter(bank_statement_id=statement_id)
+
+    scanned = updated = 0
+    last_id = 0
+
+    # Pagination par clé primaire : chaque lot est une requête indépendante
+    while True:
+        batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        scanned += len(batch)
+
+        changed = []
+        deltas = {}
+        for tx in batch:
+            direction, category = rule_set.classify(tx.libelle)
+            category = category or ''
+
+            # Une transaction porte son montant soit au débit soit au crédit
+            amount = tx.debit + tx.credit
+            debit, credit = (0, amount) if direction == CREDIT else (amount, 0)
+
+            if debit != tx.debit or credit != tx.credit or category != tx.category:
+                move_transaction(deltas, tx, debit, credit)
+                tx.debit, tx.credit, tx.category = debit, credit, category
+                changed.append(tx)
+
+        if changed:
+            with db_transaction.atomic():
+                Transaction.objects.bulk_update(changed, ['debit', 'credit', 'category'])
+                adjust_aggregates(deltas)
+            updated += len(changed)
+
+    return scanned, updated
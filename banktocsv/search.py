@@ -0,0 +1,233 @@
+"""
+Recherche plein texte dans les libellés des transactions
+
+Un filtre libelle__icontains parcourt toute la table. La recherche passe ici
+par un index plein texte propre à chaque base :
+- SQLite : table virtuelle FTS5 (banktocsv_transaction_fts) à contenu externe,
+  alimentée par des triggers sur banktocsv_transaction
+- PostgreSQL : index GIN sur to_tsvector('simple', libelle)
+
+Dans les deux cas l'index est mis à jour par la base elle-même, dans la
+transaction qui insère (bulk_create, COPY), modifie ou supprime (CASCADE) les
+transactions : il ne peut pas diverger de la table. Les mots sont comparés
+sans casse ni accents (SQLite) ou sans casse (PostgreSQL, configuration
+'simple', sans racinisation : les libellés sont des codes et des noms propres).
+
+Les autres bases, ou un SQLite compilé sans FTS5, se rabattent sur icontains.
+
+Sous SQLite, la table FTS5 est lue par jointure via le modèle non géré
+TransactionSearch. Une migration qui reconstruit la table des transactions
+(modification de colonne) supprime les triggers : le contrôle
+banktocsv.E001 (manage.py check --database default) le signale, et
+`python manage.py banktocsv_search_index` (install_search_index) les recrée.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Lookup
+from django.db.models.expressions import RawSQL
+
+from .api import API_FIELDS, QueryError, filter_transactions, page_limit, selected_fields, serialize_row
+from .models import TransactionSearch
+
+
+FTS_TABLE = 'banktocsv_transaction_fts'
+PG_INDEX = 'banktocsv_transaction_libelle_fts'
+
+_WORDS = re.compile(r'\w+')
+
+# Triggers qui tiennent la table FTS5 à jour
+SQLITE_TRIGGERS = [f"{FTS_TABLE}_insert", f"{FTS_TABLE}_delete", f"{FTS_TABLE}_update"]
+
+_SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        libelle, content='banktocsv_transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON banktocsv_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, libelle) VALUES (new.id, new.libelle);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON banktocsv_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, libelle) VALUES ('delete', old.id, old.libelle);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF libelle ON banktocsv_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, libelle) VALUES ('delete', old.id, old.libelle);
+        INSERT INTO {FTS_TABLE}(rowid, libelle) VALUES (new.id, new.libelle);
+    END""",
+]
+
+_SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+_PG_SCHEMA = [
+    f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON banktocsv_transaction USING gin (to_tsvector('simple', libelle))",
+]
+
+_PG_DROP = [f"DROP INDEX IF EXISTS {PG_INDEX}"]
+
+
+class Match(Lookup):
+    """
+    libelle__match : requête FTS5 sur la colonne (WHERE libelle MATCH ...)
+    """
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, db_connection):
+        lhs, lhs_params = self.process_lhs(compiler, db_connection)
+        rhs, rhs_params = self.process_rhs(compiler, db_connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+TransactionSearch._meta.get_field('libelle').register_lookup(Match)
+
+
+def _fts_table_exists(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+    return cursor.fetchone() is not None
+
+
+def _sqlite_has_fts5(db_connection):
+    with db_connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # Module chargé autrement (extension) : le vérifier directement
+        cursor.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")
+        return cursor.fetchone() is not None
+
+
+def install_search_index(db_connection=None, rebuild=False):
+    """
+    Crée l'index plein texte de la base (sans effet s'il existe déjà)
+
+    Args:
+        db_connection: Connexion (celle par défaut si None)
+        rebuild: Réindexer tous les libellés (après une réparation)
+
+    Returns:
+        True si la base dispose d'un index plein texte
+    """
+    db_connection = db_connection or connection
+    if db_connection.vendor == 'sqlite':
+        if not _sqlite_has_fts5(db_connection):
+            return False
+        with db_connection.cursor() as cursor:
+            exists = _fts_table_exists(cursor)
+            for statement in _SQLITE_SCHEMA:
+                cursor.execute(statement)
+            if rebuild or not exists:
+                # Indexe les transactions déjà en base
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        return True
+
+    if db_connection.vendor == 'postgresql':
+        with db_connection.cursor() as cursor:
+            for statement in _PG_SCHEMA:
+                cursor.execute(statement)
+            if rebuild:
+                cursor.execute(f"REINDEX INDEX {PG_INDEX}")
+        return True
+
+    return False
+
+
+def drop_search_index(db_connection=None):
+    """
+    Supprime l'index plein texte (retour arrière de la migration)
+    """
+    db_connection = db_connection or connection
+    statements = {'sqlite': _SQLITE_DROP, 'postgresql': _PG_DROP}.get(db_connection.vendor, [])
+    with db_connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def missing_triggers(db_connection=None):
+    """
+    Triggers de l'index FTS5 absents de la base (voir checks.check_search_index)
+    """
+    db_connection = db_connection or connection
+    with db_connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'banktocsv_transaction'")
+        present = {name for name, in cursor.fetchall()}
+    return [name for name in SQLITE_TRIGGERS if name not in present]
+
+
+def search_available():
+    """
+    La base courante dispose-t-elle de l'index plein texte ?
+    """
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        return _fts_table_exists(cursor)
+
+
+def _ranked(queryset, words):
+    """
+    Transactions du queryset dont le libellé contient tous les mots, annotées
+    de leur pertinence (score, plus élevé = plus pertinent) et triées par score
+
+    L'index plein texte pilote la requête : les filtres ne sont vérifiés que
+    sur les lignes qui correspondent aux mots.
+    """
+    if connection.vendor == 'sqlite':
+        # Chaque mot entre guillemets : pas d'opérateurs FTS5 venant de la requête
+        match = ' '.join(f'"{word}"' for word in words)
+        # Jointure avec la table FTS5 ; rank (bm25) est négatif, d'autant plus
+        # que la ligne est pertinente
+        queryset = queryset.filter(search__libelle__match=match).annotate(score=-F('search__rank'))
+    else:
+        vector = "to_tsvector('simple', banktocsv_transaction.libelle)"
+        text = ' '.join(words)
+        queryset = queryset.alias(
+            matched=RawSQL(f"{vector} @@ plainto_tsquery('simple', %s)", [text], output_field=BooleanField()),
+        ).filter(matched=True).annotate(
+            score=RawSQL(f"ts_rank({vector}, plainto_tsquery('simple', %s))", [text], output_field=FloatField()),
+        )
+    return queryset.order_by('-score', 'id')
+
+
+def search_transactions(params):
+    """
+    Transactions dont le libellé contient tous les mots de q, les plus pertinentes d'abord
+
+    Args:
+        params: Paramètres (request.GET) : q, limit, fields, et les filtres de
+            api.filter_transactions (statement, période, montant, sens)
+
+    Returns:
+        Dict {'transactions' (avec 'score'), 'count', 'ranked'} ; ranked est False
+        sans index plein texte (résultats par date, sans score)
+
+    Raises:
+        QueryError: Paramètre invalide
+    """
+    words = _WORDS.findall(params.get('q') or '')
+    if not words:
+        raise QueryError("Paramètre q manquant : mots à rechercher dans les libellés")
+
+    fields = selected_fields(params.get('fields'))
+    limit = page_limit(params)
+
+    # Filtres de l'API, sauf q (remplacé par la recherche plein texte)
+    queryset = filter_transactions({name: value for name, value in params.items() if name != 'q'})
+    columns = list(dict.fromkeys(API_FIELDS[name] for name in fields))
+
+    if not search_available():
+        for word in words:
+            queryset = queryset.filter(libelle__icontains=word)
+        rows = queryset.order_by('date_operation', 'id').values(*columns)[:limit]
+        transactions = [dict(serialize_row(row, fields), score=None) for row in rows]
+        return {'transactions': transactions, 'count': len(transactions), 'ranked': False}
+
+    rows = _ranked(queryset, words).values(*columns, 'score')[:limit]
+    transactions = [dict(serialize_row(row, fields), score=round(row['score'], 6)) for row in rows]
+    return {'transactions': transactions, 'count': len(transactions), 'ranked': True}
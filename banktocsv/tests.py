@@ -1,3 +1,1155 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from unittest import mock
 
-# Create your tests here.
+from django.core import signing
+from django.core.checks import run_checks
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from benchmarks.synthetic import write_pdf, write_statement
+from parsers import registry
+from parsers.attijari_parser import AttijariParser
+from parsers.backends import PdfiumDocument
+from parsers.xlsx_writer import iter_xlsx
+
+from parsers.records import (
+    TransactionRecord, date_ordinal, decimal_to_millimes, millimes_to_decimal, millimes_to_float, parse_millimes,
+)
+from parsers.rules import CREDIT, DEBIT, DEFAULT_RULE_SET, KeywordAutomaton, Rule, RuleSet
+
+from . import ingest, jobs, parse_cache, rules, views
+from .api import decode_cursor, encode_cursor
+from .exports import CSV_BOM, iter_csv
+from .aggregates import rebuild_aggregates
+from .counters import get_counters
+from .ingest import remove_statement, save_statement
+from .parse_cache import ParseResultCache, cache_key
+from .parsing import get_cached_result, get_parser, parse_upload
+from .result_handles import issue_handle, purge_results, resolve_handle
+from .models import (
+    BankStatement, ClassificationRule, ConversionResult, Counters, MonthlyAggregate, ParseJob, Transaction,
+)
+from .search import FTS_TABLE, search_available, search_transactions
+
+
+# Routes des tests : celles de l'application, plus le formulaire d'upload (non routé)
+urlpatterns = [
+    path('', include('banktocsv.urls')),
+    path('tests/upload/', views.upload_statement, name='upload_statement'),
+]
+
+
+def record(day, libelle, debit=0, credit=0, category=''):
+    """
+    Transaction au format du parser ; day est une date YYYY-MM-DD
+    """
+    ordinal = date.fromisoformat(day).toordinal()
+    return TransactionRecord(ordinal, ordinal, libelle, debit, credit, category)
+
+
+def create_statement(records, name='Relevé de test'):
+    """
+    Relevé enregistré par banktocsv.ingest (compteurs, agrégats et index tenus à jour)
+    """
+    bank_statement = BankStatement(name=name, pdf_file='bank_statements/test.pdf')
+    save_statement(bank_statement, {
+        'transactions': records,
+        'final_balance': None,
+        'total_transactions': len(records),
+    })
+    return bank_statement
+
+
+@lru_cache(maxsize=None)
+def statement_pdf(pages=2, lines_per_page=20, seed=42, trailing_pages=0):
+    """
+    Contenu d'un relevé Attijari synthétique (benchmarks.synthetic)
+    """
+    with tempfile.TemporaryDirectory(prefix='banktocsv-tests-') as directory:
+        path = os.path.join(directory, 'releve.pdf')
+        write_statement(path, pages, lines_per_page, trailing_pages, seed=seed)
+        with open(path, 'rb') as pdf_file:
+            return pdf_file.read()
+
+
+def text_pdf(*pages):
+    """
+    PDF d'une page par liste de lignes de texte (page vide : aucun texte, comme un scan)
+    """
+    with tempfile.TemporaryDirectory(prefix='banktocsv-tests-') as directory:
+        path = os.path.join(directory, 'document.pdf')
+        write_pdf([[(40, 800 - index * 12, line) for index, line in enumerate(lines)] for lines in pages], path)
+        with open(path, 'rb') as pdf_file:
+            return pdf_file.read()
+
+
+def temporary_media(test):
+    """
+    MEDIA_ROOT temporaire pour la durée d'un test (fichiers des jobs et des relevés)
+    """
+    media_root = tempfile.mkdtemp(prefix='banktocsv-media-')
+    test.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+    test.enterContext(override_settings(MEDIA_ROOT=media_root))
+    return media_root
+
+
+def aggregate_rows():
+    """
+    Contenu de la table des agrégats mensuels, comparable d'un état à l'autre
+    """
+    return sorted(MonthlyAggregate.objects.values_list(
+        'bank_statement_id', 'month', 'direction', 'transaction_count', 'total'
+    ))
+
+
+class MillimesTests(TestCase):
+
+    def test_parse_attijari_amounts(self):
+        self.assertEqual(parse_millimes('0,893'), 893)
+        self.assertEqual(parse_millimes('2 254,258'), 2254258)
+        self.assertEqual(parse_millimes('12 345 678,9'), 12345678900)
+        self.assertEqual(parse_millimes('1\xa0640,000'), 1640000)
+        self.assertEqual(parse_millimes('1640'), 1640000)
+        self.assertEqual(parse_millimes(',5'), 500)
+
+    def test_parse_negative_amounts(self):
+        self.assertEqual(parse_millimes('-1 640,000'), -1640000)
+        self.assertEqual(parse_millimes('-0,893'), -893)
+
+    def test_parse_rounds_to_the_nearest_millime(self):
+        self.assertEqual(parse_millimes('0,8934'), 893)
+        self.assertEqual(parse_millimes('0,8925'), 893)
+        self.assertEqual(parse_millimes('0,8935'), 894)
+        self.assertEqual(parse_millimes('-0,8925'), -893)
+        self.assertEqual(parse_millimes('1 999,9995'), 2000000)
+
+    def test_float_conversion_is_exact_to_the_millime(self):
+        for millimes in [*range(0, 20000, 7), 2254258, 12345678901, -893, -1500]:
+            value = millimes_to_float(millimes)
+            self.assertEqual(Decimal(repr(value)), millimes_to_decimal(millimes))
+            self.assertEqual(decimal_to_millimes(repr(value)), millimes)
+        self.assertEqual(repr(millimes_to_float(2254258)), '2254.258')
+        self.assertEqual(millimes_to_float(-1500), -1.5)
+
+    def test_two_decimal_amounts_keep_their_value(self):
+        # Montants stockés avec 2 décimales avant la migration 0004
+        self.assertEqual(decimal_to_millimes(Decimal('12.35')), 12350)
+        self.assertEqual(decimal_to_millimes(Decimal('-0.10')), -100)
+        self.assertEqual(millimes_to_decimal(12350), Decimal('12.350'))
+        self.assertEqual(decimal_to_millimes(Decimal('0.0005')), 1)
+
+    def test_tuple_round_trip(self):
+        transaction = TransactionRecord(
+            date_ordinal('2025', '08', '04'), date_ordinal('2025', '08', '01'),
+            'COMMISSION ENC CHQ 0146467', 893, 0, 'Frais',
+        )
+        self.assertEqual(TransactionRecord.from_tuple(transaction.as_tuple()), transaction)
+        # Forme JSON du cache de parsing et des résultats de conversion (listes)
+        restored = TransactionRecord.from_tuple(json.loads(json.dumps(transaction.as_tuple())))
+        self.assertEqual(restored, transaction)
+        self.assertEqual(restored.as_row(), ['2025-08-04', '2025-08-01', 'COMMISSION ENC CHQ 0146467', 0.893, 0.0])
+
+
+class AmountPrecisionMigrationTests(TransactionTestCase):
+    """
+    Migration 0004 : montants passés de 2 à 3 décimales
+    """
+
+    before = [('banktocsv', '0003_parse_jobs')]
+    after = [('banktocsv', '0004_amount_precision')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_amounts_keep_their_value(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        old_apps = executor.loader.project_state(self.before).apps
+        statement = old_apps.get_model('banktocsv', 'BankStatement').objects.create(
+            name='Avant migration', pdf_file='bank_statements/old.pdf', final_balance=Decimal('1477.11'),
+        )
+        old_apps.get_model('banktocsv', 'Transaction').objects.create(
+            bank_statement_id=statement.id, date_operation=date(2025, 8, 4), date_valeur=date(2025, 8, 1),
+            libelle='COMMISSION', debit=Decimal('12.35'), credit=Decimal('0'),
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        new_apps = executor.loader.project_state(self.after).apps
+        transaction = new_apps.get_model('banktocsv', 'Transaction').objects.get()
+        self.assertEqual(transaction.debit, Decimal('12.350'))
+        self.assertEqual(decimal_to_millimes(transaction.debit), 12350)
+
+        # Les nouveaux montants gardent leurs 3 décimales
+        transaction.debit = millimes_to_decimal(893)
+        transaction.save()
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.debit, Decimal('0.893'))
+        balance = new_apps.get_model('banktocsv', 'BankStatement').objects.get().final_balance
+        self.assertEqual(decimal_to_millimes(balance), 1477110)
+
+
+class KeywordAutomatonTests(TestCase):
+
+    def test_finds_overlapping_keywords(self):
+        automaton = KeywordAutomaton(['HE', 'SHE', 'HIS', 'HERS'])
+        self.assertEqual(automaton.find('USHERS'), {0, 1, 3})
+        self.assertEqual(automaton.find('AHISHE'), {0, 1, 2})
+        self.assertEqual(automaton.find('XYZ'), frozenset())
+
+    def test_keyword_inside_longer_keyword(self):
+        automaton = KeywordAutomaton(['VIR', 'VIREMENT', 'VIREMENT RECU', 'REMENT'])
+        self.assertEqual(automaton.find('VIREMENT RECU 0042'), {0, 1, 2, 3})
+        # Échec en milieu de mot-clé : reprise sur le suffixe déjà lu
+        self.assertEqual(automaton.find('VIREMENVIREMENT'), {0, 1, 3})
+
+    def test_is_case_sensitive(self):
+        # RuleSet met libellés et mots-clés en majuscules avant la recherche
+        self.assertEqual(KeywordAutomaton(['STEG']).find('steg'), frozenset())
+
+
+class RuleSetTests(TestCase):
+
+    def test_direction(self):
+        rule_set = RuleSet([Rule('VERSEMENT', CREDIT), Rule('FRAIS', DEBIT)])
+        self.assertEqual(rule_set.classify('VERSEMENT ESPECE'), (CREDIT, None))
+        self.assertEqual(rule_set.classify('FRAIS TENUE COMPTE'), (DEBIT, None))
+        # Règles contradictoires ou aucune règle : débit
+        self.assertEqual(rule_set.classify('FRAIS SUR VERSEMENT'), (DEBIT, None))
+        self.assertEqual(rule_set.classify('DIVERS'), (DEBIT, None))
+
+    def test_first_rule_with_a_category_wins(self):
+        rule_set = RuleSet([
+            Rule('VIREMENT', CREDIT),
+            Rule('SALAIRE', category='Salaire'),
+            Rule('VIREMENT', category='Virement'),
+        ])
+        self.assertEqual(rule_set.classify('VIREMENT SALAIRE AOUT'), (CREDIT, 'Salaire'))
+        self.assertEqual(rule_set.classify('VIREMENT LOYER'), (CREDIT, 'Virement'))
+
+    def test_case_and_accents(self):
+        rule_set = RuleSet([Rule('dépôt', CREDIT, 'Dépôt'), Rule('Frais', DEBIT)])
+        self.assertEqual(rule_set.rules[0].keyword, 'DÉPÔT')
+        self.assertEqual(rule_set.classify('Dépôt espèces agence'), (CREDIT, 'Dépôt'))
+        self.assertEqual(rule_set.classify('DÉPÔT CHÈQUE'), (CREDIT, 'Dépôt'))
+        self.assertEqual(rule_set.classify('frais de tenue'), (DEBIT, None))
+
+    def test_version_follows_rules(self):
+        first = RuleSet([Rule('STEG', DEBIT)])
+        self.assertEqual(first.version, RuleSet([Rule('steg', DEBIT)]).version)
+        self.assertNotEqual(first.version, RuleSet([Rule('STEG', CREDIT)]).version)
+
+    def test_from_dicts_rejects_unknown_direction(self):
+        with self.assertRaises(ValueError):
+            RuleSet.from_dicts([{'keyword': 'STEG', 'direction': 'entrée'}])
+
+
+class RuleReloadTests(TestCase):
+
+    def setUp(self):
+        rules._cache.update(rule_set=None, signature=None, checked_at=0.0)
+        self.addCleanup(rules._cache.update, rule_set=None, signature=None, checked_at=0.0)
+
+    @override_settings(CLASSIFICATION_RULES_RELOAD_INTERVAL=3600, CLASSIFICATION_RULES_FILE='')
+    def test_reloads_when_signature_changes(self):
+        self.assertIs(rules.get_rule_set(), DEFAULT_RULE_SET)
+
+        rule = ClassificationRule.objects.create(keyword='STEG', direction=CREDIT)
+        # Intervalle de vérification non écoulé : règles en mémoire
+        self.assertIs(rules.get_rule_set(), DEFAULT_RULE_SET)
+
+        rule_set = rules.get_rule_set(force_reload=True)
+        self.assertEqual(rule_set.rules, (Rule('STEG', CREDIT),))
+        # Signature inchangée : même ensemble compilé
+        self.assertIs(rules.get_rule_set(force_reload=True), rule_set)
+
+        rule.direction = DEBIT
+        rule.save()
+        self.assertEqual(rules.get_rule_set(force_reload=True).rules, (Rule('STEG', DEBIT),))
+
+        rule.active = False
+        rule.save()
+        self.assertIs(rules.get_rule_set(force_reload=True), DEFAULT_RULE_SET)
+
+    @override_settings(CLASSIFICATION_RULES_RELOAD_INTERVAL=0, CLASSIFICATION_RULES_FILE='')
+    def test_database_rules_follow_position(self):
+        ClassificationRule.objects.create(keyword='VIREMENT', category='Virement', position=2)
+        ClassificationRule.objects.create(keyword='SALAIRE', category='Salaire', position=1)
+        self.assertEqual(rules.get_rule_set().classify('VIREMENT SALAIRE'), (DEBIT, 'Salaire'))
+
+
+class ReapplyRulesTests(TestCase):
+
+    def setUp(self):
+        # Débits et crédits selon les règles par défaut
+        self.bank_statement = create_statement([
+            record('2025-07-30', 'STEG FACTURE', debit=10000),
+            record('2025-08-01', 'STEG FACTURE', debit=20000),
+            record('2025-08-02', 'VIREMENT SALAIRE', credit=1500000),
+            record('2025-08-03', 'RETRAIT GAB', debit=50000),
+            record('2025-08-04', 'VERSEMENT ESPECE', credit=300000),
+        ])
+
+    def test_moves_amounts_and_aggregates_in_batches(self):
+        rule_set = RuleSet([
+            Rule('STEG', CREDIT, 'Remboursement'),
+            Rule('VIREMENT', DEBIT),
+            Rule('RETRAIT', DEBIT, 'Espèces'),
+            Rule('VERSEMENT', CREDIT),
+        ])
+        self.assertEqual(rules.reapply_rules(rule_set, batch_size=2), (5, 4))
+
+        transactions = {
+            (t.date_operation.isoformat(), t.libelle): (t.debit, t.credit, t.category)
+            for t in Transaction.objects.all()
+        }
+        self.assertEqual(transactions, {
+            ('2025-07-30', 'STEG FACTURE'): (Decimal('0'), Decimal('10'), 'Remboursement'),
+            ('2025-08-01', 'STEG FACTURE'): (Decimal('0'), Decimal('20'), 'Remboursement'),
+            ('2025-08-02', 'VIREMENT SALAIRE'): (Decimal('1500'), Decimal('0'), ''),
+            ('2025-08-03', 'RETRAIT GAB'): (Decimal('50'), Decimal('0'), 'Espèces'),
+            ('2025-08-04', 'VERSEMENT ESPECE'): (Decimal('0'), Decimal('300'), ''),
+        })
+
+        statement_id = self.bank_statement.id
+        self.assertEqual(aggregate_rows(), [
+            (statement_id, date(2025, 7, 1), 'credit', 1, Decimal('10')),
+            (statement_id, date(2025, 8, 1), 'credit', 2, Decimal('320')),
+            (statement_id, date(2025, 8, 1), 'debit', 2, Decimal('1550')),
+        ])
+
+        # Règles déjà appliquées : rien à mettre à jour
+        self.assertEqual(rules.reapply_rules(rule_set, batch_size=2), (5, 0))
+
+    def test_limited_to_one_statement(self):
+        other = create_statement([record('2025-08-05', 'STEG FACTURE', debit=5000)], name='Autre relevé')
+        rule_set = RuleSet([Rule('STEG', CREDIT)])
+        self.assertEqual(rules.reapply_rules(rule_set, statement_id=other.id), (1, 1))
+        self.assertEqual(Transaction.objects.filter(credit__gt=0, libelle='STEG FACTURE').count(), 1)
+
+
+def statement_records(seed, count=120):
+    """
+    Transactions réparties sur plusieurs mois, débits et crédits mêlés
+    """
+    libelles = ['FACTURE STEG', 'VIREMENT RECU', 'RETRAIT GAB', 'VERSEMENT ESPECE', 'COMMISSION']
+    records = []
+    for index in range(count):
+        day = date(2024, 11, 1).toordinal() + (index * 7 + seed * 3) % 150
+        libelle = libelles[(index + seed) % len(libelles)]
+        amount = 1000 + (index * 7919 + seed) % 500000
+        if libelle in ('VIREMENT RECU', 'VERSEMENT ESPECE'):
+            records.append(TransactionRecord(day, day, libelle, 0, amount))
+        else:
+            records.append(TransactionRecord(day, day, libelle, amount, 0))
+    return records
+
+
+class MonthlyAggregateTests(TestCase):
+    """
+    Agrégats tenus à jour incrémentalement == recalcul complet (rebuild_aggregates)
+    """
+
+    def assertMatchesRebuild(self):
+        incremental = aggregate_rows()
+        rebuild_aggregates()
+        self.assertEqual(incremental, aggregate_rows())
+        return incremental
+
+    def test_incremental_aggregates_match_a_rebuild(self):
+        statements = [create_statement(statement_records(seed), name=f"Relevé {seed}") for seed in range(3)]
+        rows = self.assertMatchesRebuild()
+        self.assertEqual(sum(row[3] for row in rows), Transaction.objects.count())
+        self.assertEqual(len({row[1] for row in rows}), 5)
+
+        rules.reapply_rules(RuleSet([Rule('STEG', CREDIT), Rule('VIREMENT', DEBIT)]), batch_size=50)
+        self.assertNotEqual(aggregate_rows(), rows)
+        self.assertMatchesRebuild()
+
+        removed_id = statements[1].id
+        remove_statement(statements[1])
+        self.assertFalse(MonthlyAggregate.objects.filter(bank_statement_id=removed_id).exists())
+        self.assertMatchesRebuild()
+
+    def test_queryset_delete_bypasses_maintenance(self):
+        bank_statement = create_statement(statement_records(0))
+        rows = aggregate_rows()
+        Transaction.objects.filter(bank_statement=bank_statement, libelle='COMMISSION').delete()
+        # Documenté (voir aggregates) : seul un recalcul corrige la table
+        self.assertEqual(aggregate_rows(), rows)
+        rebuild_aggregates(statement_id=bank_statement.id)
+        self.assertLess(sum(row[3] for row in aggregate_rows()), sum(row[3] for row in rows))
+
+
+@override_settings(INGEST_BATCH_SIZE=7)
+class IngestTests(TestCase):
+    """
+    Transactions insérées par lots dans la transaction du relevé : tout ou rien
+    """
+
+    def assertMatchesRebuild(self):
+        incremental = aggregate_rows()
+        rebuild_aggregates()
+        self.assertEqual(incremental, aggregate_rows())
+
+    def test_save_then_remove(self):
+        records = statement_records(1, count=30)
+        bank_statement = BankStatement(name='Relevé', pdf_file='bank_statements/test.pdf')
+        stats = save_statement(bank_statement, {
+            'transactions': iter(records), 'final_balance': 1477110, 'total_transactions': len(records),
+        })
+        self.assertEqual(stats['rows'], 30)
+        self.assertEqual(bank_statement.final_balance, Decimal('1477.110'))
+        stored = [
+            (t.date_operation.toordinal(), t.date_valeur.toordinal(), t.libelle,
+             decimal_to_millimes(t.debit), decimal_to_millimes(t.credit), t.category)
+            for t in bank_statement.transactions.order_by('id')
+        ]
+        self.assertEqual(stored, [record.as_tuple() for record in records])
+
+        other = create_statement(statement_records(2, count=10), name='Autre relevé')
+        self.assertMatchesRebuild()
+        remove_statement(bank_statement)
+        self.assertEqual(set(Transaction.objects.values_list('bank_statement_id', flat=True)), {other.id})
+        self.assertMatchesRebuild()
+
+    def test_failure_during_ingest_rolls_back(self):
+        create_statement(statement_records(1, count=10))
+        before = (aggregate_rows(), list(Transaction.objects.values_list('id', flat=True)))
+
+        def failing_records():
+            # Échec après plusieurs lots déjà insérés
+            yield from statement_records(2, count=20)
+            raise ValueError("relevé tronqué")
+
+        bank_statement = BankStatement(name='Relevé', pdf_file='bank_statements/test.pdf')
+        with self.assertRaisesMessage(ValueError, 'relevé tronqué'):
+            save_statement(bank_statement, {
+                'transactions': failing_records(), 'final_balance': None, 'total_transactions': 20,
+            })
+        self.assertEqual(BankStatement.objects.count(), 1)
+        self.assertEqual((aggregate_rows(), list(Transaction.objects.values_list('id', flat=True))), before)
+
+    def test_copy_rows_for_psycopg2(self):
+        # COPY ... FORMAT csv : chaînes toujours quotées, une chaîne vide n'est pas NULL
+        class RawCursor:
+            def copy_expert(self, sql, buffer):
+                self.sql, self.data = sql, buffer.read()
+
+        raw_cursor = RawCursor()
+        ingest._copy_batch(mock.Mock(cursor=raw_cursor), 'banktocsv_transaction', ['libelle', 'category'], [
+            ('VERSEMENT "ESPECE", 091936', ''),
+        ])
+        self.assertIn('FROM STDIN WITH (FORMAT csv)', raw_cursor.sql)
+        self.assertEqual(raw_cursor.data, '"VERSEMENT ""ESPECE"", 091936",""\r\n')
+
+
+class CountersTests(TestCase):
+    """
+    Compteurs de la page d'accueil == recomptage des tables
+    """
+
+    def assertMatchesRecount(self):
+        counters = get_counters()
+        self.assertEqual(
+            (counters.total_statements, counters.total_transactions),
+            (BankStatement.objects.count(), Transaction.objects.count()),
+        )
+
+    def test_save_and_remove(self):
+        statements = [create_statement(statement_records(seed, count=10 + seed)) for seed in range(3)]
+        self.assertMatchesRecount()
+        self.assertEqual(get_counters().total_transactions, 33)
+
+        remove_statement(statements[1])
+        self.assertMatchesRecount()
+        # Relevé réenregistré (même ligne) : seules ses nouvelles transactions sont comptées
+        save_statement(statements[0], parse_result(record('2025-08-01', 'FACTURE STEG', debit=1000)))
+        self.assertMatchesRecount()
+        self.assertEqual(get_counters().total_statements, 2)
+
+    def test_missing_row_is_rebuilt(self):
+        create_statement(statement_records(1, count=5))
+        Counters.objects.all().delete()
+        self.assertMatchesRecount()
+
+        Counters.objects.all().delete()
+        create_statement(statement_records(2, count=5))
+        self.assertEqual(Counters.objects.get().total_transactions, 10)
+        self.assertMatchesRecount()
+
+    def test_failed_save_leaves_counters_unchanged(self):
+        create_statement(statement_records(1, count=5))
+
+        def failing_records():
+            yield from statement_records(2, count=5)
+            raise ValueError("relevé tronqué")
+
+        with self.assertRaises(ValueError):
+            save_statement(BankStatement(name='Relevé', pdf_file='bank_statements/test.pdf'), {
+                'transactions': failing_records(), 'final_balance': None, 'total_transactions': 5,
+            })
+        self.assertMatchesRecount()
+        self.assertEqual(get_counters().total_statements, 1)
+
+
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        if not search_available():
+            self.skipTest("Base sans index plein texte")
+        create_statement([
+            record('2025-08-01', 'FACTURE STEG 0042'),
+            record('2025-08-02', 'ACHAT MONOPRIX STEG STEG'),
+            record('2025-08-03', 'RETRAIT DAB'),
+        ])
+
+    def search_checks(self):
+        return [message.id for message in run_checks(databases=['default']) if message.id.startswith('banktocsv.')]
+
+    def test_search_is_ranked_and_follows_updates(self):
+        result = search_transactions({'q': 'steg'})
+        self.assertTrue(result['ranked'])
+        self.assertEqual([t['libelle'] for t in result['transactions']],
+                         ['ACHAT MONOPRIX STEG STEG', 'FACTURE STEG 0042'])
+
+        Transaction.objects.filter(libelle='RETRAIT DAB').update(libelle='RETRAIT STEG')
+        Transaction.objects.filter(libelle='FACTURE STEG 0042').delete()
+        result = search_transactions({'q': 'steg'})
+        self.assertEqual(sorted(t['libelle'] for t in result['transactions']),
+                         ['ACHAT MONOPRIX STEG STEG', 'RETRAIT STEG'])
+
+    def test_check_passes_with_triggers(self):
+        self.assertEqual(self.search_checks(), [])
+
+    def test_check_fails_without_triggers(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Triggers FTS5 propres à SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {FTS_TABLE}_insert")
+        self.assertEqual(self.search_checks(), ['banktocsv.E001'])
+
+
+class TransactionsApiTests(TestCase):
+
+    def setUp(self):
+        # Plusieurs transactions par jour : l'ordre de page départage les dates égales par id
+        create_statement([
+            record('2025-08-01', 'VIREMENT SALAIRE', credit=2500000),
+            record('2025-08-03', 'ACHAT MONOPRIX', debit=42500),
+            record('2025-08-03', 'FACTURE STEG', debit=120000),
+            record('2025-08-03', 'RETRAIT DAB', debit=200000),
+            record('2025-08-03', 'VERSEMENT ESPECES', credit=300000),
+            record('2025-08-05', 'ACHAT CARREFOUR', debit=87250),
+        ])
+
+    def get(self, **params):
+        return self.client.get(reverse('banktocsv:transactions_list'), params)
+
+    def pages(self, **params):
+        """
+        Toutes les pages d'une requête, en suivant next_cursor
+        """
+        pages = []
+        cursor = None
+        while True:
+            query = dict(params, cursor=cursor) if cursor else params
+            response = self.get(**query)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()['data']
+            pages.append(page)
+            cursor = page['next_cursor']
+            if cursor is None:
+                return pages
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(date(2025, 8, 3), 1234)
+        self.assertNotIn('=', cursor)
+        self.assertNotIn('|', cursor)
+        self.assertEqual(decode_cursor(cursor), (date(2025, 8, 3), 1234))
+
+    def test_pages_follow_date_then_id(self):
+        expected = list(Transaction.objects.order_by('date_operation', 'id').values_list('id', flat=True))
+
+        pages = self.pages(limit=2, fields='id,date_operation')
+        self.assertEqual([page['count'] for page in pages], [2, 2, 2])
+        ids = [t['id'] for page in pages for t in page['transactions']]
+        # Sans doublon ni trou, y compris quand une page se termine au milieu d'une date
+        self.assertEqual(ids, expected)
+
+        last = pages[0]['transactions'][-1]
+        self.assertEqual(decode_cursor(pages[0]['next_cursor']),
+                         (date.fromisoformat(last['date_operation']), last['id']))
+
+    def test_cursor_keeps_filters(self):
+        pages = self.pages(limit=1, direction='debit', date_from='2025-08-03', date_to='2025-08-03')
+        self.assertEqual([(t['libelle'], t['debit']) for page in pages for t in page['transactions']],
+                         [('ACHAT MONOPRIX', 42.5), ('FACTURE STEG', 120.0), ('RETRAIT DAB', 200.0)])
+
+        # Montant en dinars, borne comprise
+        pages = self.pages(limit=1, amount_min='87.25', amount_max='300')
+        self.assertEqual([t['libelle'] for page in pages for t in page['transactions']],
+                         ['FACTURE STEG', 'RETRAIT DAB', 'VERSEMENT ESPECES', 'ACHAT CARREFOUR'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('!!!', encode_cursor(date(2025, 8, 3), 1)[:-4], 'MjAyNS0wOC0wMw'):
+            response = self.get(cursor=cursor)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['success'])
+
+
+@override_settings(JOBS_MAX_CONCURRENCY=2, JOBS_STALE_AFTER=600, JOBS_RETENTION=3600)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        temporary_media(self)
+
+    def enqueue(self, content=None, kind=ParseJob.KIND_STATEMENT, **fields):
+        job = ParseJob(kind=kind, name='Relevé du job', max_attempts=3, **fields)
+        job.pdf_file.save('releve.pdf', ContentFile(content or statement_pdf()), save=False)
+        job.save()
+        return job
+
+    def test_claims_take_distinct_slots(self):
+        for _ in range(3):
+            self.enqueue()
+        first, second = jobs.claim_job(), jobs.claim_job()
+        self.assertEqual({first.slot, second.slot}, {0, 1})
+        self.assertNotEqual(first.id, second.id)
+        # Limite atteinte : le troisième job reste en attente
+        self.assertIsNone(jobs.claim_job())
+        self.assertEqual(ParseJob.objects.filter(status=ParseJob.STATUS_PENDING).count(), 1)
+
+    def test_slot_is_unique_in_database(self):
+        self.enqueue(status=ParseJob.STATUS_RUNNING, slot=0)
+        with self.assertRaises(IntegrityError):
+            self.enqueue(status=ParseJob.STATUS_RUNNING, slot=0)
+
+    def test_claim_retries_slot_taken_concurrently(self):
+        mine, other = self.enqueue(), self.enqueue()
+        now = timezone.now
+
+        def concurrent_claim():
+            # Un autre worker prend l'emplacement 0 entre la lecture des emplacements et l'UPDATE
+            ParseJob.objects.filter(id=other.id).update(status=ParseJob.STATUS_RUNNING, slot=0)
+            timezone_mock.now.side_effect = now
+            return now()
+
+        with mock.patch.object(jobs, 'timezone') as timezone_mock:
+            timezone_mock.now.side_effect = concurrent_claim
+            claimed = jobs.claim_job()
+        self.assertEqual((claimed.id, claimed.slot, claimed.attempts), (mine.id, 1, 1))
+
+    def test_stale_job_is_reclaimed(self):
+        stale = timezone.now() - timedelta(seconds=601)
+        job = self.enqueue(status=ParseJob.STATUS_RUNNING, slot=0, attempts=1, heartbeat_at=stale)
+        exhausted = self.enqueue(status=ParseJob.STATUS_RUNNING, slot=1, attempts=3, heartbeat_at=stale)
+        alive = self.enqueue(status=ParseJob.STATUS_RUNNING, slot=2, attempts=1, heartbeat_at=timezone.now())
+
+        self.assertEqual(jobs.cleanup_jobs(), (2, 0))
+        exhausted.refresh_from_db()
+        self.assertEqual((exhausted.status, exhausted.slot), (ParseJob.STATUS_FAILED, None))
+        alive.refresh_from_db()
+        self.assertEqual((alive.status, alive.slot), (ParseJob.STATUS_RUNNING, 2))
+
+        claimed = jobs.claim_job()
+        self.assertEqual((claimed.id, claimed.attempts), (job.id, 2))
+        self.assertIsNotNone(claimed.slot)
+
+    def test_run_links_statement_and_frees_slot(self):
+        job = self.enqueue()
+        job = jobs.claim_job()
+        jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.slot), (ParseJob.STATUS_SUCCEEDED, None))
+        self.assertEqual(job.bank_statement.total_transactions, 40)
+        self.assertEqual(job.bank_statement.transactions.count(), 40)
+        self.assertGreaterEqual(job.heartbeat_at, job.started_at)
+
+    @override_settings(JOBS_PARSER_WORKERS=3)
+    def test_jobs_parse_with_their_own_workers(self):
+        # Requête web : extraction dans le processus de la requête
+        self.assertEqual(get_parser(ContentFile(statement_pdf(pages=1))).workers, 1)
+        job = self.enqueue(kind=ParseJob.KIND_CONVERT)
+        with mock.patch.object(jobs, 'parse_upload', wraps=parse_upload) as parse:
+            jobs.run_job(jobs.claim_job())
+        self.assertEqual(parse.call_args.kwargs['workers'], 3)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ParseJob.STATUS_SUCCEEDED)
+
+    def test_failed_parse_links_no_statement(self):
+        self.enqueue(content=b'%PDF-1.4 tronque')
+        job = jobs.claim_job()
+        with self.assertLogs('banktocsv.jobs', 'ERROR'):
+            jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.slot, job.attempts), (ParseJob.STATUS_PENDING, None, 1))
+        self.assertIsNone(job.bank_statement)
+        self.assertTrue(job.error)
+        self.assertFalse(BankStatement.objects.exists())
+
+    def test_statement_saved_once_per_job(self):
+        job = self.enqueue(status=ParseJob.STATUS_RUNNING, slot=0, attempts=1)
+        result = {
+            'transactions': [record('2025-08-01', 'FACTURE STEG', debit=12000)],
+            'final_balance': None,
+            'total_transactions': 1,
+        }
+        first = jobs._save_job_statement(job, result)
+        # Tentative concurrente, partie avant que le relevé ne soit lié
+        second = jobs._save_job_statement(ParseJob.objects.get(id=job.id), result)
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(BankStatement.objects.count(), 1)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_cleanup_deletes_only_expired_finished_jobs(self):
+        old = timezone.now() - timedelta(seconds=3601)
+        expired = [
+            self.enqueue(status=ParseJob.STATUS_SUCCEEDED, finished_at=old),
+            self.enqueue(status=ParseJob.STATUS_FAILED, finished_at=old),
+        ]
+        kept = [
+            self.enqueue(status=ParseJob.STATUS_SUCCEEDED, finished_at=timezone.now()),
+            self.enqueue(status=ParseJob.STATUS_PENDING, created_at=old),
+            self.enqueue(status=ParseJob.STATUS_RUNNING, slot=0, heartbeat_at=timezone.now()),
+        ]
+        paths = [job.pdf_file.path for job in expired]
+
+        self.assertEqual(jobs.cleanup_jobs(), (0, 2))
+        self.assertEqual(set(ParseJob.objects.values_list('id', flat=True)), {job.id for job in kept})
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+
+def parse_result(*records):
+    return {'transactions': list(records), 'final_balance': None, 'total_transactions': len(records)}
+
+
+class ParseCacheTests(TestCase):
+
+    def setUp(self):
+        self.disk_dir = tempfile.mkdtemp(prefix='banktocsv-cache-')
+        self.addCleanup(shutil.rmtree, self.disk_dir, ignore_errors=True)
+
+    def disk_keys(self):
+        return sorted(name[:-len('.json')] for name in os.listdir(self.disk_dir) if name.endswith('.json'))
+
+    def age(self, key, seconds):
+        path = os.path.join(self.disk_dir, f"{key}.json")
+        mtime = os.stat(path).st_mtime - seconds
+        os.utime(path, (mtime, mtime))
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        cache = ParseResultCache(max_entries=2)
+        cache.set('a', parse_result())
+        cache.set('b', parse_result())
+        cache.get('a')
+        cache.set('c', parse_result())
+        self.assertEqual([key for key in 'abc' if cache.contains(key)], ['a', 'c'])
+
+    def test_disk_tier_round_trip(self):
+        transaction = record('2025-08-01', 'FACTURE STEG', debit=12345, category='Énergie')
+        ParseResultCache(disk_dir=self.disk_dir).set('a', parse_result(transaction))
+        # Autre worker : mémoire vide, résultat relu sur disque
+        self.assertEqual(ParseResultCache(disk_dir=self.disk_dir).get('a')['transactions'], [transaction])
+
+    def test_disk_tier_pruned_to_size_limit(self):
+        cache = ParseResultCache(max_entries=1, disk_dir=self.disk_dir)
+        for index, key in enumerate('abc'):
+            cache.set(key, parse_result(record('2025-08-01', 'FACTURE STEG', debit=1000)))
+            self.age(key, 100 - index * 10)
+        entry_size = os.path.getsize(os.path.join(self.disk_dir, 'a.json'))
+
+        # Lecture de a : il devient le plus récemment utilisé
+        cache.clear()
+        cache.get('a')
+        cache.max_bytes = 3 * entry_size
+        cache.set('d', parse_result(record('2025-08-01', 'FACTURE STEG', debit=1000)))
+        self.assertEqual(self.disk_keys(), ['a', 'c', 'd'])
+
+    def test_disk_tier_drops_expired_entries(self):
+        cache = ParseResultCache(max_entries=1, disk_dir=self.disk_dir, max_age=60)
+        cache.set('a', parse_result())
+        cache.set('b', parse_result())
+        self.age('a', 120)
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertFalse(cache.contains('a'))
+        self.assertEqual(self.disk_keys(), ['b'])
+
+        self.age('b', 120)
+        self.assertEqual(cache.prune(), 1)
+        self.assertEqual(self.disk_keys(), [])
+
+    def test_key_covers_parser_backend_and_rules(self):
+        rule_set = RuleSet([Rule('STEG', DEBIT)])
+        with override_settings(STATEMENT_PARSER='auto', PDF_EXTRACTION_BACKEND='pdfplumber'):
+            key = cache_key('0' * 64, rule_set)
+            self.assertNotEqual(key, cache_key('1' * 64, rule_set))
+            self.assertNotEqual(key, cache_key('0' * 64, RuleSet([Rule('STEG', CREDIT)])))
+            self.assertEqual(key, cache_key('0' * 64, RuleSet([Rule('STEG', DEBIT)])))
+            with mock.patch.object(parse_cache, 'PARSERS_VERSION', 'attijari99'):
+                self.assertNotEqual(key, cache_key('0' * 64, rule_set))
+        with override_settings(STATEMENT_PARSER='attijari', PDF_EXTRACTION_BACKEND='pdfplumber'):
+            self.assertNotEqual(key, cache_key('0' * 64, rule_set))
+        with override_settings(STATEMENT_PARSER='auto', PDF_EXTRACTION_BACKEND='pypdfium2'):
+            self.assertNotEqual(key, cache_key('0' * 64, rule_set))
+        # 'auto' désigne le premier moteur disponible : même clé que pdfplumber
+        with override_settings(STATEMENT_PARSER='auto', PDF_EXTRACTION_BACKEND='auto'):
+            self.assertEqual(key, cache_key('0' * 64, rule_set))
+
+    @override_settings(PARSE_CACHE_DISK=False, CLASSIFICATION_RULES_RELOAD_INTERVAL=0, CLASSIFICATION_RULES_FILE='')
+    def test_backend_or_rules_change_misses_cache(self):
+        self.addCleanup(setattr, parse_cache, '_cache', None)
+        self.addCleanup(rules._cache.update, rule_set=None, signature=None, checked_at=0.0)
+        parse_cache._cache = None
+        rules._cache.update(rule_set=None, signature=None, checked_at=0.0)
+        upload = ContentFile(statement_pdf(pages=1), name='releve.pdf')
+
+        with override_settings(PDF_EXTRACTION_BACKEND='pdfplumber'):
+            self.assertIsNone(get_cached_result(upload))
+            result = parse_upload(upload)
+            self.assertIs(get_cached_result(upload), result)
+        with override_settings(PDF_EXTRACTION_BACKEND='pypdfium2'):
+            self.assertIsNone(get_cached_result(upload))
+
+        with override_settings(PDF_EXTRACTION_BACKEND='pdfplumber'):
+            ClassificationRule.objects.create(keyword='STEG', category='Énergie', position=1)
+            self.assertIsNone(get_cached_result(upload))
+
+
+@override_settings(RESULT_HANDLE_TTL=3600)
+class ResultHandleTests(TestCase):
+
+    def setUp(self):
+        self.result = parse_result(
+            record('2025-08-01', 'FACTURE STEG', debit=42500),
+            record('2025-08-02', 'VIREMENT SALAIRE', credit=2500000),
+        )
+        self.rows = [
+            ['2025-08-01', '2025-08-01', 'FACTURE STEG', 42.5, 0.0],
+            ['2025-08-02', '2025-08-02', 'VIREMENT SALAIRE', 0.0, 2500.0],
+        ]
+
+    def download(self, token):
+        return self.client.post(reverse('banktocsv:download_direct'), {'result_token': token, 'format_type': 'csv'})
+
+    def test_round_trip(self):
+        token = issue_handle('cle-du-releve', result=self.result)
+        self.assertEqual(list(resolve_handle(token)), self.rows)
+        # Même relevé renvoyé : une seule ligne conservée
+        issue_handle('cle-du-releve', result=self.result)
+        self.assertEqual(ConversionResult.objects.count(), 1)
+
+        response = self.download(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('FACTURE STEG', b''.join(response.streaming_content).decode('utf-8-sig'))
+
+    def test_tampered_token_is_rejected(self):
+        issue_handle('autre-releve', result=self.result)
+        token = issue_handle('cle-du-releve', result=self.result)
+        # Référence signée avec une autre clé, ou substituée sous la signature d'origine
+        forged = signing.dumps({'key': 'autre-releve'}, salt='banktocsv.result_handles', key='autre-secret')
+        swapped = forged.split(':', 1)[0] + ':' + token.split(':', 1)[1]
+        altered = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        for candidate in (forged, swapped, altered):
+            self.assertIsNone(resolve_handle(candidate))
+            self.assertEqual(self.download(candidate).status_code, 410)
+
+    def test_expired_token_is_rejected(self):
+        with mock.patch('django.core.signing.time.time', return_value=timezone.now().timestamp() - 3601):
+            token = issue_handle('cle-du-releve', result=self.result)
+        # Résultat encore en base : seule la signature a expiré
+        self.assertTrue(ConversionResult.objects.filter(key='cle-du-releve').exists())
+        self.assertIsNone(resolve_handle(token))
+        self.assertEqual(self.download(token).status_code, 410)
+
+    def test_purged_result_is_gone(self):
+        token = issue_handle('cle-du-releve', result=self.result)
+        ConversionResult.objects.update(created_at=timezone.now() - timedelta(seconds=3601))
+        # Signature valide, mais résultat hors délai avant même la purge
+        self.assertIsNone(resolve_handle(token))
+        self.assertEqual(purge_results(), 1)
+        self.assertIsNone(resolve_handle(token))
+        self.assertEqual(self.download(token).status_code, 410)
+
+
+def zip_upload(name, members, declared_sizes=None):
+    """
+    Archive ZIP uploadée ; declared_sizes remplace la taille décompressée annoncée de certains membres
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for member_name, content in members.items():
+            archive.writestr(member_name, content)
+        for info in archive.infolist():
+            info.file_size = (declared_sizes or {}).get(info.filename, info.file_size)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='application/zip')
+
+
+def pdf_upload(name, content=None):
+    return SimpleUploadedFile(name, content or statement_pdf(pages=1), content_type='application/pdf')
+
+
+@override_settings(BATCH_WORKERS=2, BATCH_UPLOAD_MAX_FILES=5, PDF_UPLOAD_MAX_SIZE=1024 * 1024)
+class BatchUploadTests(TestCase):
+
+    def upload(self, *files, **data):
+        response = self.client.post(reverse('banktocsv:batch_upload'), {'pdf_files': list(files), **data})
+        return response, response.json() if response['Content-Type'] == 'application/json' else None
+
+    def files(self, payload):
+        return [(f['source'], f['success']) for f in payload['data']['files']]
+
+    def test_mixed_pdfs_and_archives(self):
+        response, payload = self.upload(
+            pdf_upload('juillet.pdf', statement_pdf(pages=1, seed=1)),
+            zip_upload('releves.zip', {
+                'aout.pdf': statement_pdf(pages=2, seed=2),
+                'lisezmoi.txt': b'ignore',
+                '__MACOSX/._aout.pdf': b'ignore',
+                'errone.pdf': b'%PDF-1.4 tronque',
+            }),
+            SimpleUploadedFile('notes.txt', b'ignore'),
+        )
+        self.assertTrue(payload['success'])
+        # Un fichier en erreur n'empêche pas le traitement des autres
+        self.assertEqual(self.files(payload), [
+            ('juillet.pdf', True), ('aout.pdf', True), ('errone.pdf', False), ('notes.txt', False),
+        ])
+        self.assertEqual(payload['data']['total_transactions'], 60)
+        self.assertEqual(
+            [t['source'] for t in payload['data']['transactions']],
+            ['juillet.pdf'] * 20 + ['aout.pdf'] * 40,
+        )
+
+        response, _ = self.upload(
+            pdf_upload('juillet.pdf', statement_pdf(pages=1, seed=1)), zip_upload('vide.zip', {}),
+            format_type='csv',
+        )
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 21)
+        self.assertTrue(lines[1].startswith('juillet.pdf,'))
+
+    def test_invalid_archive_is_isolated(self):
+        _, payload = self.upload(pdf_upload('juillet.pdf'), SimpleUploadedFile('archive.zip', b'pas un zip'))
+        self.assertTrue(payload['success'])
+        self.assertEqual(self.files(payload), [('juillet.pdf', True), ('archive.zip', False)])
+
+    def test_archive_lying_about_sizes(self):
+        _, payload = self.upload(zip_upload('releves.zip', {
+            'juillet.pdf': statement_pdf(pages=1),
+            # Annoncé minuscule : la lecture s'arrête à la taille annoncée (CRC invalide)
+            'bombe.pdf': b'%PDF' + b'0' * 2 * 1024 * 1024,
+            # Annoncé au-delà de PDF_UPLOAD_MAX_SIZE : refusé sans être décompressé
+            'enorme.pdf': b'%PDF',
+        }, declared_sizes={'bombe.pdf': 100, 'enorme.pdf': 2 * 1024 * 1024}))
+        self.assertEqual(self.files(payload), [('juillet.pdf', True), ('bombe.pdf', False), ('enorme.pdf', False)])
+        self.assertIn('illisible', payload['data']['files'][1]['message'])
+        self.assertIn('trop volumineux', payload['data']['files'][2]['message'])
+
+    @override_settings(BATCH_UPLOAD_MAX_SIZE=1024 * 1024)
+    def test_decompressed_bytes_bounded_across_batch(self):
+        # Chaque archive tient dans la limite, pas leur contenu décompressé cumulé
+        member = {'releve.pdf': b'%PDF' + b'0' * 700 * 1024}
+        _, payload = self.upload(zip_upload('a.zip', member), zip_upload('b.zip', member))
+        self.assertFalse(payload['success'])
+        self.assertIn('trop volumineux', payload['message'])
+
+    def test_too_many_files(self):
+        members = {f"releve_{index}.pdf": b'%PDF' for index in range(4)}
+        _, payload = self.upload(zip_upload('a.zip', members))
+        self.assertEqual(payload['data']['total_files'], 4)
+
+        # Limite comptée sur l'ensemble du lot, avant de décompresser la seconde archive
+        files = [pdf_upload('juillet.pdf'), pdf_upload('aout.pdf'), zip_upload('a.zip', members)]
+        with mock.patch.object(zipfile.ZipFile, 'open', side_effect=AssertionError("membre décompressé")):
+            _, payload = self.upload(*files)
+        self.assertFalse(payload['success'])
+        self.assertIn('Trop de fichiers', payload['message'])
+
+
+class AttijariParserParityTests(TestCase):
+    """
+    Extraction parallèle, découpage au tableau, arrêt au solde final et moteurs
+    donnent les transactions de la référence : pdfplumber, page entière, un seul processus
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pdf = statement_pdf(pages=9, lines_per_page=25, seed=7, trailing_pages=3)
+        cls.reference = AttijariParser(crop_table=False, backend='pdfplumber', fallback=False).parse_pdf(cls.pdf)
+
+    def parse(self, **options):
+        parser = AttijariParser(fallback=False, **options)
+        return parser, parser.parse_pdf(self.pdf)
+
+    def test_reference(self):
+        self.assertEqual(self.reference['total_transactions'], 9 * 25)
+        self.assertEqual(self.reference['final_balance'], 1477110)
+        self.assertEqual(
+            {(t.debit > 0, t.credit > 0) for t in self.reference['transactions']}, {(True, False), (False, True)}
+        )
+
+    def test_variants_match_reference(self):
+        for backend in ('pdfplumber', 'pypdfium2'):
+            for workers in (1, 3):
+                with self.subTest(backend=backend, workers=workers):
+                    parser, result = self.parse(backend=backend, workers=workers, parallel_min_pages=2)
+                    self.assertEqual(result['transactions'], self.reference['transactions'])
+                    self.assertEqual(result['final_balance'], self.reference['final_balance'])
+                    # Pages de conditions générales ignorées après le solde final
+                    self.assertEqual(parser.pages_skipped, 3)
+
+    def test_fallback_to_other_backend(self):
+        # Mise en page que PDFium lirait dans un autre ordre : aucune transaction
+        with mock.patch.object(PdfiumDocument, 'page_text', return_value=''):
+            self.assertEqual(self.parse(backend='pypdfium2')[1]['transactions'], [])
+            result = AttijariParser(backend='pypdfium2').parse_pdf(self.pdf)
+        self.assertEqual(result['transactions'], self.reference['transactions'])
+        self.assertEqual(result['final_balance'], self.reference['final_balance'])
+
+
+class ParserDetectionTests(TestCase):
+
+    def test_detects_attijari_with_each_backend(self):
+        for backend in ('pdfplumber', 'pypdfium2'):
+            with self.subTest(backend=backend):
+                self.assertIs(registry.detect_parser(statement_pdf(pages=1), backend), AttijariParser)
+                # Code banque du RIB, sans le nom de la banque
+                document = text_pdf(['EXTRAIT DE COMPTE', 'RIB 04 018 0000000000000 00'])
+                self.assertIs(registry.detect_parser(document, backend), AttijariParser)
+
+    def test_fingerprint_beyond_truncation(self):
+        # Nom de la banque en pied de page, après FINGERPRINT_CHARS caractères
+        document = text_pdf(['EXTRAIT DE COMPTE'] + ['LIGNE DE TEXTE SANS EMPREINTE'] * 20 + ['ATTIJARI BANK'])
+        with mock.patch.object(registry, 'FINGERPRINT_CHARS', 100):
+            for backend in ('pdfplumber', 'pypdfium2'):
+                with self.subTest(backend=backend):
+                    self.assertIs(registry.detect_parser(document, backend), AttijariParser)
+
+    def test_unknown_statement(self):
+        document = text_pdf(['BANQUE INTERNATIONALE ARABE DE TUNISIE', 'RIB 08 006 0000000000000 00'], ['ATTIJARI BANK'])
+        with self.assertRaisesMessage(registry.UnknownStatementError, 'Banques prises en charge'):
+            registry.detect_parser(document)
+        with self.assertRaisesMessage(registry.UnknownStatementError, 'PDF scanné'):
+            registry.detect_parser(text_pdf([]))
+
+    def test_select_parser(self):
+        # Parser imposé : aucune reconnaissance, même pour un en-tête sans texte
+        self.assertIs(registry.select_parser(text_pdf([]), 'attijari'), AttijariParser)
+        with self.assertRaises(registry.UnknownStatementError):
+            registry.select_parser(text_pdf([]), 'auto')
+        with self.assertRaisesMessage(ValueError, 'Parser de relevé inconnu'):
+            registry.select_parser(statement_pdf(pages=1), 'biat')
+
+    def test_unknown_upload_rejected_when_auto(self):
+        document = SimpleUploadedFile('autre.pdf', text_pdf(['BANQUE INTERNATIONALE ARABE DE TUNISIE']))
+        with override_settings(STATEMENT_PARSER='auto'):
+            response = self.client.post(reverse('banktocsv:process_upload'), {'pdf_file': document})
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(response.json()['success'])
+
+
+@override_settings(ROOT_URLCONF='banktocsv.tests', PDF_UPLOAD_MAX_SIZE=64 * 1024)
+class UploadFormTests(TestCase):
+
+    def post(self, content, client=None):
+        upload = SimpleUploadedFile('releve.pdf', content, content_type='application/pdf')
+        return (client or self.client).post(reverse('upload_statement'), {'name': 'Relevé', 'pdf_file': upload})
+
+    def test_oversized_body_rejected_before_spooling(self):
+        with mock.patch.object(MemoryFileUploadHandler, 'receive_data_chunk') as memory_chunk, \
+                mock.patch.object(TemporaryFileUploadHandler, 'receive_data_chunk') as disk_chunk:
+            response = self.post(b'%PDF' + b'0' * 128 * 1024)
+        self.assertEqual(response.status_code, 413)
+        self.assertContains(response, 'trop volumineux', status_code=413)
+        memory_chunk.assert_not_called()
+        disk_chunk.assert_not_called()
+        self.assertFalse(BankStatement.objects.exists())
+
+    def test_csrf_checked_after_size_limit(self):
+        response = self.post(statement_pdf(pages=1), client=Client(enforce_csrf_checks=True))
+        self.assertEqual(response.status_code, 403)
+
+    def test_statement_saved(self):
+        temporary_media(self)
+        response = self.post(statement_pdf(pages=1))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(BankStatement.objects.get().total_transactions, 20)
+
+
+class ExportTests(TestCase):
+
+    def test_csv_matches_pandas_output(self):
+        # Octets de DataFrame.to_csv(index=False, encoding='utf-8-sig') pour les mêmes lignes
+        rows = [['2025-08-19', '2025-08-09', 'VERSEMENT "ESPECE", 091936', 0.0, 2254.258]]
+        expected = (
+            'Date Opération,Date Valeur,Libellé,Débit,Crédit\n'
+            '2025-08-19,2025-08-09,"VERSEMENT ""ESPECE"", 091936",0.0,2254.258\n'
+        ).encode('utf-8')
+        self.assertEqual(b''.join(iter_csv(rows)), CSV_BOM + expected)
+
+
+class XlsxWriterTests(TestCase):
+
+    def test_round_trip_through_openpyxl(self):
+        import openpyxl
+
+        rows = [
+            [date(2025, 8, 1), datetime(2025, 8, 1, 13, 45, 30), 'FACTURE <STEG> & "SONEDE"',
+             Decimal('1234.567'), 0.0, 42, True, None],
+            ['RETRAIT\x00 GAB\x1f 1234\tfin', date(1999, 12, 31), '', Decimal('-0.001'), 2254.258, -7, False, 'é'],
+        ] + [
+            [date(2025, 8, 1) + timedelta(days=index % 30), f"VIREMENT {index}", Decimal(index) / 1000]
+            for index in range(20000)
+        ]
+        headers = ['Date Opération', 'Valeur', 'Libellé', 'Débit', 'Crédit', 'Nombre', 'Pointé', 'Note']
+
+        chunks = list(iter_xlsx(iter(rows), headers, sheet_name='Relevé <août>'))
+        # Feuille produite en plusieurs morceaux (FLUSH_SIZE franchi à plusieurs reprises)
+        self.assertGreater(len(chunks), 3)
+
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(chunks)), read_only=True)
+        sheet = workbook['Relevé <août>']
+        values = [list(row) for row in sheet.iter_rows(values_only=True)]
+        workbook.close()
+
+        self.assertEqual(values[0], headers)
+        self.assertEqual(len(values), len(rows) + 1)
+        self.assertEqual(values[1], [
+            datetime(2025, 8, 1), datetime(2025, 8, 1, 13, 45, 30), 'FACTURE <STEG> & "SONEDE"',
+            1234.567, 0, 42, True,
+        ])
+        # Caractères de contrôle interdits en XML supprimés, tabulation conservée
+        self.assertEqual(values[2], ['RETRAIT GAB 1234\tfin', datetime(1999, 12, 31), None, -0.001, 2254.258, -7, False, 'é'])
+        self.assertEqual(values[-1], [datetime(2025, 8, 20), 'VIREMENT 19999', 19.999])
+
+
+class MetricsAccessTests(TestCase):
+
+    def test_disabled_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_ENABLED=True, METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_restricted_to_allowed_addresses(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.7').status_code, 404)
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
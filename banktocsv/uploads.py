@@ -0,0 +1,59 @@
+"""
+Gestion des uploads : limite de taille appliquée pendant la réception
+
+Les limites vérifiées dans les vues (pdf_file.size) n'interviennent qu'une
+fois le corps de la requête entièrement lu. Le handler ci-dessous compte les
+octets au fil de la réception et interrompt l'upload dès que la limite est
+dépassée (ou avant toute lecture si Content-Length l'annonce déjà).
+"""
+
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """
+    Interrompt l'upload quand le total des fichiers reçus dépasse max_size octets
+
+    À placer en tête de request.upload_handlers : il ne stocke rien lui-même et
+    laisse les handlers suivants (mémoire, fichier temporaire) recevoir les données.
+    """
+
+    def __init__(self, max_size, request=None):
+        super().__init__(request)
+        self.max_size = max_size
+        self.received = 0
+        self.exceeded = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Requête annoncée trop grande : le corps n'est pas lu du tout
+        if content_length > self.max_size:
+            self.exceeded = True
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.exceeded = True
+            raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def limit_upload_size(request, max_size):
+    """
+    Installe un SizeLimitUploadHandler sur la requête
+
+    Doit être appelée avant tout accès à request.POST / request.FILES (donc
+    dans une vue csrf_exempt, la vérification CSRF lisant request.POST).
+
+    Returns:
+        Le handler installé (handler.exceeded indique un dépassement)
+    """
+    handler = SizeLimitUploadHandler(max_size, request)
+    request.upload_handlers.insert(0, handler)
+    return handler
@@ -14,7 +14,13 @@ urlpatterns = [
     
     # APIs nécessaires pour le fonctionnement
     path('api/upload/', views.process_upload, name='process_upload'),
+    path('api/upload/batch/', views.batch_upload, name='batch_upload'),
     path('api/download/', views.download_direct, name='download_direct'),
+    path('api/jobs/<uuid:job_id>/', views.job_status, name='job_status'),
+    path('api/transactions/', views.transactions_list, name='transactions_list'),
+    path('api/transactions/search/', views.transactions_search, name='transactions_search'),
+    path('api/aggregates/monthly/', views.monthly_aggregates, name='monthly_aggregates'),
+    path('metrics', views.metrics, name='metrics'),
     
     # Redirections pour simplifier l'expérience utilisateur
     path('converter/', redirect_to_home, name='converter'),
@@ -1,16 +1,33 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.http import HttpResponse, Http404, JsonResponse
 from django.contrib import messages
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.utils import timezone
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 import os
 import tempfile
 from datetime import datetime
 
-from .models import BankStatement, Transaction
+from .models import BankStatement, ParseJob
 from .forms import BankStatementUploadForm, ExportFormatForm
-from parsers.attijari_parser import AttijariParser
+from .counters import get_counters
+from .ingest import save_statement, remove_statement
+from .parsing import parse_upload, upload_payload, get_cached_result, upload_key
+from .result_handles import issue_handle, resolve_handle
+from .jobs import enqueue_job, job_payload
+from .exports import csv_response, xlsx_response, statement_rows
+from .batch import BatchError, BATCH_EXPORT_HEADERS, collect_sources, parse_sources, batch_payload, batch_rows
+from .uploads import limit_upload_size
+from .metrics import get_metrics
+from .api import QueryError, transactions_page
+from .search import search_transactions
+from .aggregates import monthly_summary
+from parsers.registry import UnknownStatementError
+from parsers.timing import stage
 
 
 def index(request):
@@ -18,51 +35,63 @@ def index(request):
     Page d'accueil avec convertisseur intégré - Une seule page pour tout faire
     """
     bank_statements = BankStatement.objects.all()[:10]  # Derniers 10 relevés
+    # Totaux maintenus à l'écriture : pas de COUNT sur les tables
+    counters = get_counters()
     
     context = {
         'bank_statements': bank_statements,
-        'total_statements': BankStatement.objects.count(),
-        'total_transactions': Transaction.objects.count(),
+        'total_statements': counters.total_statements,
+        'total_transactions': counters.total_transactions,
+        'pdf_upload_max_size': settings.PDF_UPLOAD_MAX_SIZE,
     }
     
     return render(request, 'banktocsv/index.html', context)
 
 
+@csrf_exempt
 def upload_statement(request):
     """
     Vue pour l'upload de relevés bancaires
     """
+    if request.method == 'POST':
+        # Comme pour process_upload : la limite de taille est appliquée pendant la
+        # réception du corps, avant la vérification CSRF qui le lirait en entier
+        upload_limit = limit_upload_size(request, settings.PDF_UPLOAD_MAX_SIZE)
+        # Lecture du corps, interrompue dès que la limite est dépassée
+        request.FILES
+        
+        if upload_limit.exceeded:
+            messages.error(
+                request, f"Le fichier est trop volumineux (max {filesizeformat(settings.PDF_UPLOAD_MAX_SIZE)})"
+            )
+            return _render_upload_form(request, BankStatementUploadForm(), status=413)
+    
+    return _upload_statement(request)
+
+
+@csrf_protect
+def _upload_statement(request):
+    """
+    Enregistre le relevé envoyé par le formulaire (ou le met en file d'attente)
+    """
     if request.method == 'POST':
         form = BankStatementUploadForm(request.POST, request.FILES)
         
+        if form.is_valid() and settings.JOBS_ASYNC_UPLOADS:
+            # Le relevé sera créé par un worker une fois le PDF traité
+            job = enqueue_job(form.cleaned_data['pdf_file'], ParseJob.KIND_STATEMENT, form.cleaned_data['name'])
+            messages.info(request, f"Relevé en cours de traitement (job {job.id}).")
+            return redirect('banktocsv:index')
+        
         if form.is_valid():
+            bank_statement = None
             try:
-                # Sauvegarder le relevé
-                bank_statement = form.save()
-                
-                # Traiter le PDF avec le parser Attijari
-                parser = AttijariParser()
-                pdf_file_path = bank_statement.pdf_file.path
-                
-                with open(pdf_file_path, 'rb') as pdf_file:
-                    result = parser.parse_pdf(pdf_file)
-                
-                # Mettre à jour le relevé avec les données extraites
-                bank_statement.total_transactions = result['total_transactions']
-                bank_statement.final_balance = result['final_balance']
-                bank_statement.processed = True
-                bank_statement.save()
+                # Traiter le PDF avec le parser Attijari avant toute écriture en base
+                result = parse_upload(form.cleaned_data['pdf_file'])
                 
-                # Sauvegarder les transactions en base
-                for transaction_data in result['transactions']:
-                    Transaction.objects.create(
-                        bank_statement=bank_statement,
-                        date_operation=transaction_data['date_operation'],
-                        date_valeur=transaction_data['date_valeur'],
-                        libelle=transaction_data['libelle'],
-                        debit=transaction_data['debit'],
-                        credit=transaction_data['credit']
-                    )
+                # Le relevé et ses transactions sont écrits ensemble ou pas du tout
+                bank_statement = form.save(commit=False)
+                save_statement(bank_statement, result)
                 
                 messages.success(
                     request, 
@@ -73,17 +102,22 @@ def upload_statement(request):
                 
             except Exception as e:
                 messages.error(request, f"Erreur lors du traitement du PDF: {str(e)}")
-                # Supprimer le relevé si le traitement a échoué
-                if 'bank_statement' in locals():
-                    bank_statement.delete()
+                # Supprimer le fichier PDF si le traitement a échoué (la base a été annulée)
+                if bank_statement is not None and bank_statement.pdf_file:
+                    bank_statement.pdf_file.delete(save=False)
     else:
         form = BankStatementUploadForm()
     
+    return _render_upload_form(request, form)
+
+
+def _render_upload_form(request, form, status=200):
     context = {
         'form': form,
+        'pdf_upload_max_size': settings.PDF_UPLOAD_MAX_SIZE,
     }
     
-    return render(request, 'banktocsv/upload.html', context)
+    return render(request, 'banktocsv/upload.html', context, status=status)
 
 
 def statement_detail(request, statement_id):
@@ -117,52 +151,17 @@ def export_statement(request, statement_id):
         if form.is_valid():
             export_format = form.cleaned_data['export_format']
             
-            # Récupérer les transactions
-            transactions = bank_statement.transactions.all()
-            
-            # Créer le DataFrame
-            import pandas as pd
-            data = []
-            for transaction in transactions:
-                data.append({
-                    'Date Opération': transaction.date_operation,
-                    'Date Valeur': transaction.date_valeur,
-                    'Libellé': transaction.libelle,
-                    'Débit': float(transaction.debit),
-                    'Crédit': float(transaction.credit)
-                })
-            
-            df = pd.DataFrame(data)
-            
             # Générer le nom du fichier
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"releve_{bank_statement.name}_{timestamp}"
             
             if export_format == 'csv':
-                # Export CSV
-                response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-                response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-                
-                # Ajouter BOM pour Excel
-                response.write('\ufeff')
-                df.to_csv(response, index=False, encoding='utf-8-sig')
-                
-                return response
+                # Export CSV streamé depuis la base
+                return csv_response(statement_rows(bank_statement), f"{filename}.csv")
                 
             elif export_format == 'excel':
-                # Export Excel
-                response = HttpResponse(
-                    content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                )
-                response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
-                
-                # Utiliser openpyxl pour Excel
-                from io import BytesIO
-                output = BytesIO()
-                df.to_excel(output, index=False, engine='openpyxl')
-                response.write(output.getvalue())
-                
-                return response
+                # Export Excel streamé depuis la base
+                return xlsx_response(statement_rows(bank_statement), f"{filename}.xlsx")
     else:
         form = ExportFormatForm()
     
@@ -183,30 +182,8 @@ def download_csv(request, statement_id):
     if not bank_statement.processed:
         raise Http404("Relevé non traité")
     
-    # Récupérer les transactions
-    transactions = bank_statement.transactions.all()
-    
-    # Créer le CSV
-    import csv
-    response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-    response['Content-Disposition'] = f'attachment; filename="releve_{bank_statement.name}.csv"'
-    
-    # Ajouter BOM pour Excel
-    response.write('\ufeff')
-    
-    writer = csv.writer(response)
-    writer.writerow(['Date Opération', 'Date Valeur', 'Libellé', 'Débit', 'Crédit'])
-    
-    for transaction in transactions:
-        writer.writerow([
-            transaction.date_operation,
-            transaction.date_valeur,
-            transaction.libelle,
-            float(transaction.debit),
-            float(transaction.credit)
-        ])
-    
-    return response
+    # Export CSV streamé depuis la base
+    return csv_response(statement_rows(bank_statement), f"releve_{bank_statement.name}.csv")
 
 
 def download_excel(request, statement_id):
@@ -218,35 +195,8 @@ def download_excel(request, statement_id):
     if not bank_statement.processed:
         raise Http404("Relevé non traité")
     
-    # Récupérer les transactions
-    transactions = bank_statement.transactions.all()
-    
-    # Créer le DataFrame
-    import pandas as pd
-    data = []
-    for transaction in transactions:
-        data.append({
-            'Date Opération': transaction.date_operation,
-            'Date Valeur': transaction.date_valeur,
-            'Libellé': transaction.libelle,
-            'Débit': float(transaction.debit),
-            'Crédit': float(transaction.credit)
-        })
-    
-    df = pd.DataFrame(data)
-    
-    # Export Excel
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="releve_{bank_statement.name}.xlsx"'
-    
-    from io import BytesIO
-    output = BytesIO()
-    df.to_excel(output, index=False, engine='openpyxl')
-    response.write(output.getvalue())
-    
-    return response
+    # Export Excel streamé depuis la base
+    return xlsx_response(statement_rows(bank_statement), f"releve_{bank_statement.name}.xlsx")
 
 
 def delete_statement(request, statement_id):
@@ -263,7 +213,7 @@ def delete_statement(request, statement_id):
             
             # Supprimer le relevé (les transactions seront supprimées automatiquement via CASCADE)
             statement_name = bank_statement.name
-            bank_statement.delete()
+            remove_statement(bank_statement)
             
             messages.success(request, f"Le relevé '{statement_name}' a été supprimé avec succès.")
             return redirect('banktocsv:index')
@@ -293,126 +243,250 @@ def converter(request):
     """
     Page unique du convertisseur - Upload, traitement et export en une seule page
     """
-    context = {}
+    context = {'pdf_upload_max_size': settings.PDF_UPLOAD_MAX_SIZE}
     return render(request, 'banktocsv/converter.html', context)
 
 
+@csrf_exempt
 def process_upload(request):
     """
     Traitement direct de l'upload de fichier sans base de données
     """
-    if request.method == 'POST':
-        pdf_file = request.FILES.get('pdf_file')
-        
-        if not pdf_file:
-            return JsonResponse({
-                'success': False,
-                'message': 'Aucun fichier PDF fourni'
-            })
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'})
+    
+    # La limite de taille est appliquée pendant la réception du corps (écrit sur
+    # disque par morceaux), qui n'a pas encore été lu : la vérification CSRF est faite ensuite
+    upload_limit = limit_upload_size(request, settings.PDF_UPLOAD_MAX_SIZE)
+    pdf_file = request.FILES.get('pdf_file')
+    
+    if upload_limit.exceeded:
+        return JsonResponse({
+            'success': False,
+            'message': f"Le fichier est trop volumineux (max {filesizeformat(settings.PDF_UPLOAD_MAX_SIZE)})"
+        }, status=413)
+    
+    return _process_upload(request, pdf_file)
+
+
+@csrf_protect
+def _process_upload(request, pdf_file):
+    """
+    Parse le PDF envoyé au convertisseur (ou le met en file d'attente)
+    """
+    if not pdf_file:
+        return JsonResponse({
+            'success': False,
+            'message': 'Aucun fichier PDF fourni'
+        })
+    
+    # Vérifier le type de fichier
+    if not pdf_file.name.lower().endswith('.pdf'):
+        return JsonResponse({
+            'success': False,
+            'message': 'Le fichier doit être un PDF'
+        })
+    
+    key = upload_key(pdf_file)
+    
+    if settings.JOBS_ASYNC_UPLOADS or request.POST.get('async') == '1':
+        # Un envoi identique déjà traité est servi immédiatement
+        result = get_cached_result(pdf_file, key)
+        if result is not None:
+            with stage('serialize'):
+                return JsonResponse({'success': True, **upload_payload(result, issue_handle(key, result=result))})
         
-        # Vérifier le type de fichier
-        if not pdf_file.name.lower().endswith('.pdf'):
-            return JsonResponse({
-                'success': False,
-                'message': 'Le fichier doit être un PDF'
-            })
+        job = enqueue_job(pdf_file)
+        return JsonResponse({
+            'success': True,
+            'message': 'Relevé en file d\'attente de traitement',
+            'job_id': str(job.id),
+            'status_url': reverse('banktocsv:job_status', args=[job.id]),
+        }, status=202)
+    
+    try:
+        # Traiter le PDF avec le parser de sa banque (ou réutiliser un envoi identique)
+        result = parse_upload(pdf_file, key=key)
         
-        # Vérifier la taille du fichier (max 10MB)
-        if pdf_file.size > 10 * 1024 * 1024:
-            return JsonResponse({
-                'success': False,
-                'message': 'Le fichier est trop volumineux (max 10MB)'
-            })
+        # Le résultat est conservé en base derrière le jeton : le téléchargement n'envoie que le jeton
+        with stage('serialize'):
+            return JsonResponse({'success': True, **upload_payload(result, issue_handle(key, result=result))})
         
-        try:
-            # Traiter le PDF avec le parser Attijari
-            parser = AttijariParser()
-            result = parser.parse_pdf(pdf_file)
-            
-            # Préparer les données des transactions
-            transactions_data = []
-            for transaction_data in result['transactions']:
-                transactions_data.append({
-                    'date_operation': transaction_data['date_operation'],
-                    'date_valeur': transaction_data['date_valeur'],
-                    'libelle': transaction_data['libelle'],
-                    'debit': float(transaction_data['debit']),
-                    'credit': float(transaction_data['credit'])
-                })
-            
-            return JsonResponse({
-                'success': True,
-                'message': f"Relevé traité avec succès ! {result['total_transactions']} transactions extraites.",
-                'data': {
-                    'total_transactions': result['total_transactions'],
-                    'final_balance': float(result['final_balance']) if result['final_balance'] else None,
-                    'transactions': transactions_data
-                }
-            })
-            
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'message': f"Erreur lors du traitement du PDF: {str(e)}"
-            })
+    except UnknownStatementError as e:
+        # Refusé sur la première page, sans parser le document
+        return JsonResponse({'success': False, 'message': str(e)}, status=422)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': f"Erreur lors du traitement du PDF: {str(e)}"
+        })
+
+
+@csrf_exempt
+def batch_upload(request):
+    """
+    Conversion par lots : plusieurs PDF et/ou archives ZIP, parsés en parallèle
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'})
     
-    return JsonResponse({'success': False, 'message': 'Méthode non autorisée'})
+    # La limite de taille est appliquée pendant la réception du corps, qui n'a
+    # pas encore été lu (la vérification CSRF est faite ensuite)
+    upload_limit = limit_upload_size(request, settings.BATCH_UPLOAD_MAX_SIZE)
+    uploaded_files = request.FILES.getlist('pdf_files')
+    
+    if upload_limit.exceeded:
+        return JsonResponse({
+            'success': False,
+            'message': f"L'envoi est trop volumineux (max {filesizeformat(settings.BATCH_UPLOAD_MAX_SIZE)})"
+        }, status=413)
+    
+    return _process_batch(request, uploaded_files)
+
+
+@csrf_protect
+def _process_batch(request, uploaded_files):
+    """
+    Parse les relevés d'un lot et renvoie le résultat combiné (JSON) ou un export fusionné
+    """
+    if not uploaded_files:
+        return JsonResponse({
+            'success': False,
+            'message': 'Aucun fichier PDF fourni'
+        })
+    
+    format_type = request.POST.get('format_type', 'json')
+    if format_type not in ('json', 'csv', 'excel'):
+        return JsonResponse({'success': False, 'message': 'Format non supporté'})
+    
+    try:
+        sources = collect_sources(uploaded_files)
+    except BatchError as e:
+        return JsonResponse({'success': False, 'message': str(e)})
+    
+    parse_sources(sources)
+    with stage('serialize'):
+        payload = batch_payload(sources)
+    
+    if format_type == 'json' or not payload['data']['succeeded']:
+        return JsonResponse({'success': payload['data']['succeeded'] > 0, **payload})
+    
+    # Export fusionné, avec le relevé d'origine en première colonne
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"releves_{timestamp}"
+    
+    if format_type == 'csv':
+        response = csv_response(batch_rows(sources), f"{filename}.csv", BATCH_EXPORT_HEADERS)
+    else:
+        response = xlsx_response(batch_rows(sources), f"{filename}.xlsx", BATCH_EXPORT_HEADERS)
+    
+    # Fichiers en erreur, signalés sans interrompre le téléchargement
+    response['X-Batch-Failed'] = str(payload['data']['failed'])
+    return response
+
+
+def metrics(request):
+    """
+    Latences par étape et par vue, et compteurs, au format texte Prometheus
+
+    Réservé aux comptes staff et aux adresses de METRICS_ALLOWED_IPS ; les
+    autres requêtes reçoivent la même réponse que si l'endpoint était désactivé.
+    """
+    if not settings.METRICS_ENABLED:
+        raise Http404("Métriques désactivées")
+    
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS):
+        raise Http404("Métriques désactivées")
+    
+    return HttpResponse(get_metrics().render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def job_status(request, job_id):
+    """
+    Suivi d'un job de parsing : statut, avancement et résultat une fois terminé
+    """
+    job = ParseJob.objects.filter(id=job_id).first()
+    
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'Job introuvable'}, status=404)
+    
+    return JsonResponse({'success': True, 'job': job_payload(job)})
+
+
+def transactions_list(request):
+    """
+    Transactions enregistrées, filtrées et paginées (voir api.transactions_page)
+    """
+    try:
+        with stage('db_read'):
+            page = transactions_page(request.GET)
+    except QueryError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    with stage('serialize'):
+        return JsonResponse({'success': True, 'data': page})
+
+
+def transactions_search(request):
+    """
+    Recherche plein texte dans les libellés, résultats classés par pertinence
+    """
+    try:
+        with stage('db_read'):
+            results = search_transactions(request.GET)
+    except QueryError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    with stage('serialize'):
+        return JsonResponse({'success': True, 'data': results})
+
+
+def monthly_aggregates(request):
+    """
+    Totaux mensuels de débits et crédits (par mois ou par relevé), lus dans les agrégats
+    """
+    try:
+        with stage('db_read'):
+            summary = monthly_summary(request.GET)
+    except QueryError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    with stage('serialize'):
+        return JsonResponse({'success': True, 'data': summary})
 
 
 def download_direct(request):
     """
     Téléchargement direct des données traitées sans base de données
+    
+    Le résultat est désigné par le jeton (result_token) reçu avec la conversion
     """
     if request.method == 'POST':
-        import json
-        import pandas as pd
-        from io import BytesIO
-        
-        # Récupérer les données depuis le POST
-        transactions_data = request.POST.get('transactions_data')
+        result_token = request.POST.get('result_token')
         format_type = request.POST.get('format_type', 'csv')
         
-        if not transactions_data:
+        if not result_token:
             return JsonResponse({'success': False, 'message': 'Aucune donnée fournie'})
         
         try:
-            # Parser les données JSON
-            transactions = json.loads(transactions_data)
-            
-            # Créer le DataFrame
-            df = pd.DataFrame(transactions)
-            
-            # Renommer les colonnes pour l'affichage
-            df.columns = ['Date Opération', 'Date Valeur', 'Libellé', 'Débit', 'Crédit']
+            rows = resolve_handle(result_token)
+            if rows is None:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Résultat expiré ou introuvable, veuillez renvoyer le PDF'
+                }, status=410)
             
             # Générer le nom du fichier
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"releve_attijari_{timestamp}"
+            filename = f"releve_{timestamp}"
             
             if format_type == 'csv':
                 # Export CSV
-                response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-                response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-                
-                # Ajouter BOM pour Excel
-                response.write('\ufeff')
-                df.to_csv(response, index=False, encoding='utf-8-sig')
-                
-                return response
+                return csv_response(rows, f"{filename}.csv")
                 
             elif format_type == 'excel':
                 # Export Excel
-                response = HttpResponse(
-                    content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                )
-                response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
-                
-                # Utiliser openpyxl pour Excel
-                output = BytesIO()
-                df.to_excel(output, index=False, engine='openpyxl')
-                response.write(output.getvalue())
-                
-                return response
+                return xlsx_response(rows, f"{filename}.xlsx")
             
             return JsonResponse({'success': False, 'message': 'Format non supporté'})
             
@@ -431,51 +505,16 @@ def download_file(request, statement_id, format_type):
     if not bank_statement.processed:
         raise Http404("Relevé non traité")
     
-    # Récupérer les transactions
-    transactions = bank_statement.transactions.all()
-    
-    # Créer le DataFrame
-    import pandas as pd
-    data = []
-    for transaction in transactions:
-        data.append({
-            'Date Opération': transaction.date_operation,
-            'Date Valeur': transaction.date_valeur,
-            'Libellé': transaction.libelle,
-            'Débit': float(transaction.debit),
-            'Crédit': float(transaction.credit)
-        })
-    
-    df = pd.DataFrame(data)
-    
     # Générer le nom du fichier
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f"releve_{bank_statement.name}_{timestamp}"
     
     if format_type == 'csv':
-        # Export CSV
-        response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-        
-        # Ajouter BOM pour Excel
-        response.write('\ufeff')
-        df.to_csv(response, index=False, encoding='utf-8-sig')
-        
-        return response
+        # Export CSV streamé depuis la base
+        return csv_response(statement_rows(bank_statement), f"{filename}.csv")
         
     elif format_type == 'excel':
-        # Export Excel
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
-        
-        # Utiliser openpyxl pour Excel
-        from io import BytesIO
-        output = BytesIO()
-        df.to_excel(output, index=False, engine='openpyxl')
-        response.write(output.getvalue())
-        
-        return response
+        # Export Excel streamé depuis la base
+        return xlsx_response(statement_rows(bank_statement), f"{filename}.xlsx")
     
     raise Http404("Format non supporté")
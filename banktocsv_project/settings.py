@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Pour servir les fichiers statiques
+    'banktocsv.middleware.ServerTimingMiddleware',  # Durées des étapes (Server-Timing, /metrics)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -128,6 +129,107 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Parser des relevés
+# Nombre de processus utilisés pour extraire le texte des pages d'un PDF parsé
+# pendant une requête web : 1 (extraction dans le processus de la requête), sans
+# quoi chaque requête démarrerait son propre pool dans le worker gunicorn
+PARSER_WORKERS = int(os.environ.get('PARSER_WORKERS', 1))
+# En dessous de ce nombre de pages, l'extraction reste dans un seul processus
+PARSER_PARALLEL_MIN_PAGES = int(os.environ.get('PARSER_PARALLEL_MIN_PAGES', 8))
+# Moteur d'extraction du texte des PDF : pdfplumber, pypdfium2 (plus rapide), ou
+# auto (pdfplumber, la référence, tant que pypdfium2 n'est pas validé sur de vrais relevés)
+PDF_EXTRACTION_BACKEND = os.environ.get('PDF_EXTRACTION_BACKEND', 'auto')
+# Parser des relevés : le nom d'une banque de parsers.registry.PARSERS (attijari,
+# par défaut tant que l'empreinte n'est pas validée sur de vrais relevés : en-têtes
+# scannés, logos vectoriels...) ou auto (banque reconnue sur la première page,
+# document inconnu refusé)
+STATEMENT_PARSER = os.environ.get('STATEMENT_PARSER', 'attijari')
+
+# Règles de classification des transactions (sens et catégorie)
+# Fichier JSON utilisé si la table ClassificationRule ne contient aucune règle active
+CLASSIFICATION_RULES_FILE = os.environ.get('CLASSIFICATION_RULES_FILE', '')
+# Intervalle (secondes) entre deux vérifications de changement des règles
+CLASSIFICATION_RULES_RELOAD_INTERVAL = float(os.environ.get('CLASSIFICATION_RULES_RELOAD_INTERVAL', 5))
+
+# Cache des résultats de parsing (clé : SHA-256 du PDF + version du parser + version des règles)
+# Nombre de résultats gardés en mémoire par worker (LRU)
+PARSE_CACHE_SIZE = int(os.environ.get('PARSE_CACHE_SIZE', 128))
+# Niveau disque optionnel, partagé entre workers
+PARSE_CACHE_DISK = os.environ.get('PARSE_CACHE_DISK', 'False') == 'True'
+# Répertoire du niveau disque, hors de MEDIA_ROOT (jamais servi par /media/)
+PARSE_CACHE_DIR = os.environ.get('PARSE_CACHE_DIR', str(BASE_DIR / 'var' / 'parse_cache'))
+# Taille maximale du niveau disque (octets) : les entrées les moins récemment utilisées sont supprimées
+PARSE_CACHE_DISK_MAX_BYTES = int(os.environ.get('PARSE_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+# Durée (secondes) après laquelle une entrée du niveau disque non utilisée expire
+PARSE_CACHE_DISK_MAX_AGE = int(os.environ.get('PARSE_CACHE_DISK_MAX_AGE', 7 * 24 * 3600))
+# Durée de validité (secondes) des jetons de téléchargement d'un résultat du convertisseur,
+# et de conservation en base du résultat qu'ils désignent
+RESULT_HANDLE_TTL = int(os.environ.get('RESULT_HANDLE_TTL', 3600))
+
+# Nombre de transactions insérées par lot lors de l'enregistrement d'un relevé
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 1000))
+
+# Nombre de transactions lues par requête lors des exports streamés
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+# Taille par défaut et maximale d'une page de l'API /api/transactions/
+TRANSACTIONS_API_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_API_PAGE_SIZE', 100))
+TRANSACTIONS_API_MAX_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_API_MAX_PAGE_SIZE', 1000))
+
+# Jobs de parsing en arrière-plan (file d'attente en base, workers: manage.py banktocsv_worker)
+# Si True, /api/upload/ répond immédiatement avec un identifiant de job à suivre via /api/jobs/<id>/
+JOBS_ASYNC_UPLOADS = os.environ.get('JOBS_ASYNC_UPLOADS', 'False') == 'True'
+# Nombre maximal de jobs exécutés simultanément (et taille par défaut du pool de workers)
+JOBS_MAX_CONCURRENCY = int(os.environ.get('JOBS_MAX_CONCURRENCY', 2))
+# Nombre de processus d'extraction des pages par job (PARSER_WORKERS des workers de jobs)
+JOBS_PARSER_WORKERS = int(os.environ.get('JOBS_PARSER_WORKERS', min(4, os.cpu_count() or 1)))
+# Nombre de tentatives avant qu'un job soit marqué échoué
+JOBS_MAX_ATTEMPTS = int(os.environ.get('JOBS_MAX_ATTEMPTS', 3))
+# Attente (secondes) d'un worker inactif avant de réinterroger la file
+JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 1))
+# Un job en cours sans signe de vie depuis ce délai (secondes) est remis en file
+JOBS_STALE_AFTER = int(os.environ.get('JOBS_STALE_AFTER', 600))
+# Durée de conservation (secondes) des jobs terminés, et fréquence du nettoyage
+JOBS_RETENTION = int(os.environ.get('JOBS_RETENTION', 24 * 3600))
+JOBS_CLEANUP_INTERVAL = int(os.environ.get('JOBS_CLEANUP_INTERVAL', 60))
+
+# Taille maximale d'un PDF envoyé (octets), vérifiée pendant la réception
+PDF_UPLOAD_MAX_SIZE = int(os.environ.get('PDF_UPLOAD_MAX_SIZE', 100 * 1024 * 1024))
+# Uploads écrits sur disque par morceaux (jamais entièrement en mémoire), puis
+# projetés en mémoire (mmap) par le parser
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
+# Conversion par lots (/api/upload/batch/ : plusieurs PDF ou archives ZIP)
+# Taille totale maximale d'un envoi (octets), vérifiée pendant la réception
+BATCH_UPLOAD_MAX_SIZE = int(os.environ.get('BATCH_UPLOAD_MAX_SIZE', 100 * 1024 * 1024))
+# Nombre maximal de relevés dans un lot (PDF des archives compris)
+BATCH_UPLOAD_MAX_FILES = int(os.environ.get('BATCH_UPLOAD_MAX_FILES', 100))
+# Nombre de processus parsant les relevés d'un lot en parallèle
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+
+# Exposition des latences par étape et des compteurs sur /metrics (format Prometheus)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'False') == 'True'
+# Adresses autorisées à lire /metrics (collecteur Prometheus), en plus des comptes staff
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+# Nombre d'observations récentes sur lesquelles sont calculés les quantiles
+METRICS_WINDOW = int(os.environ.get('METRICS_WINDOW', 1024))
+
+# Journalisation des statistiques de l'application (ingestion, parsing...)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'banktocsv': {
+            'handlers': ['console'],
+            'level': os.environ.get('BANKTOCSV_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
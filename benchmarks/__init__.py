@@ -0,0 +1 @@
+# Benchmarks de performance du parser et des vues
@@ -0,0 +1,162 @@
+"""
+Contrôle de conformité et vitesse des moteurs d'extraction PDF
+
+Parse chaque relevé du corpus avec la référence (pdfplumber, pages entières)
+puis avec chaque moteur de parsers.backends (pdfplumber limité à la zone du
+tableau, pypdfium2...) et vérifie qu'ils produisent exactement les mêmes
+transactions et le même solde final. Le corpus comprend des relevés
+synthétiques de plusieurs formes et, avec --corpus, les PDF d'un répertoire
+(relevés réels anonymisés par exemple).
+
+Un moteur n'a sa place dans BACKENDS que s'il passe ce contrôle ; le script
+échoue si l'un d'eux ne le passe pas. Chaque moteur est contrôlé seul, sans
+relecture par un autre moteur (fallback) qui masquerait un échec.
+
+Usage:
+    python -m benchmarks.backend_conformance [--corpus répertoire] [--repeat 1]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from .synthetic import write_statement
+
+
+# Formes des relevés synthétiques : (pages, transactions par page, pages après le solde final)
+SYNTHETIC_SHAPES = [(1, 10, 0), (3, 40, 0), (12, 40, 2), (30, 45, 0)]
+
+
+@contextmanager
+def synthetic_corpus():
+    """
+    Écrit les relevés synthétiques du corpus dans un répertoire temporaire
+
+    Yields:
+        Chemins des relevés
+    """
+    with tempfile.TemporaryDirectory(prefix='banktocsv-conformance-') as directory:
+        paths = []
+        for seed, (pages, lines, trailing) in enumerate(SYNTHETIC_SHAPES):
+            path = os.path.join(directory, f"releve_{pages}p_{lines}l_{trailing}t.pdf")
+            write_statement(path, pages, lines, trailing, seed)
+            paths.append(path)
+        yield paths
+
+
+def corpus_paths(directory):
+    """
+    PDF d'un répertoire (parcouru récursivement), triés
+    """
+    paths = []
+    for dirpath, _, filenames in os.walk(directory):
+        paths.extend(os.path.join(dirpath, name) for name in filenames if name.lower().endswith('.pdf'))
+    return sorted(paths)
+
+
+def parse(path, backend, crop_table=True, repeat=1):
+    """
+    Parse un relevé avec un moteur
+
+    Returns:
+        Tuple (durée de la meilleure exécution, pages, transactions, solde final) ;
+        transactions est le message d'erreur si le parsing échoue
+    """
+    from parsers.attijari_parser import AttijariParser
+
+    best = None
+    for _ in range(repeat):
+        parser = AttijariParser(backend=backend, crop_table=crop_table, fallback=False)
+        start = time.perf_counter()
+        try:
+            parser.parse_pdf(path)
+        except Exception as e:
+            return 0.0, 0, str(e), None
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, parser.page_count, parser.transactions, parser.final_balance
+
+
+def first_difference(expected, actual):
+    """
+    Décrit la première différence entre deux listes de transactions
+    """
+    if isinstance(actual, str):
+        return f"erreur : {actual}"
+    for index, (left, right) in enumerate(zip(expected, actual)):
+        if left != right:
+            return f"transaction {index + 1} : {left!r} != {right!r}"
+    return f"{len(expected)} transactions attendues, {len(actual)} obtenues"
+
+
+def check_backends(paths, repeat=1):
+    """
+    Compare chaque moteur à la référence sur les relevés `paths`
+
+    Returns:
+        Dict nom du moteur -> {'seconds', 'pages', 'failures': [(chemin, différence)]}
+    """
+    from parsers.backends import BACKENDS
+
+    candidates = [('pdfplumber (zone tableau)', 'pdfplumber')]
+    candidates += [(name, name) for name in BACKENDS if name != 'pdfplumber' and BACKENDS[name].available()]
+
+    report = {'pdfplumber (référence)': {'seconds': 0.0, 'pages': 0, 'failures': []}}
+    report.update({label: {'seconds': 0.0, 'pages': 0, 'failures': []} for label, _ in candidates})
+
+    for path in paths:
+        seconds, pages, expected, expected_balance = parse(path, 'pdfplumber', crop_table=False, repeat=repeat)
+        reference = report['pdfplumber (référence)']
+        reference['seconds'] += seconds
+        reference['pages'] += pages
+        if isinstance(expected, str):
+            reference['failures'].append((path, f"erreur : {expected}"))
+            continue
+
+        for label, backend in candidates:
+            seconds, pages, actual, balance = parse(path, backend, repeat=repeat)
+            entry = report[label]
+            entry['seconds'] += seconds
+            entry['pages'] += pages
+            if actual != expected:
+                entry['failures'].append((path, first_difference(expected, actual)))
+            elif balance != expected_balance:
+                entry['failures'].append((path, f"solde final {expected_balance} != {balance}"))
+
+    return report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--corpus', default=None, help="Répertoire de PDF à ajouter au corpus synthétique")
+    arg_parser.add_argument('--repeat', type=int, default=1, help="Exécutions par relevé (meilleure durée retenue)")
+    args = arg_parser.parse_args()
+
+    from parsers.backends import AUTO, get_backend
+
+    extra = corpus_paths(args.corpus) if args.corpus else []
+    with synthetic_corpus() as synthetic:
+        paths = synthetic + extra
+        print(f"Corpus : {len(synthetic)} relevés synthétiques, {len(extra)} relevés de {args.corpus or '-'}")
+        report = check_backends(paths, args.repeat)
+
+    print(f"\n{'moteur':<28} {'durée':>10} {'pages/s':>10}  conformité")
+    failed = False
+    for label, entry in report.items():
+        rate = entry['pages'] / entry['seconds'] if entry['seconds'] else 0.0
+        status = 'OK' if not entry['failures'] else f"ÉCHEC ({len(entry['failures'])} relevés)"
+        print(f"{label:<28} {entry['seconds']:8.2f} s {rate:10.1f}  {status}")
+        for path, difference in entry['failures']:
+            print(f"    {os.path.basename(path)} : {difference}")
+        failed = failed or bool(entry['failures'])
+
+    print(f"\nMoteur sélectionné par '{AUTO}' : {get_backend(AUTO).name}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark des rapports mensuels : agrégats maintenus vs lecture des transactions
+
+Remplit une base de test (fichier SQLite temporaire, ou la base de test de
+DATABASE_URL) de relevés synthétiques totalisant --rows transactions, insérées
+par banktocsv.ingest (agrégats mensuels tenus à jour), puis mesure la latence
+médiane des totaux mensuels de débits/crédits :
+- transactions chargées dans pandas puis groupées (méthode des rapports actuels)
+- GROUP BY sur la table des transactions
+- banktocsv.aggregates.monthly_summary (table des agrégats)
+
+et la durée du recalcul complet (rebuild_aggregates).
+
+Usage:
+    python -m benchmarks.bench_aggregates [--rows 1000000] [--per-statement 2000] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from .bench_search import populate
+from .bench_suite import timed
+
+
+def report_pandas():
+    """
+    Totaux mensuels par sens calculés dans pandas à partir de toutes les transactions
+    """
+    import pandas as pd
+    from banktocsv.models import Transaction
+
+    frame = pd.DataFrame.from_records(
+        Transaction.objects.values_list('date_operation', 'debit', 'credit').iterator(chunk_size=10000),
+        columns=['date_operation', 'debit', 'credit'],
+    )
+    frame['month'] = pd.to_datetime(frame['date_operation']).dt.to_period('M')
+    return frame.groupby('month')[['debit', 'credit']].sum()
+
+
+def report_group_by():
+    """
+    Mêmes totaux par un GROUP BY sur la table des transactions
+    """
+    from django.db.models import Sum
+    from django.db.models.functions import TruncMonth
+    from banktocsv.models import Transaction
+
+    return list(
+        Transaction.objects.annotate(month=TruncMonth('date_operation'))
+        .values('month').annotate(debit=Sum('debit'), credit=Sum('credit')).order_by('month')
+    )
+
+
+def report_aggregates():
+    """
+    Mêmes totaux lus dans la table des agrégats mensuels
+    """
+    from banktocsv.aggregates import monthly_summary
+
+    return monthly_summary({})
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=1_000_000, help="Nombre de transactions en base")
+    arg_parser.add_argument('--per-statement', type=int, default=2000, help="Transactions par relevé")
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'banktocsv_project.settings')
+    import django
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment()
+
+    from django.db import connection
+    from banktocsv.aggregates import rebuild_aggregates
+    from banktocsv.models import MonthlyAggregate
+
+    with tempfile.TemporaryDirectory(prefix='banktocsv-aggregates-') as directory:
+        if connection.vendor == 'sqlite':
+            # Base de test sur disque (en mémoire par défaut) : conditions réelles
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            print(f"Insertion de {args.rows} transactions ({connection.vendor})")
+            rate = populate(args.rows, args.per_statement)
+            print(f"Débit d'insertion (agrégats compris) : {rate:,.0f} transactions/s")
+            print(f"Agrégats en base : {MonthlyAggregate.objects.count()}\n")
+
+            reports = [
+                ("pandas (toutes les transactions)", report_pandas),
+                ("GROUP BY sur les transactions", report_group_by),
+                ("agrégats mensuels", report_aggregates),
+            ]
+            for description, function in reports:
+                median = statistics.median(timed(function, args.repeat))
+                print(f"{description:<34} {median * 1000:10.2f} ms")
+
+            start = time.perf_counter()
+            written = rebuild_aggregates()
+            print(f"\nRecalcul complet ({written} agrégats) : {time.perf_counter() - start:.2f}s")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark de la reconnaissance de la banque (parsers.registry.detect_parser)
+
+Mesure, pour chaque moteur d'extraction installé, la latence médiane de
+detect_parser sur des documents synthétiques de tailles variées :
+- relevés Attijari (reconnus)
+- relevés d'une autre banque, de même mise en page (refusés)
+- documents sans relevé (conditions générales seules) et PDF sans texte (refusés)
+
+et la compare au parsing complet du même document par AttijariParser, ce que
+coûtait un document inconnu avant la reconnaissance (toutes les pages lues).
+
+Usage:
+    python -m benchmarks.bench_detection [--pages 1,10,100] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+
+from .bench_suite import timed
+from .synthetic import LEGAL_FOOTER, LETTERHEAD, make_statement, write_pdf
+
+
+# Textes d'une autre banque, à la place de l'en-tête et du pied de page Attijari
+OTHER_BANK = {
+    LETTERHEAD[0]: 'BANQUE EXEMPLE DE TUNISIE',
+    LETTERHEAD[3]: 'RIB 99 018 0000000000000 00 - Devise : TND',
+    LEGAL_FOOTER[0]: 'Banque Exemple - Société anonyme au capital de 100 000 000 dinars',
+}
+
+
+def write_corpus(directory, sizes):
+    """
+    Écrit les documents du benchmark
+
+    Returns:
+        Liste de (description, chemin, nombre de pages, reconnu attendu)
+    """
+    corpus = []
+    for pages in sizes:
+        content, _ = make_statement(pages)
+        path = os.path.join(directory, f"attijari_{pages}p.pdf")
+        write_pdf(content, path)
+        corpus.append((f"Attijari, {pages} p.", path, pages, True))
+
+        path = os.path.join(directory, f"autre_banque_{pages}p.pdf")
+        write_pdf([[(x, y, OTHER_BANK.get(text, text)) for x, y, text in items] for items in content], path)
+        corpus.append((f"autre banque, {pages} p.", path, pages, False))
+
+    pages = max(sizes)
+    content, _ = make_statement(pages=0, trailing_pages=pages)
+    path = os.path.join(directory, f"conditions_{pages}p.pdf")
+    write_pdf(content, path)
+    corpus.append((f"sans relevé, {pages} p.", path, pages, False))
+
+    path = os.path.join(directory, f"sans_texte_{pages}p.pdf")
+    write_pdf([[] for _ in range(pages)], path)
+    corpus.append((f"sans texte, {pages} p.", path, pages, False))
+    return corpus
+
+
+def bench_backend(backend_name, corpus, repeat):
+    """
+    Latences médianes (secondes) de la reconnaissance et du parsing complet
+
+    Returns:
+        Liste de (description, reconnu, médiane reconnaissance, médiane parsing complet)
+    """
+    from parsers.attijari_parser import AttijariParser
+    from parsers.registry import UnknownStatementError, detect_parser
+
+    def detect(path):
+        try:
+            detect_parser(path, backend_name)
+            return True
+        except UnknownStatementError:
+            return False
+
+    results = []
+    for description, path, _, expected in corpus:
+        recognized = detect(path)
+        if recognized != expected:
+            raise SystemExit(f"{description} : reconnu={recognized}, attendu {expected}")
+        detection = statistics.median(timed(lambda: detect(path), repeat))
+        parser = AttijariParser(backend=backend_name)
+        full = statistics.median(timed(lambda: parser.parse_pdf(path), max(1, repeat // 2)))
+        results.append((description, recognized, detection, full))
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pages', default='1,10,100', help="Tailles des documents (pages)")
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+    sizes = [int(value) for value in args.pages.split(',')]
+
+    from parsers.backends import BACKENDS
+
+    with tempfile.TemporaryDirectory(prefix='banktocsv-detection-') as directory:
+        corpus = write_corpus(directory, sizes)
+        for name, backend in BACKENDS.items():
+            if not backend.available():
+                continue
+            print(f"\nMoteur {name}")
+            print(f"{'document':<26} {'reconnu':>8} {'reconnaissance':>15} {'parsing complet':>16}")
+            for description, recognized, detection, full in bench_backend(name, corpus, args.repeat):
+                print(f"{description:<26} {'oui' if recognized else 'non':>8} "
+                      f"{detection * 1000:12.2f} ms {full * 1000:13.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
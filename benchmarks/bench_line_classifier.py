@@ -0,0 +1,105 @@
+"""
+Microbenchmark du classifieur de lignes Attijari
+
+Compare l'ancienne détection (plusieurs regex non compilées par ligne) au
+classifieur compilé en une seule passe, en lignes par seconde.
+
+Usage:
+    python -m benchmarks.bench_line_classifier [--lines N] [--repeat R]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from parsers.attijari_parser import classify_line, LINE_TRANSACTION
+from .synthetic import LIBELLES, format_amount
+
+
+def make_lines(count: int, seed: int = 42) -> list:
+    """
+    Génère un mélange réaliste de lignes de relevé (majoritairement des transactions)
+    """
+    rng = random.Random(seed)
+    noise = [
+        'Date Libellé Valeur Débit Crédit', 'SOLDE AU 31/07/2025 2,589',
+        'TOTAUX 1 234,000 5 678,000', 'ATTIJARI BANK - Agence Tunis Centre', 'Page 3',
+    ]
+    lines = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            lines.append(rng.choice(noise))
+        else:
+            lines.append(
+                f"{rng.randint(1, 28):02d} 08 {rng.choice(LIBELLES)[0]} "
+                f"{rng.randint(1, 28):02d} 08 2025 {format_amount(rng.randint(1, 9999999))}"
+            )
+    return lines
+
+
+def legacy_classify(line: str):
+    """
+    Reproduction de la détection d'origine (avant le classifieur compilé)
+    """
+    header_patterns = [
+        r'date.*libellé.*valeur.*débit.*crédit',
+        r'date.*libelle.*valeur.*debit.*credit',
+        r'date.*valeur.*debit.*credit',
+        r'date.*valeur.*débit.*crédit',
+    ]
+    if any(re.search(pattern, line.lower()) for pattern in header_patterns):
+        return 'header', None
+    
+    balance_patterns = [r'^SOLDE\s+[\d\s,]+$', r'^SOLDE\s+AU\s+\d{2}/\d{2}/\d{4}']
+    if any(re.search(pattern, line.upper().strip()) for pattern in balance_patterns):
+        return ('opening' if line.startswith('SOLDE AU') else 'final'), None
+    
+    if any(keyword in line.upper() for keyword in ['SOLDE', 'TOTAUX', 'REPORT', 'DONT TVA', 'ECHEANCE']):
+        return 'noise', None
+    if not re.match(r'^\d{2}\s+\d{2}\s+.+\s+\d{2}\s+\d{2}\s+\d{4}\s+[\d\s,]+$', line.strip()):
+        return 'noise', None
+    
+    match = re.search(r'^(\d{2})\s+(\d{2})\s+(.+?)\s+(\d{2})\s+(\d{2})\s+(\d{4})\s+([\d\s,]+)$', line.strip())
+    return 'transaction', match
+
+
+def measure(classify, lines: list, repeat: int) -> float:
+    """
+    Retourne le meilleur débit (lignes/s) sur `repeat` passes
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            classify(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--lines', type=int, default=50000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+    
+    lines = make_lines(args.lines)
+    
+    # Les deux implémentations doivent étiqueter les lignes de la même façon
+    for line in lines:
+        legacy_kind, _ = legacy_classify(line)
+        kind, _ = classify_line(line)
+        assert legacy_kind == kind, (line, legacy_kind, kind)
+    
+    before = measure(legacy_classify, lines, args.repeat)
+    after = measure(classify_line, lines, args.repeat)
+    transactions = sum(1 for line in lines if classify_line(line)[0] == LINE_TRANSACTION)
+    
+    print(f"{len(lines)} lignes ({transactions} transactions)")
+    print(f"Avant (regex multiples) : {before:>12,.0f} lignes/s")
+    print(f"Après (classifieur)     : {after:>12,.0f} lignes/s")
+    print(f"Gain                    : x{after / before:.2f}")
+
+
+if __name__ == '__main__':
+    main()
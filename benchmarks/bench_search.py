@@ -0,0 +1,153 @@
+"""
+Benchmark de la recherche dans les libellés : index plein texte vs icontains
+
+Remplit une base de test (fichier SQLite temporaire, ou la base de test de
+DATABASE_URL) de relevés synthétiques totalisant --rows transactions,
+insérées par banktocsv.ingest (triggers de l'index compris), puis mesure la
+latence médiane de requêtes de sélectivités variées :
+- recherche plein texte classée (banktocsv.search.search_transactions)
+- filtre libelle__icontains de l'API, trié par date (limite identique)
+
+Affiche aussi le débit d'insertion, qui inclut la mise à jour de l'index.
+
+Usage:
+    python -m benchmarks.bench_search [--rows 1000000] [--per-statement 2000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from .bench_suite import timed
+from .synthetic import LIBELLES
+
+
+# Commerçants ajoutés aux libellés : quelques-uns fréquents, la plupart rares
+MERCHANTS = [f"MARCHAND{index:04d}" for index in range(5000)]
+
+# (description, paramètres de la requête)
+QUERIES = [
+    ("mot fréquent (1/8)", {'q': 'STEG'}),
+    ("mot fréquent, une année", {'q': 'STEG', 'date_from': '2024-01-01', 'date_to': '2024-12-31'}),
+    ("deux mots", {'q': 'ACHAT MONOPRIX'}),
+    ("commerçant courant (1/100)", {'q': 'MARCHAND0042'}),
+    ("commerçant rare (1/10000)", {'q': 'MARCHAND4242'}),
+    ("commerçant rare, débits", {'q': 'MARCHAND4242', 'direction': 'debit'}),
+    ("aucun résultat", {'q': 'INTROUVABLE'}),
+]
+
+
+def synthetic_records(count, seed):
+    """
+    Transactions synthétiques (TransactionRecord) réparties sur 2020-2025
+    """
+    from parsers.records import TransactionRecord
+
+    rng = random.Random(seed)
+    first_day = date(2020, 1, 1).toordinal()
+    last_day = date(2025, 12, 31).toordinal()
+    for _ in range(count):
+        libelle, column = rng.choice(LIBELLES)
+        # Un commerçant sur deux tiré parmi les 50 premiers : fréquences très inégales
+        merchant = rng.choice(MERCHANTS[:50] if rng.random() < 0.5 else MERCHANTS)
+        day = rng.randint(first_day, last_day)
+        amount = rng.randint(1, 9999999)
+        yield TransactionRecord(
+            day, day + rng.randint(0, 10), f"{libelle} {merchant}",
+            amount if column == 'debit' else 0, amount if column == 'credit' else 0, '',
+        )
+
+
+def populate(rows, per_statement):
+    """
+    Insère `rows` transactions, par relevés de `per_statement`
+
+    Returns:
+        Transactions insérées par seconde
+    """
+    from banktocsv.ingest import save_statement
+    from banktocsv.models import BankStatement
+
+    start = time.perf_counter()
+    inserted = 0
+    statement = 0
+    while inserted < rows:
+        count = min(per_statement, rows - inserted)
+        transactions = list(synthetic_records(count, seed=statement))
+        save_statement(
+            BankStatement(name=f"Relevé synthétique {statement}", pdf_file='synthetique.pdf'),
+            {'transactions': transactions, 'total_transactions': count, 'final_balance': None},
+        )
+        inserted += count
+        statement += 1
+        if statement % 50 == 0:
+            print(f"  {inserted} transactions insérées...", flush=True)
+    return inserted / (time.perf_counter() - start)
+
+
+def bench_queries(repeat):
+    """
+    Latences médianes (secondes) et nombres de résultats par requête
+
+    Returns:
+        Liste de (description, médiane plein texte, médiane icontains, résultats)
+    """
+    from banktocsv.api import filter_transactions
+    from banktocsv.search import search_transactions
+    from django.conf import settings
+
+    limit = settings.TRANSACTIONS_API_PAGE_SIZE
+    results = []
+    for description, params in QUERIES:
+        found = search_transactions(params)['count']
+        fulltext = statistics.median(timed(lambda: search_transactions(params), repeat))
+
+        def icontains():
+            return list(filter_transactions(params).order_by('date_operation', 'id').values('id', 'libelle')[:limit])
+
+        substring = statistics.median(timed(icontains, repeat))
+        results.append((description, fulltext, substring, found))
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=1_000_000, help="Nombre de transactions en base")
+    arg_parser.add_argument('--per-statement', type=int, default=2000, help="Transactions par relevé")
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'banktocsv_project.settings')
+    import django
+    from django.test.utils import setup_test_environment
+
+    django.setup()
+    setup_test_environment()
+
+    from django.db import connection
+    from banktocsv.search import search_available
+
+    with tempfile.TemporaryDirectory(prefix='banktocsv-search-') as directory:
+        if connection.vendor == 'sqlite':
+            # Base de test sur disque (en mémoire par défaut) : conditions réelles
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            print(f"Insertion de {args.rows} transactions ({connection.vendor}, "
+                  f"index plein texte : {'oui' if search_available() else 'non'})")
+            rate = populate(args.rows, args.per_statement)
+            print(f"Débit d'insertion (index compris) : {rate:,.0f} transactions/s\n")
+
+            print(f"{'requête':<28} {'plein texte':>12} {'icontains':>12} {'résultats':>10}")
+            for description, fulltext, substring, found in bench_queries(args.repeat):
+                print(f"{description:<28} {fulltext * 1000:9.2f} ms {substring * 1000:9.2f} ms {found:10d}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark du temps de démarrage (imports) de l'application
+
+Lance un interpréteur neuf avec `python -X importtime` pour chaque scénario
+(démarrage de Django avec les URLs, parser seul), agrège le rapport par
+paquet de premier niveau et vérifie qu'aucune bibliothèque lourde
+(pandas, pdfplumber, ...) n'est importée au démarrage.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat R] [--top N] [--check]
+
+Avec --check, le code de sortie est 1 si une bibliothèque lourde est
+importée au démarrage (utilisable en intégration continue).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+
+# Bibliothèques qui ne doivent être chargées qu'à la demande
+HEAVY_MODULES = ('pandas', 'numpy', 'pdfplumber', 'pdfminer', 'pypdfium2', 'openpyxl', 'PIL')
+
+SCENARIOS = {
+    # Démarrage d'un worker gunicorn / manage.py : settings, apps, URLs (et donc les vues)
+    'django': (
+        "import django; django.setup(); "
+        "import banktocsv.urls, banktocsv.jobs"
+    ),
+    # Import du parser seul (scripts, workers de parsing)
+    'parser': "import parsers.attijari_parser",
+}
+
+
+def run_importtime(code: str) -> list:
+    """
+    Exécute `code` dans un nouvel interpréteur avec -X importtime
+
+    Returns:
+        Liste de tuples (module, temps propre en µs, temps cumulé en µs)
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='banktocsv_project.settings')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        env=env, capture_output=True, text=True, check=True,
+    )
+
+    entries = []
+    for line in completed.stderr.splitlines():
+        # Format : "import time:   self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        entries.append((module.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def summarize(entries: list) -> dict:
+    """
+    Agrège un rapport importtime : total, temps propre par paquet, modules lourds chargés
+    """
+    by_package = defaultdict(int)
+    for module, self_us, _ in entries:
+        by_package[module.split('.')[0]] += self_us
+
+    return {
+        'total_ms': sum(self_us for _, self_us, _ in entries) / 1000,
+        'modules': len(entries),
+        'by_package': by_package,
+        'heavy': sorted({
+            module.split('.')[0] for module, _, _ in entries
+            if module.split('.')[0] in HEAVY_MODULES
+        }),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="Nombre de démarrages par scénario")
+    parser.add_argument('--top', type=int, default=10, help="Nombre de paquets les plus coûteux affichés")
+    parser.add_argument('--check', action='store_true', help="Échoue si une bibliothèque lourde est importée")
+    args = parser.parse_args()
+
+    failed = False
+
+    for name, code in SCENARIOS.items():
+        runs = [summarize(run_importtime(code)) for _ in range(args.repeat)]
+        totals = [run['total_ms'] for run in runs]
+        last = runs[-1]
+
+        print(f"\n== {name} ({last['modules']} modules importés)")
+        print(f"  temps d'import : médiane {statistics.median(totals):.1f} ms, "
+              f"min {min(totals):.1f} ms, max {max(totals):.1f} ms")
+
+        print(f"  paquets les plus coûteux (temps propre, dernier run) :")
+        ranked = sorted(last['by_package'].items(), key=lambda item: item[1], reverse=True)
+        for package, self_us in ranked[:args.top]:
+            print(f"    {package:<24} {self_us / 1000:8.1f} ms")
+
+        if last['heavy']:
+            failed = True
+            print(f"  ATTENTION : bibliothèques lourdes importées au démarrage : {', '.join(last['heavy'])}")
+        else:
+            print("  aucune bibliothèque lourde importée")
+
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
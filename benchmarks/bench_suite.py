@@ -0,0 +1,246 @@
+"""
+Suite de benchmarks du parser, des exports et de la vue d'upload
+
+Génère des relevés synthétiques (benchmarks/synthetic.py) de plusieurs tailles
+dans un répertoire temporaire, puis chronomètre :
+- AttijariParser.parse_pdf (extraction + parsing)
+- AttijariParser._parse_content (parsing seul, texte déjà extrait)
+- to_dataframe, export_to_csv, export_to_excel
+- la vue /api/upload/ de bout en bout (sans cache, puis avec le cache de parsing)
+
+Les résultats sont enregistrés en JSON ; --baseline compare une exécution à
+une précédente (médianes) et signale les régressions.
+
+Usage:
+    python -m benchmarks.bench_suite [--pages 5,50] [--lines 40] [--repeat 5]
+                                     [--output resultats.json] [--baseline reference.json]
+                                     [--tolerance 10] [--fail-on-regression]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from .synthetic import temporary_statements
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def timed(function, repeat, before=None):
+    """
+    Exécute `function` `repeat` fois et retourne les durées (secondes)
+
+    Args:
+        before: Appelée avant chaque exécution, hors chronométrage
+    """
+    durations = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def summarize(durations, pages=None, transactions=None):
+    """
+    Statistiques d'une série de durées, avec les débits calculés sur la médiane
+    """
+    median = statistics.median(durations)
+    summary = {
+        'runs': len(durations),
+        'min': min(durations),
+        'median': median,
+        'mean': statistics.mean(durations),
+    }
+    if pages is not None:
+        summary['pages'] = pages
+        summary['pages_per_second'] = pages / median if median else None
+    if transactions is not None:
+        summary['transactions'] = transactions
+        summary['transactions_per_second'] = transactions / median if median else None
+    return summary
+
+
+def bench_parser(statement, repeat):
+    """
+    Benchmarks du parser et des exports sur un relevé
+    """
+    import pdfplumber
+    from parsers.attijari_parser import AttijariParser
+
+    path = statement['path']
+    pages = statement['pages']
+    results = {}
+
+    parser = AttijariParser()
+    results['parse_pdf'] = summarize(
+        timed(lambda: parser.parse_pdf(path), repeat), pages, len(parser.transactions)
+    )
+    transactions = len(parser.transactions)
+
+    with pdfplumber.open(path) as pdf:
+        text = '\n'.join(page.extract_text() or '' for page in pdf.pages)
+    content_parser = AttijariParser()
+
+    def parse_content():
+        content_parser.transactions = []
+        content_parser._parse_content(text)
+
+    results['_parse_content'] = summarize(timed(parse_content, repeat), pages, transactions)
+    results['to_dataframe'] = summarize(timed(parser.to_dataframe, repeat), None, transactions)
+    results['export_to_csv'] = summarize(timed(parser.export_to_csv, repeat), None, transactions)
+    results['export_to_excel'] = summarize(timed(parser.export_to_excel, repeat), None, transactions)
+    return results
+
+
+def bench_upload_view(statements, repeat):
+    """
+    Benchmarks de /api/upload/ via le client de test Django (base de test temporaire)
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'banktocsv_project.settings')
+    import django
+    from django.test.utils import override_settings, setup_test_environment
+
+    django.setup()
+    setup_test_environment()
+
+    from django.db import connection
+    from django.test import Client
+
+    results = {}
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        # Cache de parsing en mémoire uniquement, synchrone : on mesure le parsing dans la vue
+        with override_settings(PARSE_CACHE_DISK=False, JOBS_ASYNC_UPLOADS=False):
+            from banktocsv.parse_cache import get_parse_cache
+
+            client = Client()
+            cache = get_parse_cache()
+
+            for statement in statements:
+                def upload():
+                    with open(statement['path'], 'rb') as pdf_file:
+                        response = client.post('/api/upload/', {'pdf_file': pdf_file})
+                    assert response.json()['success'], response.content[:200]
+
+                suffix = f"[{statement['pages']}p]"
+                results[f"upload_view{suffix}"] = summarize(
+                    timed(upload, repeat, before=cache.clear), statement['pages'], statement['transactions']
+                )
+                results[f"upload_view_cached{suffix}"] = summarize(
+                    timed(upload, repeat), statement['pages'], statement['transactions']
+                )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare les médianes à celles d'une exécution de référence
+
+    Returns:
+        Liste des benchmarks en régression (plus lents de plus de `tolerance` %)
+    """
+    regressions = []
+    print(f"\nComparaison avec la référence ({baseline['meta'].get('revision')}, {baseline['meta'].get('date')})")
+    for name, current in results.items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        change = (current['median'] / reference['median'] - 1) * 100 if reference['median'] else 0.0
+        flag = ''
+        if change > tolerance:
+            flag = '  <-- régression'
+            regressions.append(name)
+        print(f"  {name:<32} {reference['median'] * 1000:10.2f} ms -> {current['median'] * 1000:10.2f} ms  "
+              f"{change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pages', default='5,50', help="Tailles des relevés (pages), séparées par des virgules")
+    arg_parser.add_argument('--lines', type=int, default=40, help="Transactions par page")
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--skip-view', action='store_true', help="Ne pas mesurer la vue /api/upload/")
+    arg_parser.add_argument('--output', default=None,
+                            help="Fichier JSON des résultats (défaut: benchmarks/results/<date>.json)")
+    arg_parser.add_argument('--baseline', default=None, help="Résultats JSON de référence à comparer")
+    arg_parser.add_argument('--tolerance', type=float, default=10.0,
+                            help="Ralentissement (%%) toléré avant de signaler une régression")
+    arg_parser.add_argument('--fail-on-regression', action='store_true')
+    args = arg_parser.parse_args()
+
+    sizes = [int(size) for size in args.pages.split(',')]
+    results = {}
+
+    with temporary_statements(sizes, args.lines) as statements:
+        for pages, statement in statements.items():
+            for name, summary in bench_parser(statement, args.repeat).items():
+                results[f"{name}[{pages}p]"] = summary
+        if not args.skip_view:
+            results.update(bench_upload_view(list(statements.values()), args.repeat))
+
+    from parsers.attijari_parser import PARSER_VERSION
+
+    report = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'parser_version': PARSER_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pages': sizes,
+            'lines_per_page': args.lines,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    print(f"{'benchmark':<32} {'médiane':>12} {'min':>12} {'pages/s':>10} {'transactions/s':>16}")
+    for name, summary in results.items():
+        pages_rate = summary.get('pages_per_second')
+        transactions_rate = summary.get('transactions_per_second')
+        print(
+            f"{name:<32} {summary['median'] * 1000:9.2f} ms {summary['min'] * 1000:9.2f} ms "
+            f"{f'{pages_rate:.1f}' if pages_rate else '-':>10} "
+            f"{f'{transactions_rate:,.0f}' if transactions_rate else '-':>16}"
+        )
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"\nRésultats enregistrés dans {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
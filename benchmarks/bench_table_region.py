@@ -0,0 +1,69 @@
+"""
+Benchmark de l'extraction limitée à la zone du tableau des transactions
+
+Compare, sur des relevés synthétiques de plusieurs tailles, le parsing avec
+le moteur pdfplumber en extrayant les pages entières (page.extract_text())
+et en limitant l'extraction à la zone du tableau (crop_table, par défaut) :
+durée, pages/s, et nombre de caractères convertis par page. Vérifie que les
+deux modes produisent les mêmes transactions.
+
+Usage:
+    python -m benchmarks.bench_table_region [--pages 5,50] [--lines 40] [--repeat 3]
+"""
+
+import argparse
+import statistics
+
+from .bench_suite import timed
+from .synthetic import temporary_statements
+
+
+def chars_per_page(path):
+    """
+    Nombre moyen de caractères convertis par page, page entière et zone du tableau
+    """
+    import pdfplumber
+    from parsers.attijari_parser import locate_table_region
+    from parsers.table_region import page_chars, page_lines
+
+    full = cropped = 0
+    with pdfplumber.open(path) as pdf:
+        region = locate_table_region(page_lines(pdf.pages[0]))
+        for page in pdf.pages:
+            full += len(page_chars(page))
+            cropped += len(page_chars(page, region))
+            page.flush_cache()
+        pages = len(pdf.pages)
+    return full / pages, cropped / pages
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pages', default='5,50', help="Tailles des relevés (pages), séparées par des virgules")
+    arg_parser.add_argument('--lines', type=int, default=40, help="Transactions par page")
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    from parsers.attijari_parser import AttijariParser
+
+    sizes = [int(size) for size in args.pages.split(',')]
+    print(f"{'relevé':<10} {'mode':<14} {'médiane':>12} {'pages/s':>10} {'caractères/page':>16}")
+
+    with temporary_statements(sizes, args.lines) as statements:
+        for pages, statement in statements.items():
+            full_chars, cropped_chars = chars_per_page(statement['path'])
+            results = {}
+            for mode, crop_table, chars in (('page entière', False, full_chars),
+                                            ('zone tableau', True, cropped_chars)):
+                parser = AttijariParser(crop_table=crop_table, backend='pdfplumber')
+                median = statistics.median(timed(lambda: parser.parse_pdf(statement['path']), args.repeat))
+                results[mode] = (median, parser.transactions, parser.final_balance)
+                print(f"{f'{pages}p':<10} {mode:<14} {median * 1000:9.1f} ms {pages / median:10.1f} {chars:16.0f}")
+
+            (full_time, *full_result), (cropped_time, *cropped_result) = results.values()
+            status = 'identiques' if full_result == cropped_result else 'DIFFÉRENTES'
+            print(f"{'':<10} gain x{full_time / cropped_time:.2f}, transactions {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+Générateur de relevés Attijari synthétiques (PDF natifs)
+
+Produit des PDF au format des relevés Attijari (en-tête de banque et du
+compte, tableau "Date Libellé Valeur Débit Crédit", solde de début, lignes de
+transactions, totaux, solde final, mentions légales en pied de page, répétés
+sur chaque page) avec un nombre de pages et de lignes
+configurable. Le PDF est écrit directement (police Helvetica, texte
+positionné en colonnes) : aucune dépendance en dehors de la bibliothèque
+standard.
+
+Usage:
+    python -m benchmarks.synthetic [--pages N] [--lines L] [--trailing T] [--output fichier.pdf]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+# Libellés réalistes et colonne du montant (débit ou crédit)
+LIBELLES = [
+    ('COMMISSION ENC CHQ 0146467', 'debit'),
+    ('VERSEMENT ESPECE 091936', 'credit'),
+    ('RETRAIT GAB 1234', 'debit'),
+    ('VIR RECU SOCIETE X', 'credit'),
+    ('PAIEMENT STEG 2025', 'debit'),
+    ('ACHAT CARTE MONOPRIX', 'debit'),
+    ('FRAIS TENUE COMPTE', 'debit'),
+    ('PRELEVEMENT CNSS', 'debit'),
+]
+
+# En-tête de la banque et du compte, en haut de chaque page
+LETTERHEAD = [
+    'ATTIJARI BANK',
+    'Agence Tunis Centre - 24 Avenue Habib Bourguiba - 1000 Tunis',
+    'Client : SOCIETE TEST SARL - 12 Rue de Marseille - 1001 Tunis',
+    'RIB 04 018 0000000000000 00 - Devise : TND',
+    'EXTRAIT DE COMPTE DU 01/08/2025 AU 31/08/2025',
+]
+
+# Mentions légales, en bas de chaque page
+LEGAL_FOOTER = [
+    'Attijari bank - Société anonyme au capital de 203 062 500 dinars - RC B 1000000 1997',
+    'Siège social : 24 Rue Hédi Karray - Centre Urbain Nord - 1080 Tunis - Tél. 71 141 400',
+    'Sauf erreur ou omission. Toute réclamation doit parvenir à votre agence dans un délai de 30 jours.',
+    'Les opérations sont présentées en dinars tunisiens (TND) et arrêtées à la date indiquée.',
+]
+
+# Abscisses des colonnes du tableau (points)
+COLUMN_X = {'date': 40, 'libelle': 85, 'valeur': 330, 'debit': 420, 'credit': 500}
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+LINE_HEIGHT = 12
+FONT_SIZE = 8
+
+
+def format_amount(millimes: int) -> str:
+    """
+    Formate un montant en millimes au format Attijari ("1 640,000")
+    """
+    return f"{millimes // 1000:,}".replace(',', ' ') + f",{millimes % 1000:03d}"
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _page_content(items: Iterable[Tuple[int, int, str]]) -> bytes:
+    """
+    Flux de contenu d'une page : textes (x, y, texte) en Helvetica
+    """
+    operations = [
+        f"BT /F1 {FONT_SIZE} Tf {x} {y} Td ({_escape(text)}) Tj ET"
+        for x, y, text in items
+    ]
+    return '\n'.join(operations).encode('cp1252')
+
+
+def write_pdf(pages: List[List[Tuple[int, int, str]]], path: str):
+    """
+    Écrit un PDF minimal dont chaque page est une liste de textes positionnés
+
+    Args:
+        pages: Pour chaque page, liste de tuples (x, y, texte)
+        path: Fichier de sortie
+    """
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    # Objets : police, puis (contenu, page) par page, puis l'arbre des pages
+    pages_id = len(objects) + 2 * len(pages) + 1
+
+    kids = []
+    for items in pages:
+        data = _page_content(items)
+        content = add(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font, content)
+        ))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b' '.join(b"%d 0 R" % kid for kid in kids), len(kids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+
+    with open(path, 'wb') as pdf_file:
+        pdf_file.write(output)
+
+
+def make_statement(pages: int = 5, lines_per_page: int = 40, trailing_pages: int = 0,
+                   seed: int = 42) -> Tuple[List[List[Tuple[int, int, str]]], int]:
+    """
+    Construit le contenu d'un relevé synthétique
+
+    Args:
+        pages: Nombre de pages contenant des transactions
+        lines_per_page: Nombre de transactions par page
+        trailing_pages: Pages sans transaction après le solde final (conditions générales)
+        seed: Graine du générateur aléatoire (relevés reproductibles)
+
+    Returns:
+        Tuple (pages de textes positionnés, nombre de transactions)
+    """
+    rng = random.Random(seed)
+    result = []
+    transactions = 0
+
+    for page_number in range(1, pages + 1):
+        items = []
+        y = PAGE_HEIGHT - 50
+
+        # En-tête de la banque et du compte
+        for text in LETTERHEAD:
+            items.append((40, y, text))
+            y -= LINE_HEIGHT
+        y -= LINE_HEIGHT
+
+        # En-tête du tableau, répété sur chaque page
+        for column, title in (('date', 'Date'), ('libelle', 'Libellé'), ('valeur', 'Valeur'),
+                              ('debit', 'Débit'), ('credit', 'Crédit')):
+            items.append((COLUMN_X[column], y, title))
+        y -= LINE_HEIGHT
+
+        if page_number == 1:
+            items.append((COLUMN_X['libelle'], y, 'SOLDE AU 31/07/2025'))
+            items.append((COLUMN_X['credit'], y, format_amount(2589)))
+            y -= LINE_HEIGHT
+
+        for _ in range(lines_per_page):
+            libelle, column = rng.choice(LIBELLES)
+            amount = rng.randint(1, 9999999)
+            items.append((COLUMN_X['date'], y, f"{rng.randint(1, 28):02d} 08"))
+            items.append((COLUMN_X['libelle'], y, libelle))
+            items.append((COLUMN_X['valeur'], y, f"{rng.randint(1, 28):02d} 08 2025"))
+            items.append((COLUMN_X[column], y, format_amount(amount)))
+            transactions += 1
+            y -= LINE_HEIGHT
+
+        items.append((COLUMN_X['libelle'], y, 'TOTAUX'))
+        items.append((COLUMN_X['debit'], y, format_amount(1234000)))
+        items.append((COLUMN_X['credit'], y, format_amount(5678000)))
+        y -= LINE_HEIGHT
+
+        if page_number == pages:
+            items.append((COLUMN_X['libelle'], y, 'SOLDE'))
+            items.append((COLUMN_X['credit'], y, format_amount(1477110)))
+
+        # Pied de page
+        for i, text in enumerate(LEGAL_FOOTER):
+            items.append((40, 40 + (len(LEGAL_FOOTER) - i) * LINE_HEIGHT, text))
+        items.append((520, 40, f"Page {page_number}"))
+        result.append(items)
+
+    for page_number in range(pages + 1, pages + trailing_pages + 1):
+        items = [(40, PAGE_HEIGHT - 50, 'CONDITIONS GENERALES')]
+        items.extend(
+            (40, PAGE_HEIGHT - 70 - i * LINE_HEIGHT, f"Article {i + 1} - Dispositions applicables au compte")
+            for i in range(40)
+        )
+        items.append((520, 40, f"Page {page_number}"))
+        result.append(items)
+
+    return result, transactions
+
+
+def write_statement(path: str, pages: int = 5, lines_per_page: int = 40,
+                    trailing_pages: int = 0, seed: int = 42) -> Dict:
+    """
+    Écrit un relevé synthétique
+
+    Returns:
+        Dict {'path', 'pages', 'transactions'}
+    """
+    content, transactions = make_statement(pages, lines_per_page, trailing_pages, seed)
+    write_pdf(content, path)
+    return {'path': path, 'pages': len(content), 'transactions': transactions}
+
+
+@contextmanager
+def temporary_statements(sizes: Iterable[int], lines_per_page: int = 40,
+                         trailing_pages: int = 0) -> Iterator[Dict[int, Dict]]:
+    """
+    Écrit des relevés synthétiques dans un répertoire temporaire supprimé en sortie
+
+    Args:
+        sizes: Nombres de pages (un relevé par valeur)
+
+    Yields:
+        Dict nombre de pages -> description du relevé (voir write_statement)
+    """
+    with tempfile.TemporaryDirectory(prefix='banktocsv-bench-') as directory:
+        yield {
+            pages: write_statement(
+                os.path.join(directory, f"releve_{pages}p.pdf"), pages, lines_per_page, trailing_pages
+            )
+            for pages in sizes
+        }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pages', type=int, default=5)
+    arg_parser.add_argument('--lines', type=int, default=40, help="Transactions par page")
+    arg_parser.add_argument('--trailing', type=int, default=0, help="Pages sans transaction en fin de relevé")
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--output', default=None, help="Fichier PDF (répertoire temporaire par défaut)")
+    args = arg_parser.parse_args()
+
+    output = args.output or os.path.join(tempfile.mkdtemp(prefix='banktocsv-'), f"releve_{args.pages}p.pdf")
+    statement = write_statement(output, args.pages, args.lines, args.trailing, args.seed)
+    print(f"{statement['path']} : {statement['pages']} pages, {statement['transactions']} transactions")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,227 +1,530 @@
 """
 Parser pour les relevés bancaires Attijari Tunisie
-Utilise pdfplumber pour extraire les données des PDF natifs
+Extrait le texte des PDF natifs avec un moteur de parsers.backends (pdfplumber, pypdfium2)
+Enregistré dans parsers.registry, qui le choisit d'après la première page (AttijariParser.matches)
 """
 
-import pdfplumber
-import pandas as pd
+import csv
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing, contextmanager
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
+from typing import TYPE_CHECKING, List, Dict, Tuple, Optional, Union, Iterable, Iterator, Callable
 import io
+import tempfile
 
+from .backends import AUTO, ExtractionBackend, MappedFile, fallback_backends, get_backend, read_source
+from .base import StatementParser
+from .rules import RuleSet, DEFAULT_RULE_SET, CREDIT
+from .records import TransactionRecord, parse_millimes, date_ordinal, balance_row
+from .table_region import TableRegion, TextLine, footer_key, page_lines
+from .timing import stage, count
+from .xlsx_writer import iter_xlsx, write_xlsx
 
-class AttijariParser:
+# pdfplumber (pdfminer) et pandas sont lourds à importer : ils ne sont chargés
+# que par les fonctions qui en ont besoin (extraction du texte, to_dataframe),
+# pas au démarrage de Django ni pour les exports CSV/Excel/JSON.
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# En dessous de ce nombre de pages, le coût de démarrage du pool de processus
+# dépasse le gain : l'extraction reste dans le processus courant
+PARALLEL_MIN_PAGES = 8
+
+# Taille maximale des plages de pages confiées aux processus du pool : les
+# plages sont soumises au fur et à mesure, pour pouvoir s'arrêter au solde final
+PARALLEL_CHUNK_PAGES = 4
+
+# Version du résultat produit par le parser : à incrémenter à chaque changement
+# des transactions extraites (invalide les résultats mis en cache)
+PARSER_VERSION = '3'
+
+# Empreinte d'un relevé Attijari sur sa première page : nom de la banque, ou
+# RIB / IBAN portant le code banque 04
+_FINGERPRINT = re.compile(
+    r"\bATTIJARI\b|\bRIB\b\W*04\s?\d{3}\s?\d{13}\s?\d{2}\b|\bTN\d{2}\s?04\s?\d{3}",
+    re.IGNORECASE,
+)
+
+# Types de lignes reconnus par le classifieur (noms des groupes de _LINE_PATTERN)
+LINE_HEADER = 'header'
+LINE_OPENING_BALANCE = 'opening'
+LINE_TRANSACTION = 'transaction'
+LINE_FINAL_BALANCE = 'final'
+LINE_NOISE = 'noise'
+
+# Mots-clés excluant une ligne des transactions (soldes, totaux, reports...)
+_EXCLUDED_KEYWORDS = r'SOLDE|TOTAUX|REPORT|DONT\ TVA|ECHEANCE'
+_TABLE_KEYWORD = re.compile(_EXCLUDED_KEYWORDS, re.IGNORECASE)
+
+# Marge (points) laissée autour de la zone du tableau : les dates peuvent
+# commencer un peu avant le titre centré de la colonne "Date"
+TABLE_REGION_MARGIN = 12
+
+# Grammaire complète d'une ligne Attijari, compilée une seule fois : un seul
+# match() étiquette la ligne (via le nom du dernier groupe fermé) et capture
+# ses composants
+_LINE_PATTERN = re.compile(rf"""
+    ^(?:
+        # 04 08 COMMISSION ENC CHQ 0146467 01 08 2025 0,893
+        # 04 08 VERSEMENT ESPECE 091936 05 08 2025 1 640,000
+        (?P<transaction>
+            (?P<day_op>\d{{2}})\s+(?P<month_op>\d{{2}})\s+
+            (?P<libelle>(?:(?!{_EXCLUDED_KEYWORDS}).)+?)\s+
+            (?P<day_val>\d{{2}})\s+(?P<month_val>\d{{2}})\s+(?P<year_val>\d{{4}})\s+
+            (?P<amount>[\d\s,]+)
+        )
+        # SOLDE AU 31/07/2025 2,589 (solde de début)
+      | (?P<opening>(?-i:SOLDE\ AU)\s+\d{{2}}/\d{{2}}/\d{{4}}(?:\s+[\d\s,]+)?)
+        # SOLDE 1 477,110 (solde final)
+      | (?P<final>SOLDE(?:\s+AU\s+\d{{2}}/\d{{2}}/\d{{4}})?\s+(?P<final_amount>[\d\s,]+))
+        # Date Libellé Valeur Débit Crédit
+      | (?P<header>.*?date.*valeur.*(?:debit.*credit|débit.*crédit).*)
+    )$
+""", re.IGNORECASE | re.VERBOSE)
+
+
+def classify_line(line: str) -> Tuple[str, Optional[re.Match]]:
+    """
+    Classe une ligne de relevé en une seule passe
+    
+    Args:
+        line: Ligne de texte (sans espaces de début et de fin)
+        
+    Returns:
+        Tuple (type de ligne, match contenant les groupes capturés ou None)
+    """
+    match = _LINE_PATTERN.match(line)
+    if match is None:
+        return LINE_NOISE, None
+    return match.lastgroup, match
+
+
+def locate_table_region(lines: List[TextLine]) -> Optional[TableRegion]:
+    """
+    Repère la zone du tableau des transactions sur une page
+    
+    La zone commence à l'en-tête "Date Libellé Valeur Débit Crédit" et
+    s'arrête au-dessus du pied de page, c'est-à-dire de la première ligne
+    qui suit la dernière ligne reconnue du tableau (transaction, solde, totaux...).
+    
+    Args:
+        lines: Lignes de la page entière (voir table_region.page_lines)
+        
+    Returns:
+        TableRegion, ou None si la page ne contient pas l'en-tête du tableau
+    """
+    header = next((i for i, line in enumerate(lines) if classify_line(line.text)[0] == LINE_HEADER), None)
+    if header is None:
+        return None
+    
+    last = header
+    for i in range(header + 1, len(lines)):
+        text = lines[i].text
+        if classify_line(text)[0] != LINE_NOISE or _TABLE_KEYWORD.search(text):
+            last = i
+    
+    region = TableRegion(
+        x0=lines[header].x0 - TABLE_REGION_MARGIN,
+        top=lines[header].top - TABLE_REGION_MARGIN / 4,
+        bottom=float('inf'),
+    )
+    if last + 1 < len(lines):
+        footer = lines[last + 1]
+        region = TableRegion(
+            region.x0, region.top, footer.top, footer_key(footer.text), footer.bottom - footer.top
+        )
+    return region
+
+
+def _extract_page_text(page, region: Optional[TableRegion]) -> Tuple[str, Optional[TableRegion]]:
+    """
+    Extrait le texte d'une page, limité à la zone du tableau si elle est connue
+    
+    La zone repérée sur une page précédente n'est retenue que si la mise en
+    page est la même : le texte extrait commence par l'en-tête du tableau, et
+    la ligne juste sous la zone est le même pied de page (une dernière page
+    plus courte place son solde final à cet endroit). Sinon la page est lue
+    en entier et la zone est repérée à nouveau pour les pages suivantes.
+    
+    Args:
+        page: Page pdfplumber
+        region: Zone du tableau repérée sur une page précédente (ou None)
+        
+    Returns:
+        Tuple (texte de la page, zone à utiliser pour les pages suivantes)
+    """
+    if region is not None:
+        lines = page_lines(page, region)
+        if lines and classify_line(lines[0].text.strip())[0] == LINE_HEADER and (
+            region.footer is None
+            or [footer_key(line.text) for line in page_lines(page, region.footer_band())[:1]] == [region.footer]
+        ):
+            count('pages_cropped')
+            return '\n'.join(line.text for line in lines), region
+    
+    lines = page_lines(page)
+    return '\n'.join(line.text for line in lines), locate_table_region(lines) or region
+
+
+@contextmanager
+def _source_path(source: Union[str, bytes, MappedFile]) -> Iterator[str]:
+    """
+    Chemin du PDF à transmettre aux processus du pool : un contenu sans chemin
+    connu est écrit une seule fois dans un fichier temporaire plutôt que copié à chaque plage
+    """
+    if isinstance(source, str):
+        yield source
+        return
+    if isinstance(source, MappedFile) and source.path:
+        yield source.path
+        return
+    
+    with tempfile.NamedTemporaryFile(suffix='.pdf', prefix='banktocsv-') as pdf_file:
+        pdf_file.write(source.getbuffer() if isinstance(source, MappedFile) else source)
+        pdf_file.flush()
+        yield pdf_file.name
+
+
+@contextmanager
+def _closing_source(source: Union[str, bytes, MappedFile]) -> Iterator[None]:
+    """
+    Libère la projection en mémoire d'une source à la fin de la lecture
+    """
+    try:
+        yield
+    finally:
+        if isinstance(source, MappedFile):
+            source.close()
+
+
+def _extract_pages_text(backend: ExtractionBackend, source: Union[str, bytes], start: int, stop: int,
+                        region: Optional[TableRegion] = None) -> List[Optional[str]]:
+    """
+    Extrait le texte des pages [start, stop) d'un PDF
+    Exécutée dans un processus du pool : le PDF est rouvert dans chaque processus
+    
+    Args:
+        backend: Moteur d'extraction
+        source: Chemin du PDF, fichier projeté en mémoire ou contenu binaire du PDF
+        start: Index de la première page
+        stop: Index de fin (exclu)
+        region: Zone du tableau repérée sur les pages précédentes
+        
+    Returns:
+        Liste des textes extraits, dans l'ordre des pages
+    """
+    with backend.open(source) as document:
+        document.region = region
+        return [document.page_text(i) for i in range(start, stop)]
+
+
+class AttijariParser(StatementParser):
     """
     Parser spécialisé pour les relevés bancaires Attijari Tunisie
     """
     
-    def __init__(self):
-        self.transactions = []
-        self.final_balance = None
+    bank = 'attijari'
+    label = 'Attijari bank'
+    version = PARSER_VERSION
+    
+    # Colonnes exportées (la catégorie n'est conservée qu'en base)
+    EXPORT_COLUMNS = ['date_operation', 'date_valeur', 'libelle', 'debit', 'credit']
+    
+    def __init__(self, workers: int = 1, parallel_min_pages: int = PARALLEL_MIN_PAGES,
+                 rule_set: Optional[RuleSet] = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 crop_table: bool = True, backend: Union[str, ExtractionBackend] = AUTO,
+                 fallback: bool = True):
+        """
+        Args:
+            workers: Nombre de processus pour l'extraction du texte (1 = pas de parallélisme)
+            parallel_min_pages: Nombre minimal de pages pour activer l'extraction parallèle
+            rule_set: Règles de débit/crédit et de catégorie (règles par défaut si None)
+            progress_callback: Appelée après chaque page avec (pages traitées, nombre de pages)
+            crop_table: Limiter l'extraction des pages à la zone du tableau des transactions
+                (moteurs qui le permettent)
+            backend: Moteur d'extraction du texte, ou son nom (voir parsers.backends)
+            fallback: Relire avec les autres moteurs un document dont aucune
+                transaction n'est extraite
+        """
+        self.transactions: List[TransactionRecord] = []
+        # Solde final en millimes
+        self.final_balance: Optional[int] = None
+        self._reset_state()
+        self.workers = max(1, workers or 1)
+        self.parallel_min_pages = parallel_min_pages
+        self.rule_set = rule_set or DEFAULT_RULE_SET
+        self.progress_callback = progress_callback
+        if isinstance(backend, str):
+            backend = get_backend(backend, extract_page=_extract_page_text if crop_table else None)
+        self.backend = backend
+        self.fallback = fallback
+        self.page_count = 0
+        self.pages_processed = 0
+        # Pages non lues car situées après le solde final
+        self.pages_skipped = 0
+    
+    @classmethod
+    def matches(cls, text: str) -> bool:
+        """
+        Reconnaît un relevé Attijari au début de sa première page (voir _FINGERPRINT)
+        """
+        return _FINGERPRINT.search(text) is not None
         
     def parse_pdf(self, pdf_file) -> Dict:
         """
         Parse un fichier PDF de relevé bancaire Attijari
+
+        Un document qui a des pages mais dont le moteur n'extrait aucune
+        transaction (mise en page que le moteur lit dans un autre ordre) est
+        relu avec les autres moteurs installés, plutôt que de produire un
+        relevé vide.
         
         Args:
             pdf_file: Fichier PDF (peut être un objet file ou un chemin)
             
         Returns:
-            Dict contenant les transactions et le solde final
+            Dict contenant les transactions (TransactionRecord) et le solde final (millimes)
         """
         try:
-            with pdfplumber.open(pdf_file) as pdf:
-                all_text = ""
-                
-                # Extraire tout le texte de toutes les pages
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        all_text += page_text + "\n"
-                
-                # Parser le contenu
-                self._parse_content(all_text)
-                
-                return {
-                    'transactions': self.transactions,
-                    'final_balance': self.final_balance,
-                    'total_transactions': len(self.transactions)
-                }
+            self.transactions = list(self.iter_transactions(pdf_file))
+            if not self.transactions and self.page_count and self.fallback:
+                self._parse_with_fallback(pdf_file)
+            
+            return {
+                'transactions': self.transactions,
+                'final_balance': self.final_balance,
+                'total_transactions': len(self.transactions)
+            }
                 
         except Exception as e:
             raise Exception(f"Erreur lors du parsing du PDF: {str(e)}")
     
-    def _parse_content(self, text: str):
+    def _parse_with_fallback(self, pdf_file):
         """
-        Parse le contenu textuel du PDF pour extraire les transactions
+        Relit le document avec les autres moteurs, jusqu'au premier qui en extrait des transactions
+        """
+        backend = self.backend
+        try:
+            for other in fallback_backends(backend):
+                count('backend_fallbacks')
+                self.backend = other
+                self.transactions = list(self.iter_transactions(pdf_file))
+                if self.transactions:
+                    break
+        finally:
+            self.backend = backend
+    
+    def iter_transactions(self, pdf_file) -> Iterator[TransactionRecord]:
+        """
+        Itère sur les transactions d'un relevé, page par page
+        
+        Le texte de chaque page est analysé dès son extraction : le document
+        n'est jamais concaténé en un seul bloc. L'état (en-tête rencontré,
+        solde final) est conservé d'une page à l'autre, et final_balance est
+        renseigné une fois le solde final atteint. L'extraction s'arrête
+        alors : les pages suivantes (conditions générales, annexes...) ne
+        sont pas lues, et sont comptées dans pages_skipped.
         
         Args:
-            text: Contenu textuel du PDF
+            pdf_file: Fichier PDF (peut être un objet file ou un chemin)
+            
+        Yields:
+            TransactionRecord de chaque transaction, dans l'ordre du relevé
         """
-        lines = text.split('\n')
+        self.final_balance = None
+        self.page_count = 0
+        self.pages_processed = 0
+        self.pages_skipped = 0
+        self._reset_state()
         
-        # Variables pour détecter les sections
-        in_transactions = False
-        transaction_started = False
+        with stage('read_source'):
+            source = self._read_source(pdf_file)
         
-        for line in lines:
-            line = line.strip()
-            
-            # Détecter le début de la section des transactions
-            if self._is_transaction_header(line):
-                in_transactions = True
-                transaction_started = True
-                continue
-            
-            # Détecter la fin de la section des transactions (solde final)
-            # Ne s'arrêter que si c'est le solde final (pas le solde de début)
-            if in_transactions and self._is_balance_line(line) and not line.startswith('SOLDE AU'):
-                self._extract_final_balance(line)
-                break
-            
-            # Parser les lignes de transaction
-            if in_transactions and transaction_started and self._is_transaction_line(line):
-                transaction = self._parse_transaction_line(line)
-                if transaction:
-                    self.transactions.append(transaction)
+        # Fermer l'extraction dès la sortie de la boucle (arrêt du pool compris)
+        with closing(self._iter_page_texts(source)) as page_texts, _closing_source(source):
+            for page_text in page_texts:
+                self.pages_processed += 1
+                count('pages_processed')
+                if page_text:
+                    with stage('parse_lines'):
+                        transactions = list(self._parse_lines(page_text.split('\n')))
+                    count('transactions_processed', len(transactions))
+                    yield from transactions
+                if self.progress_callback:
+                    self.progress_callback(self.pages_processed, self.page_count)
+                if self._done:
+                    break
+        
+        self.pages_skipped = self.page_count - self.pages_processed
+        count('pages_skipped', self.pages_skipped)
     
-    def _is_transaction_header(self, line: str) -> bool:
+    def _read_source(self, pdf_file) -> Union[str, bytes, MappedFile]:
         """
-        Détecte si la ligne est un en-tête de section de transactions
+        Normalise l'entrée en une source lisible par les moteurs d'extraction
+        (voir backends.read_source : un fichier sur disque est projeté en mémoire)
         """
-        header_patterns = [
-            r'date.*libellé.*valeur.*débit.*crédit',
-            r'date.*libelle.*valeur.*debit.*credit',
-            r'date.*valeur.*debit.*credit',
-            r'date.*valeur.*débit.*crédit',
-        ]
-        
-        line_lower = line.lower()
-        return any(re.search(pattern, line_lower) for pattern in header_patterns)
+        return read_source(pdf_file)
     
-    def _is_transaction_line(self, line: str) -> bool:
+    def _iter_page_texts(self, source: Union[str, bytes, MappedFile]) -> Iterator[Optional[str]]:
         """
-        Détecte si la ligne contient une transaction
-        Format Attijari: DD MM LIBELLE DD MM YYYY MONTANT
+        Extrait le texte des pages une à une, en parallèle si le document est assez long
+        
+        Avec crop_table (moteur pdfplumber), la zone du tableau est repérée sur
+        la première page qui contient son en-tête ; les pages suivantes ne
+        sont lues que dans cette zone (voir _extract_page_text).
+        
+        Args:
+            source: Chemin du PDF, fichier projeté en mémoire ou contenu binaire du PDF
+            
+        Yields:
+            Texte de chaque page, dans l'ordre des pages
         """
-        # Vérifier que ce n'est pas une ligne de solde ou de totaux
-        if any(keyword in line.upper() for keyword in ['SOLDE', 'TOTAUX', 'REPORT', 'DONT TVA', 'ECHEANCE']):
-            return False
+        with stage('open_pdf'):
+            document = self.backend.open(source)
         
-        # Pattern pour les transactions Attijari
-        # Format: 04 08 COMMISSION ENC CHQ 0146467 01 08 2025 0,893
-        # ou: 04 08 VERSEMENT ESPECE 091936 05 08 2025 1 640,000
-        attijari_pattern = r'^\d{2}\s+\d{2}\s+.+\s+\d{2}\s+\d{2}\s+\d{4}\s+[\d\s,]+$'
+        with document:
+            with stage('open_pdf'):
+                page_count = self.page_count = len(document)
+            sequential = self.workers == 1 or page_count < self.parallel_min_pages
+            
+            # Petit document ou un seul worker : extraction dans le processus courant.
+            # Sinon seule la première page est lue ici, pour y repérer le tableau
+            for index in range(page_count if sequential else min(1, page_count)):
+                with stage('extract_text'):
+                    page_text = document.page_text(index)
+                yield page_text
+            if sequential:
+                return
+            region = document.region
         
-        return bool(re.match(attijari_pattern, line.strip()))
+        # Découper les pages restantes en plages contiguës, de PARALLEL_CHUNK_PAGES pages au plus
+        workers = min(self.workers, page_count - 1)
+        chunk_size = max(1, min(PARALLEL_CHUNK_PAGES, -(-(page_count - 1) // workers)))
+        bounds = iter([(start, min(start + chunk_size, page_count)) for start in range(1, page_count, chunk_size)])
+        
+        with _source_path(source) as path:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            try:
+                # Une plage d'avance par worker : les plages suivantes ne sont soumises
+                # qu'au fil de la lecture, et jamais après le solde final
+                pending = deque()
+                
+                def submit():
+                    bound = next(bounds, None)
+                    if bound is not None:
+                        pending.append(executor.submit(_extract_pages_text, self.backend, path, *bound, region))
+                
+                for _ in range(workers):
+                    submit()
+                while pending:
+                    # Attente des processus du pool, dans l'ordre des pages
+                    with stage('extract_text'):
+                        chunk = pending.popleft().result()
+                    submit()
+                    yield from chunk
+            finally:
+                # Arrêt anticipé : les plages pas encore commencées sont annulées
+                executor.shutdown(wait=True, cancel_futures=True)
     
-    def _is_balance_line(self, line: str) -> bool:
+    def _reset_state(self):
         """
-        Détecte si la ligne contient le solde final
+        Réinitialise la machine à états de détection des sections
         """
-        balance_patterns = [
-            r'^SOLDE\s+[\d\s,]+$',  # SOLDE 1 477,110
-            r'^SOLDE\s+AU\s+\d{2}/\d{2}/\d{4}',  # SOLDE AU 31/07/2025 2,589
-        ]
+        self._in_transactions = False
+        self._done = False
+    
+    def _parse_content(self, text: str):
+        """
+        Parse le contenu textuel du PDF pour extraire les transactions
         
-        line_upper = line.upper().strip()
-        return any(re.search(pattern, line_upper) for pattern in balance_patterns)
+        Args:
+            text: Contenu textuel du PDF
+        """
+        self._reset_state()
+        self.transactions.extend(self._parse_lines(text.split('\n')))
     
-    def _parse_transaction_line(self, line: str) -> Optional[Dict]:
+    def _parse_lines(self, lines: Iterable[str]) -> Iterator[TransactionRecord]:
         """
-        Parse une ligne de transaction pour extraire les données
-        Format Attijari: DD MM LIBELLE DD MM YYYY MONTANT
+        Fait avancer la machine à états sur un lot de lignes (une page en général)
         
         Args:
-            line: Ligne de transaction
+            lines: Lignes de texte du PDF
             
-        Returns:
-            Dict contenant les données de la transaction ou None si parsing échoue
+        Yields:
+            TransactionRecord de chaque transaction trouvée
         """
-        try:
-            # Pattern pour extraire les composants Attijari
-            # Format: 04 08 COMMISSION ENC CHQ 0146467 01 08 2025 0,893
-            pattern = r'^(\d{2})\s+(\d{2})\s+(.+?)\s+(\d{2})\s+(\d{2})\s+(\d{4})\s+([\d\s,]+)$'
-            
-            match = re.search(pattern, line.strip())
-            if not match:
-                return None
+        if self._done:
+            return
+        
+        for line in lines:
+            kind, match = classify_line(line.strip())
             
-            day_op = match.group(1)
-            month_op = match.group(2)
-            libelle = match.group(3).strip()
-            day_val = match.group(4)
-            month_val = match.group(5)
-            year_val = match.group(6)
-            amount_str = match.group(7).strip()
+            # Détecter le début de la section des transactions
+            if kind == LINE_HEADER:
+                self._in_transactions = True
+                continue
             
-            # Construire les dates
-            date_operation = f"{year_val}-{month_op.zfill(2)}-{day_op.zfill(2)}"
-            date_valeur = f"{year_val}-{month_val.zfill(2)}-{day_val.zfill(2)}"
+            if not self._in_transactions:
+                continue
             
-            # Parser le montant
-            amount = self._parse_amount(amount_str)
+            # Parser les lignes de transaction
+            if kind == LINE_TRANSACTION:
+                transaction = self._parse_transaction_match(match)
+                if transaction:
+                    yield transaction
             
-            # Déterminer si c'est un débit ou un crédit selon le libellé
-            libelle_upper = libelle.upper()
+            # Détecter la fin de la section des transactions (solde final)
+            # Le solde de début (SOLDE AU ...) est simplement ignoré
+            elif kind == LINE_FINAL_BALANCE:
+                self.final_balance = parse_millimes(match.group('final_amount').strip())
+                self._done = True
+                return
+    
+    def _parse_transaction_match(self, match: re.Match) -> Optional[TransactionRecord]:
+        """
+        Construit une transaction à partir des groupes capturés par le classifieur
+        Format Attijari: DD MM LIBELLE DD MM YYYY MONTANT
+        
+        Args:
+            match: Match d'une ligne classée LINE_TRANSACTION
             
-            # Mots-clés pour les crédits (entrées d'argent)
-            credit_keywords = [
-                'VERSEMENT', 'ENCAISSEMENT', 'VIR RECU', 'VIREMENT RECU', 
-                'REMISE', 'DEPOT', 'CREDIT', 'RECEPTION'
-            ]
+        Returns:
+            TransactionRecord (dates en ordinaux, montant en millimes) ou None si parsing échoue
+        """
+        try:
+            day_op, month_op, libelle, day_val, month_val, year_val, amount_str = match.group(
+                'day_op', 'month_op', 'libelle', 'day_val', 'month_val', 'year_val', 'amount'
+            )
+            libelle = libelle.strip()
             
-            # Mots-clés pour les débits (sorties d'argent)
-            debit_keywords = [
-                'COMMISSION', 'FRAIS', 'COTISATION', 'PRELEVEMENT', 'RETRAIT',
-                'GAB', 'ACHAT', 'PAIEMENT', 'VIR EMIS', 'VIREMENT EMIS',
-                'STE ', 'SOCIETE', 'HOTEL', 'RESTAURANT', 'SUPERMARCHE'
-            ]
+            # Parser le montant (millimes exacts)
+            amount = parse_millimes(amount_str.strip())
             
-            is_credit = any(keyword in libelle_upper for keyword in credit_keywords)
-            is_debit = any(keyword in libelle_upper for keyword in debit_keywords)
+            # Déterminer le sens et la catégorie selon les règles du libellé
+            direction, category = self.rule_set.classify(libelle)
             
-            if is_credit and not is_debit:
-                # C'est un crédit
-                debit = 0.0
-                credit = amount
-            elif is_debit and not is_credit:
-                # C'est un débit
-                debit = amount
-                credit = 0.0
+            if direction == CREDIT:
+                debit, credit = 0, amount
             else:
-                # Par défaut, considérer comme un débit
-                debit = amount
-                credit = 0.0
+                debit, credit = amount, 0
             
-            return {
-                'date_operation': date_operation,
-                'date_valeur': date_valeur,
-                'libelle': libelle,
-                'debit': debit,
-                'credit': credit
-            }
+            return TransactionRecord(
+                date_ordinal(year_val, month_op, day_op),
+                date_ordinal(year_val, month_val, day_val),
+                libelle,
+                debit,
+                credit,
+                category or '',
+            )
             
         except Exception as e:
-            print(f"Erreur lors du parsing de la ligne: {line} - {str(e)}")
+            print(f"Erreur lors du parsing de la ligne: {match.group(0)} - {str(e)}")
             return None
     
-    def _parse_amount(self, amount_str: str) -> float:
-        """
-        Parse un montant depuis une chaîne de caractères
-        Format Attijari: "1 640,000" ou "0,893"
-        
-        Args:
-            amount_str: Chaîne contenant le montant
-            
-        Returns:
-            Montant en float
-        """
-        # Nettoyer la chaîne : supprimer les espaces et remplacer virgule par point
-        amount_str = amount_str.replace(' ', '').replace(',', '.')
-        return float(amount_str)
-    
     def _parse_date(self, date_str: str) -> str:
         """
         Parse une date depuis une chaîne DD/MM/YYYY
@@ -239,59 +542,20 @@ class AttijariParser:
         except:
             return date_str
     
-    def _extract_final_balance(self, line: str):
-        """
-        Extrait le solde final de la ligne
-        Format Attijari: "SOLDE 1 477,110" ou "SOLDE AU 31/07/2025 2,589"
-        
-        Args:
-            line: Ligne contenant le solde final
-        """
-        try:
-            # Pattern pour extraire le solde final Attijari
-            # Format: SOLDE 1 477,110 ou SOLDE AU 31/07/2025 2,589
-            balance_pattern = r'^SOLDE(?:\s+AU\s+\d{2}/\d{2}/\d{4})?\s+([\d\s,]+)$'
-            
-            match = re.search(balance_pattern, line.upper().strip())
-            if match:
-                balance_str = match.group(1).strip()
-                self.final_balance = self._parse_amount(balance_str)
-            else:
-                # Fallback : chercher un montant simple dans la ligne
-                # Format: 1 477,110 (avec espaces et virgule)
-                amount_pattern = r'(\d+\s+\d{3},\d{3})'
-                amounts = re.findall(amount_pattern, line)
-                
-                if amounts:
-                    # Prendre le premier montant trouvé
-                    balance_str = amounts[0].strip()
-                    self.final_balance = self._parse_amount(balance_str)
-        except Exception as e:
-            print(f"Erreur lors de l'extraction du solde final: {str(e)}")
-    
-    def to_dataframe(self) -> pd.DataFrame:
+    def to_dataframe(self) -> 'pd.DataFrame':
         """
         Convertit les transactions en DataFrame pandas
         
         Returns:
             DataFrame pandas contenant les transactions
         """
-        if not self.transactions:
-            return pd.DataFrame(columns=['date_operation', 'date_valeur', 'libelle', 'debit', 'credit'])
-        
-        df = pd.DataFrame(self.transactions)
+        import pandas as pd
         
-        # Ajouter une colonne pour le solde final si disponible
-        if self.final_balance is not None:
-            df.loc[len(df)] = {
-                'date_operation': '',
-                'date_valeur': '',
-                'libelle': 'SOLDE FINAL',
-                'debit': 0.0 if self.final_balance >= 0 else abs(self.final_balance),
-                'credit': self.final_balance if self.final_balance >= 0 else 0.0
-            }
+        if not self.transactions:
+            return pd.DataFrame(columns=self.EXPORT_COLUMNS)
         
-        return df
+        # Lignes d'export, y compris le solde final si disponible
+        return pd.DataFrame(list(self._export_rows()), columns=self.EXPORT_COLUMNS)
     
     def export_to_csv(self, output_path: str = None) -> str:
         """
@@ -303,20 +567,42 @@ class AttijariParser:
         Returns:
             Contenu CSV en string
         """
-        df = self.to_dataframe()
-        
         if output_path:
-            df.to_csv(output_path, index=False, encoding='utf-8-sig')
+            with open(output_path, 'w', newline='', encoding='utf-8-sig') as output_file:
+                self._write_csv(output_file)
             return f"Fichier CSV exporté vers: {output_path}"
         else:
             # Retourner le contenu CSV en string
             csv_buffer = io.StringIO()
-            df.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
+            self._write_csv(csv_buffer)
             return csv_buffer.getvalue()
     
+    def _write_csv(self, output_file):
+        """
+        Écrit l'en-tête et les lignes exportées (même format que DataFrame.to_csv)
+        """
+        writer = csv.writer(output_file, lineterminator='\n')
+        writer.writerow(self.EXPORT_COLUMNS)
+        writer.writerows(self._export_rows())
+    
+    def _export_rows(self) -> Iterator[List]:
+        """
+        Lignes exportées (mêmes valeurs que to_dataframe), sans construire de DataFrame
+        
+        Yields:
+            Liste des valeurs de chaque ligne, dans l'ordre de EXPORT_COLUMNS
+        """
+        for transaction in self.transactions:
+            yield transaction.as_row()
+        
+        # Ajouter une ligne pour le solde final si disponible
+        final_row = balance_row(self.final_balance)
+        if final_row is not None:
+            yield final_row
+    
     def export_to_excel(self, output_path: str = None) -> bytes:
         """
-        Exporte les données en Excel
+        Exporte les données en Excel, ligne à ligne (sans DataFrame ni classeur en mémoire)
         
         Args:
             output_path: Chemin de sortie (optionnel)
@@ -324,27 +610,25 @@ class AttijariParser:
         Returns:
             Contenu Excel en bytes
         """
-        df = self.to_dataframe()
-        
         if output_path:
-            df.to_excel(output_path, index=False, engine='openpyxl')
+            write_xlsx(self._export_rows(), self.EXPORT_COLUMNS, output_path)
             return f"Fichier Excel exporté vers: {output_path}"
         else:
             # Retourner le contenu Excel en bytes
-            excel_buffer = io.BytesIO()
-            df.to_excel(excel_buffer, index=False, engine='openpyxl')
-            return excel_buffer.getvalue()
+            return b''.join(iter_xlsx(self._export_rows(), self.EXPORT_COLUMNS))
 
 
-def parse_attijari_pdf(pdf_file) -> Dict:
+def parse_attijari_pdf(pdf_file, workers: int = 1, backend: str = AUTO) -> Dict:
     """
     Fonction utilitaire pour parser un PDF Attijari
     
     Args:
         pdf_file: Fichier PDF
+        workers: Nombre de processus pour l'extraction du texte
+        backend: Moteur d'extraction du texte (voir parsers.backends)
         
     Returns:
         Dict contenant les données extraites
     """
-    parser = AttijariParser()
+    parser = AttijariParser(workers=workers, backend=backend)
     return parser.parse_pdf(pdf_file)
@@ -0,0 +1,387 @@
+"""
+Moteurs d'extraction du texte des pages d'un PDF
+
+Le parser ne lit les PDF qu'à travers l'interface ExtractionBackend :
+open() retourne un ExtractionDocument qui donne le nombre de pages et le
+texte de chaque page, une ligne de relevé par ligne de texte. La source est
+un chemin, un contenu binaire, ou un fichier projeté en mémoire (MappedFile).
+
+- pdfplumber : implémentation de référence (pdfminer, en pur Python),
+  capable de limiter l'extraction à la zone du tableau (table_region)
+- pypdfium2 : PDFium (moteur de Chrome, en C++), nettement plus rapide ;
+  installé avec pdfplumber, dont il est une dépendance
+
+Chaque moteur doit produire les mêmes transactions que la référence sur le
+corpus de benchmarks/backend_conformance.py. 'auto' choisit le premier moteur
+disponible de BACKENDS : la référence pdfplumber, tant que pypdfium2 n'a pas
+été validé sur un corpus de vrais relevés (certaines mises en page, dont le
+texte est stocké colonne par colonne, ne donnent aucune transaction avec
+PDFium). Un document dont aucune transaction n'est extraite est relu avec
+les autres moteurs (fallback_backends, voir AttijariParser.parse_pdf).
+"""
+
+import importlib.util
+import io
+import mmap
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, Type, Union
+
+from .table_region import TableRegion, chars_lines, page_chars
+
+
+class MappedFile(io.RawIOBase):
+    """
+    Fichier sur disque projeté en mémoire (mmap), lu comme un fichier ordinaire
+
+    Les pages du fichier restent dans le cache du système et sont partagées :
+    le PDF n'est jamais copié en entier dans la mémoire du processus Python.
+    """
+
+    def __init__(self, fileobj, path: Optional[str] = None):
+        """
+        Args:
+            fileobj: Fichier ouvert, non vide, ayant un descripteur (fileno)
+            path: Chemin du fichier s'il est connu (transmis aux processus du pool)
+        """
+        super().__init__()
+        self._map = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._position = 0
+        self.path = path
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = max(0, min(len(buffer), len(self._map) - self._position))
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._map)
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def getbuffer(self) -> memoryview:
+        """
+        Contenu du fichier, sans copie
+        """
+        return self._view
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._map.close()
+        super().close()
+
+
+def map_file(fileobj) -> Optional[MappedFile]:
+    """
+    Projette en mémoire un fichier ouvert s'il est sur disque
+
+    Args:
+        fileobj: Fichier ouvert (fichier Python, TemporaryUploadedFile, FieldFile...)
+
+    Returns:
+        MappedFile, ou None si le fichier n'a pas de descripteur (en mémoire) ou est vide
+    """
+    try:
+        # Les données écrites mais encore dans le tampon Python ne seraient pas visibles
+        if hasattr(fileobj, 'flush'):
+            fileobj.flush()
+        fileobj.fileno()
+    except (OSError, AttributeError, ValueError):
+        return None
+
+    path = fileobj.temporary_file_path() if hasattr(fileobj, 'temporary_file_path') else None
+    try:
+        return MappedFile(fileobj, path)
+    except ValueError:
+        # Fichier vide : mmap refuse une projection de taille nulle
+        return None
+
+
+def read_source(pdf_file) -> Union[str, bytes, MappedFile]:
+    """
+    Normalise l'entrée en une source lisible par les moteurs d'extraction
+
+    Un fichier sur disque (upload écrit dans un fichier temporaire, fichier
+    ouvert) est projeté en mémoire plutôt que lu : seul un fichier en
+    mémoire (BytesIO...) est copié.
+
+    Args:
+        pdf_file: Fichier PDF (objet file, chemin ou contenu binaire)
+
+    Returns:
+        Chemin du fichier, fichier projeté en mémoire ou contenu binaire du PDF
+    """
+    if isinstance(pdf_file, (str, os.PathLike)):
+        return os.fspath(pdf_file)
+    if isinstance(pdf_file, bytes):
+        return pdf_file
+
+    mapped = map_file(pdf_file)
+    if mapped is not None:
+        return mapped
+
+    if hasattr(pdf_file, 'seek'):
+        pdf_file.seek(0)
+    return pdf_file.read()
+
+
+# Extraction d'une page pdfplumber avec la zone du tableau des pages précédentes
+# (voir attijari_parser._extract_page_text) : retourne (texte, zone pour la suite)
+PageExtractor = Callable[[object, Optional[TableRegion]], Tuple[str, Optional[TableRegion]]]
+
+
+class ExtractionDocument:
+    """
+    PDF ouvert par un moteur d'extraction
+
+    Les pages sont lues dans l'ordre ; region conserve la zone du tableau
+    repérée sur les pages déjà lues, pour les moteurs qui savent limiter
+    l'extraction à cette zone (et peut être transmise à un autre processus).
+    """
+
+    region: Optional[TableRegion] = None
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def page_text(self, index: int) -> Optional[str]:
+        """
+        Texte de la page `index` (lignes séparées par '\\n')
+        """
+        raise NotImplementedError
+
+    def page_start(self, index: int, chars: Optional[int] = None) -> Tuple[str, bool]:
+        """
+        Début du texte de la page `index` (au plus `chars` caractères, toute la
+        page si None), sans limitation à la zone du tableau : sert à
+        reconnaître la banque avant l'extraction (voir parsers.registry)
+
+        Returns:
+            Tuple (texte, True si la page contient d'autres caractères)
+        """
+        text = self.page_text(index) or ''
+        if chars is None:
+            return text, False
+        return text[:chars], len(text) > chars
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ExtractionBackend:
+    """
+    Moteur d'extraction : ouvre un PDF (chemin ou contenu binaire)
+    """
+
+    # Nom du moteur dans les settings (PDF_EXTRACTION_BACKEND)
+    name = ''
+    # Module requis par le moteur
+    module = ''
+
+    def __init__(self, extract_page: Optional[PageExtractor] = None):
+        """
+        Args:
+            extract_page: Extraction limitée à la zone du tableau, si le moteur la prend en charge
+        """
+        self.extract_page = extract_page
+
+    @classmethod
+    def available(cls) -> bool:
+        """
+        Le module du moteur est-il installé ?
+        """
+        return importlib.util.find_spec(cls.module) is not None
+
+    def open(self, source: Union[str, bytes, MappedFile]) -> ExtractionDocument:
+        raise NotImplementedError
+
+
+class PdfplumberDocument(ExtractionDocument):
+
+    def __init__(self, pdf, extract_page: Optional[PageExtractor]):
+        self._pdf = pdf
+        self._extract_page = extract_page
+
+    def __len__(self) -> int:
+        return len(self._pdf.pages)
+
+    def page_text(self, index: int) -> Optional[str]:
+        page = self._pdf.pages[index]
+        if self._extract_page is None:
+            text = page.extract_text()
+        else:
+            text, self.region = self._extract_page(page, self.region)
+        # Libérer les caractères de la page une fois le texte extrait
+        page.flush_cache()
+        return text
+
+    def page_start(self, index: int, chars: Optional[int] = None) -> Tuple[str, bool]:
+        page = self._pdf.pages[index]
+        # Seuls les premiers caractères du flux de contenu sont convertis
+        page_start = page_chars(page, limit=None if chars is None else chars + 1)
+        page.flush_cache()
+        truncated = chars is not None and len(page_start) > chars
+        return '\n'.join(line.text for line in chars_lines(page_start[:chars])), truncated
+
+    def close(self):
+        self._pdf.close()
+
+
+class PdfplumberBackend(ExtractionBackend):
+    """
+    Référence : pdfplumber (mise en page pdfminer, extract_text)
+    """
+
+    name = 'pdfplumber'
+    module = 'pdfplumber'
+
+    def open(self, source: Union[str, bytes, MappedFile]) -> ExtractionDocument:
+        import pdfplumber
+
+        pdf = pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+        return PdfplumberDocument(pdf, self.extract_page)
+
+
+# PDFium n'est pas thread-safe : un seul appel à la fois par processus
+_PDFIUM_LOCK = threading.Lock()
+
+
+class PdfiumDocument(ExtractionDocument):
+
+    def __init__(self, pdf):
+        self._pdf = pdf
+
+    def __len__(self) -> int:
+        return len(self._pdf)
+
+    def page_text(self, index: int) -> Optional[str]:
+        with _PDFIUM_LOCK:
+            page = self._pdf[index]
+            try:
+                text_page = page.get_textpage()
+                try:
+                    text = text_page.get_text_range()
+                finally:
+                    text_page.close()
+            finally:
+                page.close()
+        # PDFium sépare les lignes par '\r\n'
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+
+    def page_start(self, index: int, chars: Optional[int] = None) -> Tuple[str, bool]:
+        with _PDFIUM_LOCK:
+            page = self._pdf[index]
+            try:
+                text_page = page.get_textpage()
+                try:
+                    # Seuls les premiers caractères sont convertis en texte Python ;
+                    # get_text_range exige un nombre de caractères présents sur la page
+                    available = text_page.count_chars()
+                    size = available if chars is None else min(chars, available)
+                    text = text_page.get_text_range(0, size) if size > 0 else ''
+                finally:
+                    text_page.close()
+            finally:
+                page.close()
+        return text.replace('\r\n', '\n').replace('\r', '\n'), size < available
+
+    def close(self):
+        with _PDFIUM_LOCK:
+            self._pdf.close()
+
+
+class PdfiumBackend(ExtractionBackend):
+    """
+    PDFium via pypdfium2 : extraction du texte en code natif
+    """
+
+    name = 'pypdfium2'
+    module = 'pypdfium2'
+
+    def open(self, source: Union[str, bytes, MappedFile]) -> ExtractionDocument:
+        import pypdfium2
+
+        with _PDFIUM_LOCK:
+            return PdfiumDocument(pypdfium2.PdfDocument(source))
+
+
+# Moteurs qui passent le contrôle de conformité : la référence d'abord ('auto'),
+# puis les moteurs plus rapides à imposer par PDF_EXTRACTION_BACKEND
+BACKENDS: Dict[str, Type[ExtractionBackend]] = {
+    backend.name: backend for backend in (PdfplumberBackend, PdfiumBackend)
+}
+
+AUTO = 'auto'
+
+
+def resolve_backend(name: str = AUTO) -> Type[ExtractionBackend]:
+    """
+    Moteur d'extraction désigné par un nom, 'auto' résolu en premier moteur disponible
+
+    Raises:
+        ValueError: Moteur inconnu ou non installé
+    """
+    if name == AUTO:
+        backend = next((backend for backend in BACKENDS.values() if backend.available()), None)
+        if backend is None:
+            raise ValueError("Aucun moteur d'extraction PDF n'est installé")
+        return backend
+
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Moteur d'extraction PDF inconnu: {name} (choix: {AUTO}, {', '.join(BACKENDS)})")
+    if not backend.available():
+        raise ValueError(f"Moteur d'extraction PDF non installé: {name} (module {backend.module})")
+    return backend
+
+
+def get_backend(name: str = AUTO, extract_page: Optional[PageExtractor] = None) -> ExtractionBackend:
+    """
+    Instancie un moteur d'extraction
+
+    Args:
+        name: Nom du moteur (voir BACKENDS), ou 'auto' pour le premier disponible
+        extract_page: Extraction limitée à la zone du tableau (moteurs qui la prennent en charge)
+
+    Raises:
+        ValueError: Moteur inconnu ou non installé
+    """
+    return resolve_backend(name)(extract_page=extract_page)
+
+
+def fallback_backends(backend: ExtractionBackend) -> List[ExtractionBackend]:
+    """
+    Autres moteurs installés, pour relire un document dont le moteur n'a
+    extrait aucune transaction
+
+    Args:
+        backend: Moteur utilisé (son extraction limitée au tableau est conservée)
+    """
+    return [
+        other(extract_page=backend.extract_page) for name, other in BACKENDS.items()
+        if name != backend.name and other.available()
+    ]
@@ -0,0 +1,44 @@
+"""
+Interface commune des parsers de relevés bancaires
+
+Chaque banque a son parser, enregistré dans parsers.registry. Un parser
+déclare la banque qu'il traite et une empreinte peu coûteuse (matches) :
+un test sur le texte du début de la première page du PDF (nom de la banque,
+code banque du RIB...), évalué avant toute extraction complète.
+"""
+
+from typing import Dict
+
+
+class StatementParser:
+    """
+    Parser d'un format de relevé bancaire
+    """
+
+    # Identifiant de la banque dans les settings (STATEMENT_PARSER)
+    bank = ''
+    # Nom affiché de la banque
+    label = ''
+    # Version du résultat produit : à incrémenter à chaque changement des
+    # transactions extraites (invalide les résultats mis en cache)
+    version = ''
+
+    @classmethod
+    def matches(cls, text: str) -> bool:
+        """
+        Le texte du début de la première page est-il celui d'un relevé de cette banque ?
+
+        Args:
+            text: Début du texte de la première page (ou la page entière)
+        """
+        raise NotImplementedError
+
+    def parse_pdf(self, pdf_file) -> Dict:
+        """
+        Parse un relevé PDF
+
+        Returns:
+            Dict contenant les transactions (TransactionRecord), le solde final
+            (millimes) et le nombre de transactions
+        """
+        raise NotImplementedError
@@ -0,0 +1,173 @@
+"""
+Représentation compacte et exacte des transactions extraites
+
+Les montants en dinars tunisiens ont 3 décimales : ils sont gardés en
+millimes (entiers) et les dates en ordinaux (date.toordinal()). Aucun
+float ni Decimal n'est créé pendant le parsing ; les conversions se font
+aux bords (JSON, exports, base de données).
+"""
+
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+
+# Nombre de millimes dans un dinar
+MILLIMES_PER_DINAR = 1000
+
+
+def parse_millimes(amount_str: str) -> int:
+    """
+    Convertit un montant Attijari en millimes, sans passer par un float
+    Format Attijari: "1 640,000" ou "0,893"
+
+    Args:
+        amount_str: Chaîne contenant le montant
+
+    Returns:
+        Montant en millimes
+    """
+    amount_str = amount_str.replace(' ', '').replace('\xa0', '')
+    dinars, separator, fraction = amount_str.rpartition(',')
+    if not separator:
+        dinars, fraction = fraction, ''
+
+    if (not dinars or dinars.isdigit()) and (not fraction or fraction.isdigit()) and len(fraction) <= 3:
+        return int(dinars or 0) * MILLIMES_PER_DINAR + int(fraction.ljust(3, '0'))
+
+    # Format inattendu : conversion décimale exacte, arrondie au millime le plus
+    # proche (demi-millime arrondi en s'éloignant de zéro)
+    return int((Decimal(amount_str.replace(',', '.')) * MILLIMES_PER_DINAR).to_integral_value(ROUND_HALF_UP))
+
+
+def millimes_to_decimal(millimes: int) -> Decimal:
+    """
+    Montant en millimes -> Decimal exact à 3 décimales (DecimalField)
+    """
+    return Decimal(millimes).scaleb(-3)
+
+
+def millimes_to_float(millimes: int) -> float:
+    """
+    Montant en millimes -> float (JSON, exports) ; la division est correctement
+    arrondie, repr() redonne donc exactement les 3 décimales
+    """
+    return millimes / MILLIMES_PER_DINAR
+
+
+def decimal_to_millimes(amount) -> int:
+    """
+    Montant Decimal (ou int, chaîne) -> millimes, arrondi comme parse_millimes
+    """
+    return int((Decimal(amount) * MILLIMES_PER_DINAR).to_integral_value(ROUND_HALF_UP))
+
+
+@lru_cache(maxsize=4096)
+def date_ordinal(year: str, month: str, day: str) -> int:
+    """
+    Ordinal d'une date à partir de ses composants texte (mis en cache : un relevé
+    ne contient que quelques dizaines de dates distinctes)
+    """
+    return date(int(year), int(month), int(day)).toordinal()
+
+
+@lru_cache(maxsize=4096)
+def ordinal_to_iso(ordinal: int) -> str:
+    """
+    Ordinal -> date au format YYYY-MM-DD
+    """
+    return date.fromordinal(ordinal).isoformat()
+
+
+class TransactionRecord:
+    """
+    Transaction extraite d'un relevé : montants en millimes, dates en ordinaux
+    """
+
+    __slots__ = ('date_operation', 'date_valeur', 'libelle', 'debit', 'credit', 'category')
+
+    def __init__(self, date_operation: int, date_valeur: int, libelle: str,
+                 debit: int = 0, credit: int = 0, category: str = ''):
+        self.date_operation = date_operation
+        self.date_valeur = date_valeur
+        self.libelle = libelle
+        self.debit = debit
+        self.credit = credit
+        self.category = category
+
+    def __eq__(self, other):
+        if not isinstance(other, TransactionRecord):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def __repr__(self):
+        return (
+            f"TransactionRecord({ordinal_to_iso(self.date_operation)}, {self.libelle!r}, "
+            f"debit={self.debit}, credit={self.credit})"
+        )
+
+    def as_tuple(self) -> Tuple:
+        """
+        Valeurs brutes (ordinaux, millimes), pour la sérialisation compacte
+        """
+        return (self.date_operation, self.date_valeur, self.libelle, self.debit, self.credit, self.category)
+
+    @classmethod
+    def from_tuple(cls, values) -> 'TransactionRecord':
+        """
+        Reconstruit une transaction à partir de as_tuple()
+        """
+        return cls(*values)
+
+    def as_dict(self) -> dict:
+        """
+        Représentation JSON : dates YYYY-MM-DD, montants en dinars
+        """
+        return {
+            'date_operation': ordinal_to_iso(self.date_operation),
+            'date_valeur': ordinal_to_iso(self.date_valeur),
+            'libelle': self.libelle,
+            'debit': millimes_to_float(self.debit),
+            'credit': millimes_to_float(self.credit),
+        }
+
+    def as_row(self) -> List:
+        """
+        Ligne d'export : date opération, date valeur, libellé, débit, crédit
+        """
+        return [
+            ordinal_to_iso(self.date_operation),
+            ordinal_to_iso(self.date_valeur),
+            self.libelle,
+            millimes_to_float(self.debit),
+            millimes_to_float(self.credit),
+        ]
+
+    def as_model_values(self) -> Tuple:
+        """
+        Valeurs pour le modèle Transaction : dates, Decimal exacts à 3 décimales, catégorie
+        """
+        return (
+            date.fromordinal(self.date_operation),
+            date.fromordinal(self.date_valeur),
+            self.libelle,
+            millimes_to_decimal(self.debit),
+            millimes_to_decimal(self.credit),
+            self.category,
+        )
+
+
+def balance_row(final_balance: Optional[int]) -> Optional[List]:
+    """
+    Ligne "SOLDE FINAL" des exports (débit si le solde est négatif), ou None
+    """
+    if final_balance is None:
+        return None
+    return [
+        '',
+        '',
+        'SOLDE FINAL',
+        millimes_to_float(-final_balance) if final_balance < 0 else 0.0,
+        millimes_to_float(final_balance) if final_balance >= 0 else 0.0,
+    ]
@@ -0,0 +1,111 @@
+"""
+Registre des parsers de relevés, choisis d'après la première page du PDF
+
+Avant toute extraction complète, detect_parser() ouvre le PDF, lit le début
+du texte de la première page (FINGERPRINT_CHARS caractères ; avec PDFium,
+seuls ces caractères sont convertis en texte) et le soumet à l'empreinte
+(matches) de chaque parser de PARSERS, dans l'ordre. Si aucun ne le
+reconnaît, la page entière est essayée. Un document qu'aucun parser ne
+reconnaît (autre banque, PDF scanné, document qui n'est pas un relevé) est
+refusé avec UnknownStatementError, sans lire les pages suivantes.
+
+Ajouter une banque : une sous-classe de parsers.base.StatementParser (bank,
+label, version, matches, parse_pdf), ajoutée à PARSERS.
+"""
+
+from typing import Dict, Type, Union
+
+from .attijari_parser import AttijariParser
+from .backends import AUTO, ExtractionBackend, MappedFile, get_backend, read_source
+from .base import StatementParser
+from .timing import stage
+
+
+# Parsers disponibles, essayés dans cet ordre
+PARSERS: Dict[str, Type[StatementParser]] = {
+    parser.bank: parser for parser in (AttijariParser,)
+}
+
+# Versions de tous les parsers (clés du cache de parsing)
+PARSERS_VERSION = '.'.join(f"{bank}{parser.version}" for bank, parser in PARSERS.items())
+
+# Caractères lus au début de la première page pour reconnaître la banque
+FINGERPRINT_CHARS = 2000
+
+
+class UnknownStatementError(ValueError):
+    """
+    Document qu'aucun parser enregistré ne reconnaît
+    """
+
+
+def _match(text: str):
+    return next((parser for parser in PARSERS.values() if parser.matches(text)), None)
+
+
+def detect_parser(pdf_file, backend: Union[str, ExtractionBackend] = AUTO) -> Type[StatementParser]:
+    """
+    Choisit le parser d'un relevé d'après le début de sa première page
+
+    Args:
+        pdf_file: Fichier PDF (objet file, chemin ou contenu binaire)
+        backend: Moteur d'extraction du texte, ou son nom (voir parsers.backends)
+
+    Returns:
+        Classe du parser reconnaissant le relevé
+
+    Raises:
+        UnknownStatementError: Aucun parser ne reconnaît le document
+    """
+    if isinstance(backend, str):
+        backend = get_backend(backend)
+
+    with stage('detect_bank'):
+        source = read_source(pdf_file)
+        try:
+            with backend.open(source) as document:
+                if not len(document):
+                    raise UnknownStatementError("Relevé non reconnu : le PDF ne contient aucune page")
+                text, truncated = document.page_start(0, FINGERPRINT_CHARS)
+                parser = _match(text)
+                if parser is None and truncated:
+                    # Empreinte plus loin dans la page (pied de page...)
+                    text, _ = document.page_start(0)
+                    parser = _match(text)
+        finally:
+            if isinstance(source, MappedFile):
+                source.close()
+            elif hasattr(pdf_file, 'seek'):
+                pdf_file.seek(0)
+
+    if parser is None:
+        banks = ', '.join(parser.label for parser in PARSERS.values())
+        if not text.strip():
+            raise UnknownStatementError(
+                f"Relevé non reconnu : la première page ne contient pas de texte (PDF scanné ?). "
+                f"Banques prises en charge : {banks}"
+            )
+        raise UnknownStatementError(f"Relevé non reconnu. Banques prises en charge : {banks}")
+    return parser
+
+
+def select_parser(pdf_file, name: str = AUTO,
+                  backend: Union[str, ExtractionBackend] = AUTO) -> Type[StatementParser]:
+    """
+    Parser à utiliser pour un relevé : celui nommé, ou celui reconnu par detect_parser
+
+    Args:
+        pdf_file: Fichier PDF (objet file, chemin ou contenu binaire)
+        name: Banque (voir PARSERS), ou 'auto' pour reconnaître le relevé
+        backend: Moteur d'extraction du texte, ou son nom
+
+    Raises:
+        ValueError: Parser inconnu
+        UnknownStatementError: Aucun parser ne reconnaît le document (name='auto')
+    """
+    if name == AUTO:
+        return detect_parser(pdf_file, backend)
+    parser = PARSERS.get(name)
+    if parser is None:
+        raise ValueError(f"Parser de relevé inconnu: {name} (choix: {AUTO}, {', '.join(PARSERS)})")
+    return parser
@@ -0,0 +1,191 @@
+"""
+Règles de classification des transactions (débit/crédit et catégorie)
+
+Les règles associent un mot-clé du libellé à un sens (débit ou crédit) et/ou
+à une catégorie. Elles sont compilées une seule fois en un automate
+Aho-Corasick : tous les mots-clés présents dans un libellé sont trouvés en
+une seule passe, quel que soit le nombre de règles.
+"""
+
+import hashlib
+import json
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+
+DEBIT = 'debit'
+CREDIT = 'credit'
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Règle de classification : un mot-clé recherché dans le libellé (en majuscules)
+    """
+    keyword: str
+    direction: Optional[str] = None
+    category: Optional[str] = None
+
+
+class KeywordAutomaton:
+    """
+    Automate Aho-Corasick multi-motifs
+
+    Les liens d'échec sont résolus à la construction : l'automate est un DFA
+    complet sur l'alphabet des mots-clés, donc une recherche coûte une
+    consultation de dictionnaire par caractère du texte.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Args:
+            keywords: Mots-clés, identifiés par leur position dans la séquence
+        """
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[int, ...]] = [()]
+
+        # Trie des mots-clés
+        for index, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                    goto[state][char] = next_state
+                state = next_state
+            outputs[state] += (index,)
+
+        # Parcours en largeur : liens d'échec et transitions complètes du DFA
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            # Les transitions manquantes reprennent celles de l'état d'échec
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            outputs[state] += outputs[fail[state]]
+            for char, next_state in goto[state].items():
+                fail[next_state] = delta[fail[state]].get(char, 0) if state else 0
+                queue.append(next_state)
+
+        self._delta = delta
+        self._outputs = outputs
+
+    def find(self, text: str) -> FrozenSet[int]:
+        """
+        Retourne les index de tous les mots-clés présents dans le texte
+        """
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        found = set()
+        for char in text:
+            state = delta[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return frozenset(found)
+
+
+class RuleSet:
+    """
+    Ensemble ordonné de règles compilé en automate
+
+    Sens : crédit si seules des règles crédit correspondent, débit sinon
+    (y compris quand aucune règle ou des règles contradictoires correspondent).
+    Catégorie : celle de la première règle (dans l'ordre) qui correspond et
+    en définit une.
+    """
+
+    def __init__(self, rules: Iterable[Rule], cache_size: int = 4096):
+        """
+        Args:
+            rules: Règles, par ordre de priorité pour la catégorie
+            cache_size: Nombre de libellés distincts gardés en cache
+        """
+        self.rules = tuple(
+            Rule(rule.keyword.upper(), rule.direction or None, rule.category or None) for rule in rules
+        )
+        self._automaton = KeywordAutomaton(rule.keyword for rule in self.rules)
+        self.version = hashlib.sha1(
+            json.dumps([[r.keyword, r.direction, r.category] for r in self.rules]).encode('utf-8')
+        ).hexdigest()[:12]
+
+        # Les libellés se répètent beaucoup d'un relevé à l'autre (frais, GAB...)
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, libelle: str) -> Tuple[str, Optional[str]]:
+        """
+        Détermine le sens et la catégorie d'un libellé
+
+        Args:
+            libelle: Libellé de la transaction
+
+        Returns:
+            Tuple (DEBIT ou CREDIT, catégorie ou None)
+        """
+        matched = self._automaton.find(libelle.upper())
+
+        is_credit = is_debit = False
+        category = None
+        for index in sorted(matched):
+            rule = self.rules[index]
+            if rule.direction == CREDIT:
+                is_credit = True
+            elif rule.direction == DEBIT:
+                is_debit = True
+            if category is None and rule.category:
+                category = rule.category
+
+        direction = CREDIT if is_credit and not is_debit else DEBIT
+        return direction, category
+
+    def __len__(self):
+        return len(self.rules)
+
+    @classmethod
+    def from_dicts(cls, items: Iterable[Dict]) -> 'RuleSet':
+        """
+        Construit un ensemble de règles à partir de dicts
+        ({"keyword": ..., "direction": ..., "category": ...})
+        """
+        rules = []
+        for item in items:
+            direction = item.get('direction') or None
+            if direction not in (None, DEBIT, CREDIT):
+                raise ValueError(f"Sens de règle invalide: {direction}")
+            rules.append(Rule(item['keyword'], direction, item.get('category') or None))
+        return cls(rules)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'RuleSet':
+        """
+        Charge un ensemble de règles depuis un fichier JSON
+        (liste de règles, ou objet avec une clé "rules")
+        """
+        with open(path, encoding='utf-8') as rules_file:
+            data = json.load(rules_file)
+        if isinstance(data, dict):
+            data = data['rules']
+        return cls.from_dicts(data)
+
+
+# Règles historiques du parser Attijari
+DEFAULT_RULES = [
+    # Mots-clés pour les crédits (entrées d'argent)
+    *(Rule(keyword, CREDIT) for keyword in [
+        'VERSEMENT', 'ENCAISSEMENT', 'VIR RECU', 'VIREMENT RECU',
+        'REMISE', 'DEPOT', 'CREDIT', 'RECEPTION'
+    ]),
+    # Mots-clés pour les débits (sorties d'argent)
+    *(Rule(keyword, DEBIT) for keyword in [
+        'COMMISSION', 'FRAIS', 'COTISATION', 'PRELEVEMENT', 'RETRAIT',
+        'GAB', 'ACHAT', 'PAIEMENT', 'VIR EMIS', 'VIREMENT EMIS',
+        'STE ', 'SOCIETE', 'HOTEL', 'RESTAURANT', 'SUPERMARCHE'
+    ]),
+]
+
+DEFAULT_RULE_SET = RuleSet(DEFAULT_RULES)
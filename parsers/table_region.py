@@ -0,0 +1,142 @@
+"""
+Extraction du texte d'une page limitée à la zone du tableau des transactions
+
+pdfplumber convertit chaque caractère de la page en dictionnaire (couleurs,
+police, matrice...) avant toute extraction de texte, y compris les caractères
+des en-têtes, adresses et mentions légales que le parser ignore ensuite. Ici
+les caractères sont lus directement dans la mise en page pdfminer, filtrés
+sur la zone du tableau (TableRegion) avant conversion, et réduits aux seuls
+attributs utilisés pour reconstituer les lignes : le texte obtenu est
+identique à celui de page.extract_text() pour les mêmes caractères.
+"""
+
+import re
+from dataclasses import dataclass
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+
+# Tolérance verticale de regroupement des mots en lignes (celle de pdfplumber)
+Y_TOLERANCE = 3
+
+_DIGITS = re.compile(r'\d+')
+
+
+@dataclass(frozen=True)
+class TableRegion:
+    """
+    Zone du tableau des transactions sur une page (points, origine en haut à gauche)
+
+    La zone s'étend jusqu'au bord droit de la page : les montants alignés à
+    droite peuvent dépasser le titre de la dernière colonne. footer est la
+    première ligne sous la zone (pied de page) sur la page où elle a été
+    repérée, chiffres remplacés par '#' (numéros de page).
+    """
+    x0: float
+    top: float
+    bottom: float
+    footer: Optional[str] = None
+    footer_height: float = 0.0
+
+    def footer_band(self) -> 'TableRegion':
+        """
+        Bande située juste sous la zone, de la hauteur du pied de page
+        """
+        return TableRegion(self.x0, self.bottom, self.bottom + self.footer_height)
+
+
+class TextLine(NamedTuple):
+    """
+    Ligne de texte d'une page et sa position
+    """
+    text: str
+    x0: float
+    top: float
+    bottom: float
+
+
+def _iter_layout_chars(objects) -> Iterator:
+    from pdfminer.layout import LTChar, LTContainer
+
+    for obj in objects:
+        if isinstance(obj, LTChar):
+            yield obj
+        elif isinstance(obj, LTContainer):
+            # Figures et autres conteneurs : parcourir leurs caractères
+            yield from _iter_layout_chars(obj)
+
+
+def footer_key(text: str) -> str:
+    """
+    Texte d'une ligne de pied de page, comparable d'une page à l'autre
+    """
+    return _DIGITS.sub('#', text)
+
+
+def page_chars(page, region: Optional[TableRegion] = None, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Caractères d'une page pdfplumber, éventuellement limités à une zone
+
+    Un caractère appartient à la zone si son milieu vertical est entre le
+    haut et le bas de la zone et s'il commence après son bord gauche.
+
+    Args:
+        page: Page pdfplumber
+        region: Zone à conserver (toute la page si None)
+        limit: Ne lire que les `limit` premiers caractères, dans l'ordre du flux de contenu
+
+    Returns:
+        Caractères réduits aux attributs utilisés par l'extraction du texte
+    """
+    height = page.height
+    chars = []
+    for char in islice(_iter_layout_chars(page.layout), limit):
+        top = height - char.y1
+        bottom = height - char.y0
+        if region is not None and (
+            char.x0 < region.x0 or not region.top <= (top + bottom) / 2 <= region.bottom
+        ):
+            continue
+        chars.append({
+            'text': char.get_text(),
+            'x0': char.x0,
+            'x1': char.x1,
+            'top': top,
+            'doctop': top,
+            'bottom': bottom,
+            'upright': char.upright,
+        })
+    return chars
+
+
+def page_lines(page, region: Optional[TableRegion] = None) -> List[TextLine]:
+    """
+    Lignes de texte d'une page (ou d'une zone de la page), de haut en bas
+
+    Les mots et les lignes sont reconstitués comme par page.extract_text() :
+    '\\n'.join(line.text for line in page_lines(page)) donne le même texte.
+    """
+    return chars_lines(page_chars(page, region))
+
+
+def chars_lines(chars: List[Dict]) -> List[TextLine]:
+    """
+    Lignes de texte formées par des caractères de page_chars(), de haut en bas
+    """
+    from pdfplumber.utils import cluster_objects
+    from pdfplumber.utils.text import WordExtractor
+
+    if not chars:
+        return []
+
+    words = WordExtractor().extract_words(chars)
+    return [
+        TextLine(
+            ' '.join(word['text'] for word in line),
+            min(word['x0'] for word in line),
+            min(word['top'] for word in line),
+            max(word['bottom'] for word in line),
+        )
+        for line in cluster_objects(words, itemgetter('doctop'), Y_TOLERANCE)
+    ]
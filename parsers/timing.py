@@ -0,0 +1,78 @@
+"""
+Mesure du temps passé dans chaque étape d'un traitement (ouverture du PDF,
+extraction du texte, parsing, écriture en base...)
+
+Les étapes instrumentées avec stage() ne mesurent rien tant qu'aucune collecte
+n'est active : collect_timings() en ouvre une pour le contexte courant (une
+requête HTTP, un job), et les durées de toutes les étapes exécutées dans ce
+contexte y sont cumulées.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+
+_current: ContextVar[Optional['StageTimings']] = ContextVar('banktocsv_stage_timings', default=None)
+
+
+class StageTimings:
+    """
+    Durées cumulées par étape (secondes) et compteurs d'un traitement
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def server_timing(self) -> str:
+        """
+        Valeur d'un en-tête Server-Timing ("extract_text;dur=12.3, parse_lines;dur=1.2")
+        """
+        return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations.items())
+
+
+@contextmanager
+def collect_timings() -> Iterator[StageTimings]:
+    """
+    Active la collecte des durées d'étapes pour le contexte courant
+    """
+    timings = StageTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Mesure la durée d'une étape (sans effet hors d'une collecte)
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def count(name: str, value: int = 1):
+    """
+    Incrémente un compteur de la collecte courante (pages, transactions...)
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.count(name, value)
@@ -0,0 +1,239 @@
+"""
+Écriture de fichiers Excel (.xlsx) en streaming
+
+Le classeur est produit ligne à ligne : la feuille est écrite directement
+dans l'archive ZIP (chaînes en ligne, pas de table de chaînes partagées) et
+les octets compressés sont rendus au fur et à mesure. La mémoire utilisée
+ne dépend pas du nombre de lignes.
+"""
+
+import re
+import zipfile
+from datetime import date, datetime
+from typing import Iterable, Iterator, Sequence
+from xml.sax.saxutils import escape
+
+
+# Taille (octets) du XML de feuille accumulé avant compression
+FLUSH_SIZE = 64 * 1024
+
+# Origine des dates Excel (système 1900)
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# Styles : 0 = défaut, 1 = date, 2 = date et heure, 3 = en-tête en gras
+STYLE_DATE = 1
+STYLE_DATETIME = 2
+STYLE_HEADER = 3
+
+# Caractères de contrôle interdits en XML
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2">'
+    '<numFmt numFmtId="164" formatCode="yyyy-mm-dd"/>'
+    '<numFmt numFmtId="165" formatCode="yyyy-mm-dd hh:mm:ss"/>'
+    '</numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_SHEET_END = '</sheetData></worksheet>'
+
+
+class _ChunkSink:
+    """
+    Flux d'écriture non positionnable qui accumule les octets jusqu'au prochain drain()
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _column_letter(index: int) -> str:
+    """
+    Lettre de colonne Excel (0 -> A, 26 -> AA)
+    """
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell_xml(reference: str, value, style: int = 0) -> str:
+    """
+    XML d'une cellule selon le type Python de la valeur
+    """
+    if value is None or value == '':
+        return ''
+
+    style_attr = f' s="{style}"' if style else ''
+
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"{style_attr}><v>{int(value)}</v></c>'
+
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"{style_attr}><v>{value!r}</v></c>'
+
+    if isinstance(value, datetime):
+        serial = (value - EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c r="{reference}" s="{STYLE_DATETIME}"><v>{serial!r}</v></c>'
+
+    if isinstance(value, date):
+        serial = (value - EXCEL_EPOCH.date()).days
+        return f'<c r="{reference}" s="{STYLE_DATE}"><v>{serial}</v></c>'
+
+    if not isinstance(value, str):
+        # Decimal et autres types numériques
+        try:
+            return f'<c r="{reference}"{style_attr}><v>{float(value)!r}</v></c>'
+        except (TypeError, ValueError):
+            value = str(value)
+
+    text = escape(_ILLEGAL_XML_CHARS.sub('', value))
+    return f'<c r="{reference}" t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def iter_xlsx(rows: Iterable[Sequence], headers: Sequence[str], sheet_name: str = 'Sheet1') -> Iterator[bytes]:
+    """
+    Produit un classeur Excel d'une feuille, morceau par morceau
+
+    Args:
+        rows: Itérable de lignes (séquences de valeurs), consommé une seule fois
+        headers: En-têtes des colonnes (première ligne, en gras)
+        sheet_name: Nom de la feuille
+
+    Yields:
+        Morceaux successifs du fichier .xlsx
+    """
+    sink = _ChunkSink()
+    columns = [_column_letter(index) for index in range(len(headers))]
+
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _WORKBOOK.format(sheet_name=escape(sheet_name, {'"': '&quot;'})))
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', _STYLES)
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            parts = [_SHEET_START, '<row r="1">']
+            parts.extend(_cell_xml(f"{column}1", header, STYLE_HEADER) for column, header in zip(columns, headers))
+            parts.append('</row>')
+            size = 0
+
+            for row_number, row in enumerate(rows, start=2):
+                row_xml = (
+                    f'<row r="{row_number}">'
+                    + ''.join(_cell_xml(f"{column}{row_number}", value) for column, value in zip(columns, row))
+                    + '</row>'
+                )
+                parts.append(row_xml)
+                size += len(row_xml)
+
+                if size >= FLUSH_SIZE:
+                    sheet.write(''.join(parts).encode('utf-8'))
+                    parts.clear()
+                    size = 0
+                    data = sink.drain()
+                    if data:
+                        yield data
+
+            parts.append(_SHEET_END)
+            sheet.write(''.join(parts).encode('utf-8'))
+
+    yield sink.drain()
+
+
+def write_xlsx(rows: Iterable[Sequence], headers: Sequence[str], output, sheet_name: str = 'Sheet1'):
+    """
+    Écrit un classeur Excel dans un fichier (chemin ou objet file binaire)
+    """
+    if isinstance(output, str):
+        with open(output, 'wb') as output_file:
+            write_xlsx(rows, headers, output_file, sheet_name)
+        return
+
+    for chunk in iter_xlsx(rows, headers, sheet_name):
+        output.write(chunk)